@@ -0,0 +1,30 @@
+"""
+Binary reading transfer
+
+SCPI instruments can return readings as IEEE 754 values in an IEEE 488.2 binary
+block rather than as ASCII text (eg. :FORMAT:DATA REAL,32). The block is received
+straight into a bytearray by read_block() and viewed as a numpy array here, so
+no strings are built and nothing is parsed.
+
+	gpib.write(':READ?')
+	readings = DecodeReadings(gpib.read_block(), ReadingDtype(REAL32, swapped=True))
+"""
+
+import numpy as np
+
+REAL32 = 32
+REAL64 = 64
+
+_CODES = {REAL32: 'f4', REAL64: 'f8'}
+
+
+def ReadingDtype(bits, swapped=False):
+	"numpy dtype of REAL,bits readings. swapped is little endian byte order (eg. :FORM:BORD SWAP)"
+	if bits not in _CODES:
+		raise ValueError('readings must be REAL,32 or REAL,64')
+	return np.dtype(('<' if swapped else '>') + _CODES[bits])
+
+
+def DecodeReadings(block, dtype):
+	"View a binary block as an array of readings, the array shares the memory of the block"
+	return np.frombuffer(block, dtype=dtype)
@@ -0,0 +1,171 @@
+"""
+Fixed record binary log
+
+A compact log format that survives a crash or power loss without flushing text
+after every line. The file starts with a header describing the columns, then
+every record is a fixed width: the timestamp (POSIX seconds) followed by a
+float64 for each reading, little endian.
+
+	magic		8 bytes 'GPIBLOG1'
+	length		uint32, length of the JSON description that follows
+	description	JSON: {"columns": [...], "dtype": [[name, type], ...], ...}
+	padding		to a multiple of 8 bytes, the records start here
+	records
+
+Records are written to the file as they arrive, so readers see them at once,
+and fsync is called for a group of records (every commit_rows records or
+commit_interval seconds) rather than for each one. After a crash a partly
+written record at the end of the file is ignored by readers and removed when
+the log is next opened for writing.
+
+Readers memory map the file and see it as a numpy structured array, without
+reading or copying it, so a month of data opens instantly while the logger
+keeps appending:
+
+	log = BinaryLog('logs/five-in-one.bin')
+	records = log.records			# numpy structured array
+	plt.plot(log.times(), records['TWindow'])
+	log.refresh()					# map any records appended since
+"""
+
+import numpy as np
+import json
+import time
+import os
+
+BINLOG_MAGIC = b'GPIBLOG1'
+BINLOG_ALIGN = 8
+
+
+def RecordDtype(columns):
+	"numpy dtype of a record, the first column is the timestamp, the rest are readings"
+	return np.dtype([(columns[0], '<f8')] + [(name, '<f8') for name in columns[1:]])
+
+
+def EncodeHeader(columns, dtype):
+	description = json.dumps({
+		'columns': list(columns),
+		'dtype': [[name, dtype.fields[name][0].str] for name in dtype.names],
+		'timestamp': 'posix',
+	}).encode('utf-8')
+	header = BINLOG_MAGIC + len(description).to_bytes(4, 'little') + description
+	return header + bytes(-len(header) % BINLOG_ALIGN)
+
+
+def ReadHeader(f):
+	"Read the header of an open log, returns the description and the offset of the first record"
+	prefix = f.read(len(BINLOG_MAGIC) + 4)
+	if len(prefix) < len(BINLOG_MAGIC) + 4 or not prefix.startswith(BINLOG_MAGIC):
+		raise ValueError('not a binary log file')
+	length = int.from_bytes(prefix[len(BINLOG_MAGIC):], 'little')
+	description = json.loads(f.read(length).decode('utf-8'))
+	offset = len(prefix) + length
+	return description, offset + (-offset % BINLOG_ALIGN)
+
+
+def HeaderDtype(description):
+	return np.dtype([(name, code) for name, code in description['dtype']])
+
+
+class BinaryLogWriter(object):
+	"Append records to a binary log, creating it if needed"
+
+	def __init__(self, path, columns, commit_rows=60, commit_interval=10.0):
+		self.path = path
+		self.columns = list(columns)
+		self.commit_rows = commit_rows
+		self.commit_interval = commit_interval
+		self.dtype = RecordDtype(self.columns)
+		self._pending = 0
+		self._commit_time = time.monotonic()
+
+		self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+		try:
+			self._prepare()
+		except Exception:
+			os.close(self._fd)
+			raise
+
+	def write(self, record):
+		"Append a record, a sequence of the timestamp and the readings"
+		self.write_many(np.array([tuple(record)], dtype=self.dtype))
+
+	def write_many(self, records):
+		"Append a numpy array of records with the dtype of the log"
+		data = memoryview(np.ascontiguousarray(records, dtype=self.dtype)).cast('B')
+		while data:
+			data = data[os.write(self._fd, data):]
+		self._pending += len(records)
+		if (self._pending >= self.commit_rows or
+				time.monotonic() - self._commit_time >= self.commit_interval):
+			self.commit()
+
+	def commit(self):
+		"Make the records written so far durable"
+		if self._pending:
+			os.fsync(self._fd)
+		self._pending = 0
+		self._commit_time = time.monotonic()
+
+	def close(self):
+		if self._fd is not None:
+			self.commit()
+			os.close(self._fd)
+			self._fd = None
+
+	def _prepare(self):
+		size = os.fstat(self._fd).st_size
+		if size == 0:
+			os.write(self._fd, EncodeHeader(self.columns, self.dtype))
+			os.fsync(self._fd)
+			return
+
+		with open(self.path, 'rb') as f:
+			description, offset = ReadHeader(f)
+		if description['columns'] != self.columns or HeaderDtype(description) != self.dtype:
+			raise ValueError('%s has different columns' % self.path)
+
+		# remove a record left part written by a crash
+		end = offset + (size - offset) // self.dtype.itemsize * self.dtype.itemsize
+		if end != size:
+			os.ftruncate(self._fd, end)
+			os.fsync(self._fd)
+
+
+class BinaryLog(object):
+	"Read only view of a binary log, records is a numpy structured array mapped from the file"
+
+	def __init__(self, path):
+		self.path = path
+		with open(path, 'rb') as f:
+			self.description, self.offset = ReadHeader(f)
+		self.columns = self.description['columns']
+		self.dtype = HeaderDtype(self.description)
+		self.records = None
+		self.refresh()
+
+	def refresh(self):
+		"Map the records written so far, returns the number of records"
+		count = (os.path.getsize(self.path) - self.offset) // self.dtype.itemsize
+		if count <= 0:
+			self.records = np.zeros(0, dtype=self.dtype)
+		elif self.records is None or count != len(self.records):
+			self.records = np.memmap(self.path, dtype=self.dtype, mode='r', offset=self.offset, shape=(count,))
+		return len(self.records)
+
+	def __len__(self):
+		return len(self.records)
+
+	def times(self):
+		"The timestamps as a datetime64 array, in UTC"
+		# microseconds are exact in a float64, nanoseconds from 1970 are not
+		return np.round(self.records[self.columns[0]] * 1e6).astype(np.int64).astype('datetime64[us]')
+
+	def to_frame(self):
+		"pandas DataFrame of the records, like reading the CSV log with parse_dates but in UTC"
+		import pandas as pd
+
+		data = {self.columns[0]: self.times()}
+		for name in self.columns[1:]:
+			data[name] = self.records[name]
+		return pd.DataFrame(data)
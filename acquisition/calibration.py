@@ -0,0 +1,127 @@
+"""
+Calibration data snapshots
+
+A CalSource describes how to read the calibration data of an instrument: the
+query that identifies it, and named regions each read by one or more queries.
+All of the queries for a read are put in one batch, so they are pipelined
+rather than waiting for each reply in turn.
+
+Each read is stored as a snapshot, holding the instrument ID and a timestamp,
+in a JSON file per instrument in the cache directory. A later audit first reads
+only the check regions of the source (eg. the calibration date). If they match
+the cached snapshot the instrument is reported unchanged without reading the
+rest; otherwise everything is read, compared with the snapshot, and saved.
+
+	audit = AuditCalibration(gpib, 1, K2015CalSource())
+	for name, old, new in audit.changes:
+		print(name, old, new)
+"""
+
+from datetime import datetime
+import json
+import os
+import re
+
+CAL_CACHE_DIR = 'cal-cache'
+
+
+class CalRegion(object):
+	"A named part of the calibration data, the responses to queries"
+
+	def __init__(self, name, queries, check=False):
+		self.name = name
+		self.queries = list(queries)
+		self.check = check		# read on every audit to detect a change
+
+
+class CalSource(object):
+	"The calibration data of a type of instrument"
+
+	def __init__(self, id_query, regions):
+		self.id_query = id_query
+		self.regions = list(regions)
+		# the regions read on every audit, with nothing cheaper to check every region is compared
+		self.checks = [region for region in self.regions if region.check] or list(self.regions)
+
+	def read(self, gpib, addr, regions=None):
+		"Read the regions (all if None), returns the instrument ID and a dict of responses for each region"
+		regions = self.regions if regions is None else regions
+		batch = gpib.batch()
+		batch.select(addr)
+		batch.query(self.id_query)
+		for region in regions:
+			for query in region.queries:
+				batch.query(query)
+
+		results = batch.execute()
+		values = {}
+		i = 1
+		for region in regions:
+			values[region.name] = results[i:i+len(region.queries)]
+			i += len(region.queries)
+		return results[0], values
+
+
+class CalSnapshot(object):
+	"Calibration data read from one instrument at one time"
+
+	def __init__(self, instrument_id, regions, timestamp=None):
+		self.instrument_id = instrument_id
+		self.regions = dict(regions)
+		self.timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+	def diff(self, other):
+		"Regions that differ from other snapshot, a list of (name, value here, value in other)"
+		names = list(self.regions) + [name for name in other.regions if name not in self.regions]
+		return [(name, self.regions.get(name), other.regions.get(name))
+			for name in names if self.regions.get(name) != other.regions.get(name)]
+
+	def save(self, path):
+		temp = path + '.tmp'
+		with open(temp, 'w') as f:
+			json.dump({'id': self.instrument_id, 'timestamp': self.timestamp, 'regions': self.regions},
+				f, separators=(',', ':'))
+		os.replace(temp, path)
+
+	@classmethod
+	def load(cls, path):
+		with open(path) as f:
+			config = json.load(f)
+		return cls(config['id'], config['regions'], config['timestamp'])
+
+
+def SnapshotPath(instrument_id, cache_dir=CAL_CACHE_DIR):
+	"Cache file for an instrument, named from its ID"
+	return os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9.-]+', '_', instrument_id).strip('_') + '.json')
+
+
+class AuditCalibration(object):
+	"""
+	Compare the calibration data of an instrument with its cached snapshot
+
+	After construction: snapshot is the current data, previous the cached
+	snapshot (None on the first audit), changes lists the regions that differ
+	from previous, and full_read is True if all of the regions were read.
+	"""
+
+	def __init__(self, gpib, addr, source, cache_dir=CAL_CACHE_DIR):
+		checks = source.checks
+		instrument_id, values = source.read(gpib, addr, checks)
+		path = SnapshotPath(instrument_id, cache_dir)
+
+		self.previous = CalSnapshot.load(path) if os.path.exists(path) else None
+		self.full_read = True
+		if self.previous is not None and len(checks) == len(source.regions):
+			pass	# everything has already been read
+		elif self.previous is not None and all(self.previous.regions.get(name) == value for name, value in values.items()):
+			# unchanged, the rest of the data is taken from the snapshot
+			self.full_read = False
+			values = self.previous.regions
+		else:
+			instrument_id, values = source.read(gpib, addr)
+
+		self.snapshot = CalSnapshot(instrument_id, values)
+		self.changes = self.previous.diff(self.snapshot) if self.previous is not None else []
+		if self.previous is None or self.changes:
+			os.makedirs(cache_dir, exist_ok=True)
+			self.snapshot.save(path)
@@ -0,0 +1,78 @@
+"""
+Timestamps of logged records
+
+LogClock stamps the records of a logger in one of two modes:
+
+	TIMESTAMP_TEXT		the local time as text, '%Y-%m-%d %H:%M:%S', the form
+						the logs have always had
+	TIMESTAMP_EPOCH_NS	integer nanoseconds since 1970 (UTC), from the monotonic
+						clock anchored to the wall clock when the LogClock is
+						created, so a step of the wall clock (eg. an NTP
+						correction) does not move or reorder the records
+
+A CSV log in epoch_ns mode has a comment line before its header giving the
+anchor, and loaders read the integers straight into datetime64 without parsing
+any text (analysis/loading.py):
+
+	# timestamps epoch_ns, anchor 1500712345123456789 ns wall at 86400123456789 ns monotonic (2017-07-22T08:32:25.123456789 UTC)
+	DateTime, T7, T8
+	1500712345123456789,23.41,22.87
+
+	clock = LogClock(TIMESTAMP_EPOCH_NS)
+	record = [clock.now()] + readings
+"""
+
+from datetime import datetime, timezone
+import time
+
+TIMESTAMP_TEXT = 'text'
+TIMESTAMP_EPOCH_NS = 'epoch_ns'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+CLOCK_COMMENT = '# timestamps %s, anchor %d ns wall at %d ns monotonic (%s UTC)\n'
+
+
+class LogClock(object):
+	"Timestamps for records, in mode TIMESTAMP_TEXT or TIMESTAMP_EPOCH_NS"
+
+	def __init__(self, mode=TIMESTAMP_TEXT):
+		if mode not in (TIMESTAMP_TEXT, TIMESTAMP_EPOCH_NS):
+			raise ValueError('unknown timestamp mode %s' % mode)
+		self.mode = mode
+		self.anchor_ns = time.time_ns()
+		self.anchor_monotonic_ns = time.monotonic_ns()
+
+	def now(self):
+		"The timestamp of a record taken now"
+		if self.mode == TIMESTAMP_EPOCH_NS:
+			return self.epoch_ns()
+		return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+	def epoch_ns(self):
+		"Nanoseconds since 1970 from the monotonic clock and the anchor"
+		return self.anchor_ns + (time.monotonic_ns() - self.anchor_monotonic_ns)
+
+	def header(self):
+		"Line to write before the header of a CSV log, empty for text timestamps"
+		if self.mode != TIMESTAMP_EPOCH_NS:
+			return ''
+		anchor = datetime.fromtimestamp(self.anchor_ns // 1000000000, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+		anchor += '.%09d' % (self.anchor_ns % 1000000000)
+		return CLOCK_COMMENT % (self.mode, self.anchor_ns, self.anchor_monotonic_ns, anchor)
+
+
+def RecordTimes(stamps):
+	"datetime64[ns] array of record timestamps, epoch nanoseconds or text"
+	import numpy as np
+	import pandas as pd
+
+	if len(stamps) and isinstance(stamps[0], (int, np.integer)):
+		return np.array(stamps, dtype=np.int64).astype('datetime64[ns]')
+	return pd.to_datetime(stamps, format=TIMESTAMP_FORMAT).values
+
+
+def PosixSeconds(stamp):
+	"POSIX seconds of a record timestamp, epoch nanoseconds or text (local time)"
+	if isinstance(stamp, int):
+		return stamp / 1e9
+	return datetime.strptime(stamp, TIMESTAMP_FORMAT).timestamp()
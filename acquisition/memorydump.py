@@ -0,0 +1,110 @@
+"""
+Resumable memory dumps
+
+Dumping a large memory over GPIB can take a long time. MemoryDump reads it a
+block at a time and saves what has been read to a checkpoint file as it goes,
+so a run stopped by a timeout or a network problem resumes from the last saved
+block when it is restarted, rather than starting again.
+
+A reference image of the expected contents (eg. a downloaded EPROM image) may be
+given. Each block is then checked by reading a few sampled locations, and if
+they all match the block is taken from the reference. Only the blocks that
+differ are read in full. A difference at a location that is not sampled is not
+seen, compare the md5 of the result with a known one when that matters.
+
+	dump = MemoryDump(memory, 0xC000, 0x1000, '6500003-01D-Read.hex',
+		reference=LoadImage('6500003-01D.hex', 0x1000))
+	dump.run()
+	print(dump.md5)
+
+memory is any object with read_block(address, count) and read_locations(addresses),
+eg. EIP575Memory.
+"""
+
+from intelhex import IntelHex
+import hashlib
+import os
+import random
+
+DUMP_BLOCK_SIZE = 256
+DUMP_SAMPLES = 16				# locations compared with the reference in each block
+DUMP_CHECKPOINT_BLOCKS = 4		# blocks read between checkpoints
+
+
+def LoadImage(path, length):
+	"Load length bytes of an Intel hex image starting at offset 0, missing locations are 0xFF"
+	return bytes(IntelHex(path).tobinarray(start=0, size=length))
+
+
+def SaveImage(path, data):
+	"Save data as an Intel hex image at offset 0, the file is replaced in one step"
+	ih = IntelHex()
+	ih.frombytes(data)
+	temp = path + '.tmp'
+	with open(temp, 'w') as f:
+		ih.tofile(f, format='hex')
+		f.flush()
+		os.fsync(f.fileno())
+	os.replace(temp, path)
+
+
+class MemoryDump(object):
+	"Read a memory region to an Intel hex file, resuming from a checkpoint"
+
+	def __init__(self, memory, start, length, name, reference=None,
+			block_size=DUMP_BLOCK_SIZE, samples=DUMP_SAMPLES, checkpoint_blocks=DUMP_CHECKPOINT_BLOCKS):
+		if reference is not None and len(reference) < length:
+			raise ValueError('reference image is shorter than the dump')
+		self.memory = memory
+		self.start = start
+		self.length = length
+		self.name = name
+		self.checkpoint = name + '.partial'
+		self.reference = reference
+		self.block_size = block_size
+		self.samples = samples
+		self.checkpoint_blocks = checkpoint_blocks
+		self.resumed = 0		# bytes loaded from the checkpoint
+		self.verified = 0		# bytes taken from the reference after sampling
+		self.bytes_read = 0		# bytes read in full
+		self.md5 = None
+
+	def run(self, progress=None):
+		"Dump the memory, progress is called with the number of bytes done after each block"
+		data = self._resume()
+		blocks = 0
+		while len(data) < self.length:
+			offset = len(data)
+			data += self._read_block(offset, min(self.block_size, self.length - offset))
+			blocks += 1
+			if blocks % self.checkpoint_blocks == 0:
+				SaveImage(self.checkpoint, data)
+			if progress is not None:
+				progress(len(data))
+
+		SaveImage(self.name, data)
+		if os.path.exists(self.checkpoint):
+			os.remove(self.checkpoint)
+		self.md5 = hashlib.md5(data).hexdigest().upper()
+		return bytes(data)
+
+	def _resume(self):
+		if not os.path.exists(self.checkpoint):
+			return bytearray()
+		ih = IntelHex(self.checkpoint)
+		size = min(len(ih), self.length)
+		self.resumed = size
+		return bytearray(ih.tobinarray(start=0, size=size)) if size else bytearray()
+
+	def _read_block(self, offset, count):
+		address = self.start + offset
+		if self.reference is not None:
+			expected = self.reference[offset:offset+count]
+			# the same locations are sampled on every run, so a resumed dump is repeatable
+			sample = sorted(random.Random(address).sample(range(count), min(self.samples, count)))
+			values = self.memory.read_locations([address + i for i in sample])
+			if all(value == expected[i] for value, i in zip(values, sample)):
+				self.verified += count
+				return expected
+		self.bytes_read += count
+		return self.memory.read_block(address, count)
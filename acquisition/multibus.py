@@ -0,0 +1,114 @@
+"""
+Concurrent acquisition across multiple GPIB interfaces
+
+Each Bus owns one interface and a scan function that takes the readings for the
+instruments on that bus. Every cycle the runner scans all of the buses in
+parallel, one thread per bus, and merges their readings into a single time
+stamped record. The cycle time is that of the slowest bus rather than the sum
+of all of them. Records are written to a sink, CSV on stdout by default, see
+acquisition/sinks.py, and stamped by a LogClock, local time text by default,
+see acquisition/clock.py. The cycles start every period seconds on a fixed
+phase, see acquisition/schedule.py for the handling of overruns.
+
+	buses = [
+		Bus('temperature', PrologixEthernetGPIB('192.168.0.10', 3), ScanTemperatures, ['T7', 'T8']),
+		Bus('meters', PrologixEthernetGPIB('192.168.0.11', 3), ScanMeters, ['K2015A', 'K196A']),
+	]
+	MultiBusRunner(buses, period=5.0).run()
+"""
+
+from acquisition.sinks import CsvSink
+from acquisition.clock import LogClock
+from acquisition.schedule import DeadlineScheduler, OVERRUN_SKIP
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+
+
+class Bus(object):
+	"""
+	An interface and the scan run on it each cycle
+
+	setup(gpib) is called once after the interface is opened. scan(gpib) is
+	called every cycle and must return one value for each of columns.
+	"""
+
+	def __init__(self, name, gpib, scan, columns, setup=None):
+		self.name = name
+		self.gpib = gpib
+		self.scan = scan
+		self.columns = list(columns)
+		self.setup = setup
+		self.duration = 0.0		# time taken by the last scan
+
+	def open(self):
+		self.gpib.open()
+		if self.setup is not None:
+			self.setup(self.gpib)
+
+	def close(self):
+		self.gpib.close()
+
+	def run_scan(self):
+		start = time.monotonic()
+		values = list(self.scan(self.gpib))
+		self.duration = time.monotonic() - start
+		if len(values) != len(self.columns):
+			raise ValueError('%s: scan returned %d values for %d columns' % (self.name, len(values), len(self.columns)))
+		return values
+
+
+class MultiBusRunner(object):
+	"Scan several buses in parallel and merge the readings into one record stream"
+
+	def __init__(self, buses, period=0.0, sink=None, clock=None, overrun=OVERRUN_SKIP):
+		self.buses = list(buses)
+		self.period = period
+		self.sink = sink or CsvSink()
+		self.clock = clock or LogClock()
+		self.scheduler = DeadlineScheduler(period, overrun)
+		self.cycle_time = 0.0	# time taken by the last cycle
+
+	def columns(self):
+		"Column names of the merged records"
+		names = ['DateTime']
+		for bus in self.buses:
+			names.extend(bus.columns)
+		return names
+
+	def run(self, cycles=None):
+		"Run the scan cycles, forever unless a number of cycles is given"
+		with ThreadPoolExecutor(max_workers=len(self.buses)) as executor:
+			opened = []
+			try:
+				for bus in self.buses:
+					bus.open()
+					opened.append(bus)
+
+				self.sink.start(self.columns(), self.clock)
+				self.scheduler.reset()
+
+				count = 0
+				while cycles is None or count < cycles:
+					self.run_cycle(executor)
+					count += 1
+			finally:
+				self.sink.flush()
+				for bus in opened:
+					bus.close()
+
+	def run_cycle(self, executor):
+		# wait for the start of the cycle, the first starts at once
+		self.scheduler.wait()
+		start = time.monotonic()
+		record = [self.clock.now()]
+
+		# start every scan before waiting for any, so the buses run concurrently
+		futures = [executor.submit(bus.run_scan) for bus in self.buses]
+		# every scan has finished before an error is raised, so no bus is closed while in use
+		wait(futures)
+		for future in futures:
+			record.extend(future.result())
+
+		self.cycle_time = time.monotonic() - start
+		self.sink.write(record)
+		return record
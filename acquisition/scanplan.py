@@ -0,0 +1,271 @@
+"""
+Declarative scan plans
+
+A scan plan describes the instruments on an interface, how they are set up,
+the switch routes and the readings taken for each point, and the columns that
+are logged. The plan is compiled once into a command schedule: all of the
+setup commands in one batch, and each scan cycle in another batch where
+selects are merged, writes are pipelined and the only waits are for switch
+routes to settle.
+
+Plans are JSON files, see the plans directory for examples:
+
+	{
+		"host": "192.168.0.10",
+		"timeout": 3,
+		"period": 1.0,
+		"settle": 0.2,
+		"instruments": {
+			"k740": {"addr": 11, "init": ["K0X", "T0X", "G2X", "C07N2X"]},
+			"matrix": {"addr": 10, "init": ["K0X", "A0X", "RX", 0.2]},
+			"k2015": {"addr": 1, "init": [":FUNC 'VOLT:DC'", ":INIT:CONT OFF"]}
+		},
+		"points": [
+			{"column": "T7", "instrument": "k740", "write": ["C07X"]},
+			{"column": "C1", "instrument": "k2015", "query": ":READ?", "count": 4, "round": 7,
+				"route": {"switch": "matrix", "close": ["C01:1X"], "open": ["N01:1X"]}}
+		]
+	}
+
+A Keithley 705 switch can be given "type": "k705", its routes are then the
+list of crosspoints to close, eg. "route": {"switch": "matrix", "crosspoints":
+["01:2", "02:1"]}, and only the changes between routes are sent.
+
+Numbers in an init list are waits in seconds. For each point the optional
+route is closed (and the previous route opened) before reading, the write
+commands are sent, then count readings are taken, each preceded by query if
+given, and averaged. With "burst": true the instrument returns all count
+readings, separated by commas, from a single read (eg. a K2015 with
+:SAMP:COUN set in its init). "read" may be "eol" to read to LF instead of EOI. The
+optional "columns" list sets the order of the logged columns. "timestamps" may
+be "epoch_ns" to log integer nanoseconds rather than the local time as text,
+see acquisition/clock.py. "overrun" is what to do when a scan takes longer than
+the period, "skip" (the default), "catch_up" or "stretch", see
+acquisition/schedule.py; the cycle statistics are written to stderr when the
+run ends.
+"""
+
+from gpib.prologix.ethernet import PrologixEthernetGPIB, PACING_FIXED
+from acquisition.multibus import Bus, MultiBusRunner
+from instruments.k705 import K705Matrix
+from acquisition.summary import ParseReadings, ReadingSummary
+from acquisition.clock import LogClock, TIMESTAMP_TEXT
+from acquisition.schedule import OVERRUN_SKIP
+import json
+import sys
+
+
+class ScanPlanError(Exception):
+	"The scan plan is not valid"
+
+
+class Instrument(object):
+	"An instrument in a scan plan"
+
+	def __init__(self, name, config):
+		self.name = name
+		self.addr = int(config['addr'])
+		self.type = config.get('type', None)
+		self.init = list(config.get('init', []))
+
+
+class Route(object):
+	"Switch commands, or K705 crosspoints, that connect the input for a point"
+
+	def __init__(self, config):
+		self.switch = config['switch']
+		self.close = list(config.get('close', []))
+		self.open = list(config.get('open', []))
+		self.crosspoints = config.get('crosspoints', None)
+
+	def key(self):
+		if self.crosspoints is not None:
+			return (self.switch, tuple(sorted(self.crosspoints)))
+		return (self.switch, tuple(self.close))
+
+	def close_commands(self, matrices):
+		if self.crosspoints is not None:
+			cmd = matrices[self.switch].route_command(self.crosspoints)
+			return [cmd] if cmd else []
+		return self.close
+
+	def open_commands(self, matrices):
+		if self.crosspoints is not None:
+			cmd = matrices[self.switch].route_command([])
+			return [cmd] if cmd else []
+		return self.open
+
+
+class Point(object):
+	"A measurement in a scan plan, logged as one column"
+
+	def __init__(self, config, settle):
+		self.column = config['column']
+		self.instrument = config['instrument']
+		self.write = list(config.get('write', []))
+		self.query = config.get('query', None)
+		self.read = config.get('read', 'eoi')
+		self.count = int(config.get('count', 1))
+		self.burst = bool(config.get('burst', False))
+		self.digits = config.get('round', None)
+		self.route = Route(config['route']) if 'route' in config else None
+		self.settle = float(config.get('settle', settle))
+
+		if self.read not in ('eoi', 'eol'):
+			raise ScanPlanError('%s: read must be "eoi" or "eol"' % self.column)
+		if self.count < 1:
+			raise ScanPlanError('%s: count must be at least 1' % self.column)
+
+	def reads(self):
+		"Number of reads for the point, a burst returns every reading in one read"
+		return 1 if self.burst else self.count
+
+	def value(self, results):
+		readings = [v for x in results for v in ParseReadings(x)]
+		if len(readings) != self.count:
+			raise ValueError('%s: %d readings, expected %d' % (self.column, len(readings), self.count))
+		value = ReadingSummary(readings).mean
+		if self.digits is not None:
+			value = round(value, self.digits)
+		return value
+
+
+class ScanPlan(object):
+	"A parsed scan plan, see the module documentation for the format"
+
+	def __init__(self, config):
+		self.host = config.get('host', None)
+		self.port = int(config.get('port', PrologixEthernetGPIB._PORT))
+		self.timeout = config.get('timeout', 3)
+		self.period = float(config.get('period', 0.0))
+		self.pacing = config.get('pacing', PACING_FIXED)
+		self.timestamps = config.get('timestamps', TIMESTAMP_TEXT)
+		self.overrun = config.get('overrun', OVERRUN_SKIP)
+		settle = float(config.get('settle', 0.0))
+
+		self.instruments = {}
+		for name, instrument in config['instruments'].items():
+			self.instruments[name] = Instrument(name, instrument)
+
+		self.points = [Point(p, settle) for p in config['points']]
+		self.columns = list(config.get('columns', [p.column for p in self.points]))
+
+		for point in self.points:
+			if point.instrument not in self.instruments:
+				raise ScanPlanError('%s: unknown instrument %s' % (point.column, point.instrument))
+			if point.route is not None and point.route.switch not in self.instruments:
+				raise ScanPlanError('%s: unknown switch %s' % (point.column, point.route.switch))
+			if point.route is not None and point.route.crosspoints is not None and \
+					self.instruments[point.route.switch].type != 'k705':
+				raise ScanPlanError('%s: crosspoints need a k705 switch' % point.column)
+		if sorted(self.columns) != sorted(p.column for p in self.points):
+			raise ScanPlanError('columns must list every point column once')
+
+	def compile(self, gpib):
+		"Compile the plan into a schedule for the given interface"
+		return ScanSchedule(self, gpib)
+
+
+def LoadScanPlan(path):
+	"Load a scan plan from a JSON file"
+	with open(path) as f:
+		return ScanPlan(json.load(f))
+
+
+class ScanSchedule(object):
+	"The command schedule for a scan plan on one interface"
+
+	def __init__(self, plan, gpib):
+		self.plan = plan
+		self.gpib = gpib
+		self.setup_batch = self._compile_setup()
+		self.scan_batch = self._compile_scan()
+		# position of each point in the logged columns
+		self.order = [[p.column for p in plan.points].index(c) for c in plan.columns]
+
+	def setup(self):
+		"Clear the interface and configure the instruments"
+		self.setup_batch.execute()
+
+	def scan(self):
+		"Run one scan cycle, returns the values in column order"
+		results = self.scan_batch.execute()
+		values = []
+		i = 0
+		for point in self.plan.points:
+			values.append(point.value(results[i:i+point.reads()]))
+			i += point.reads()
+		return [values[i] for i in self.order]
+
+	def _compile_setup(self):
+		batch = self.gpib.batch()
+		batch.interface_clear()
+		for instrument in self.plan.instruments.values():
+			if not instrument.init:
+				continue
+			batch.select(instrument.addr)
+			for cmd in instrument.init:
+				if isinstance(cmd, str):
+					batch.write(cmd)
+				else:
+					batch.wait(cmd)
+		return batch
+
+	def _compile_scan(self):
+		instruments = self.plan.instruments
+		batch = self.gpib.batch()
+		routed = None
+
+		# K705 switch state while compiling, the cycle starts and ends with all crosspoints open
+		matrices = {}
+		for name, instrument in instruments.items():
+			if instrument.type == 'k705':
+				matrices[name] = K705Matrix(None, instrument.addr)
+
+		for point in self.plan.points:
+			route = point.route
+			if (route and route.key()) != (routed and routed.key()):
+				# moving between crosspoint routes on one K705 only sends the difference
+				diff = route is not None and routed is not None and route.switch == routed.switch \
+					and route.crosspoints is not None and routed.crosspoints is not None
+				if routed is not None and not diff:
+					self._write(batch, instruments[routed.switch], routed.open_commands(matrices))
+				if route is not None:
+					self._write(batch, instruments[route.switch], route.close_commands(matrices))
+					if point.settle:
+						batch.wait(point.settle)
+				routed = route
+
+			batch.select(instruments[point.instrument].addr)
+			for cmd in point.write:
+				batch.write(cmd)
+			for i in range(point.reads()):
+				if point.query is not None:
+					batch.write(point.query)
+				if point.read == 'eol':
+					batch.readeol()
+				else:
+					batch.read()
+
+		# leave the switch open at the end of the cycle
+		if routed is not None:
+			self._write(batch, instruments[routed.switch], routed.open_commands(matrices))
+		return batch
+
+	def _write(self, batch, instrument, commands):
+		if commands:
+			batch.select(instrument.addr)
+			for cmd in commands:
+				batch.write(cmd)
+
+
+def RunScanPlan(plan, cycles=None, sink=None):
+	"Open the interface for the plan and log the scans to sink (CSV on stdout by default) until an error occurs"
+	gpib = PrologixEthernetGPIB(plan.host, plan.timeout, plan.port, plan.pacing)
+	schedule = plan.compile(gpib)
+	bus = Bus(plan.host, gpib, lambda gpib: schedule.scan(), plan.columns, lambda gpib: schedule.setup())
+	runner = MultiBusRunner([bus], plan.period, sink, LogClock(plan.timestamps), plan.overrun)
+	try:
+		runner.run(cycles)
+	finally:
+		sys.stderr.write('%s\n' % runner.scheduler.stats)
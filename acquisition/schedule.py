@@ -0,0 +1,140 @@
+"""
+Pacing of the measurement cycles
+
+The loggers used to sleep for what was left of the period after each cycle,
+measured with the wall clock, so every cycle's overhead and any step of the
+clock (eg. an NTP correction) shifted the following cycles. DeadlineScheduler
+keeps the cycles on a fixed phase: cycle n starts at first + n * period, from
+the monotonic clock, however long each cycle took.
+
+	scheduler = DeadlineScheduler(MEASUREMENT_DELAY, OVERRUN_SKIP)
+	while True:
+		scheduler.wait()			# returns at the start of each cycle
+		...take the readings...
+	sys.stderr.write('%s\n' % scheduler.stats)
+
+A cycle that runs past the start of the next one is an overrun, handled by the
+policy:
+
+	OVERRUN_SKIP		wait for the next deadline still to come, the missed
+						cycles are counted as skipped, the phase is kept
+	OVERRUN_CATCH_UP	start the missed cycles at once, one after another,
+						until back on schedule, so the number of cycles is kept
+	OVERRUN_STRETCH		start the next cycle at once and continue the phase
+						from there, as the loggers did before
+
+A period of 0 runs the cycles one after another with no waits.
+
+The stats give the jitter (how late each cycle started after its deadline),
+the duration of the cycles against the period, and the overruns.
+"""
+
+import math
+import time
+
+OVERRUN_SKIP = 'skip'
+OVERRUN_CATCH_UP = 'catch_up'
+OVERRUN_STRETCH = 'stretch'
+
+
+class CycleStats(object):
+	"Jitter, duration and overruns of the cycles run by a DeadlineScheduler"
+
+	def __init__(self, period):
+		self.period = period
+		self.cycles = 0
+		self.overruns = 0
+		self.skipped = 0			# cycles missed by OVERRUN_SKIP
+		self.jitter = 0.0			# of the last cycle, seconds after its deadline
+		self.max_jitter = 0.0
+		self.duration = 0.0			# of the last complete cycle
+		self.max_duration = 0.0
+		self._jitter_sum = 0.0
+		self._jitter_sumsq = 0.0
+		self._duration_sum = 0.0
+		self._durations = 0
+
+	def add_start(self, jitter):
+		self.cycles += 1
+		self.jitter = jitter
+		self.max_jitter = max(self.max_jitter, jitter)
+		self._jitter_sum += jitter
+		self._jitter_sumsq += jitter * jitter
+
+	def add_duration(self, duration):
+		self._durations += 1
+		self.duration = duration
+		self.max_duration = max(self.max_duration, duration)
+		self._duration_sum += duration
+
+	def mean_jitter(self):
+		return self._jitter_sum / self.cycles if self.cycles else 0.0
+
+	def rms_jitter(self):
+		return math.sqrt(self._jitter_sumsq / self.cycles) if self.cycles else 0.0
+
+	def mean_duration(self):
+		return self._duration_sum / self._durations if self._durations else 0.0
+
+	def utilisation(self):
+		"Mean duration of the cycles as a fraction of the period"
+		return self.mean_duration() / self.period if self.period else 0.0
+
+	def __repr__(self):
+		return ('%d cycles of %.3f sec: duration mean %.3f max %.3f (%.0f%% of period), '
+			'jitter mean %.1f rms %.1f max %.1f msec, %d overruns, %d skipped') % (
+			self.cycles, self.period, self.mean_duration(), self.max_duration, self.utilisation() * 100,
+			self.mean_jitter() * 1e3, self.rms_jitter() * 1e3, self.max_jitter * 1e3,
+			self.overruns, self.skipped)
+
+
+class DeadlineScheduler(object):
+	"Start cycles every period seconds on a fixed phase, handling overruns by policy"
+
+	def __init__(self, period, policy=OVERRUN_SKIP, clock=time.monotonic, sleep=time.sleep):
+		if policy not in (OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_STRETCH):
+			raise ValueError('unknown overrun policy %s' % policy)
+		self.period = period
+		self.policy = policy
+		self.stats = CycleStats(period)
+		self.deadline = None		# start time the current cycle was scheduled for
+		self._clock = clock
+		self._sleep = sleep
+		self._started = None
+
+	def wait(self):
+		"End the current cycle and wait for the start of the next, returns its deadline"
+		now = self._clock()
+		if self.deadline is None:
+			# the first cycle starts now and sets the phase
+			self.deadline = now
+		else:
+			self.stats.add_duration(now - self._started)
+			deadline = self.deadline + self.period
+			if self.period <= 0:
+				deadline = now
+			elif now > deadline:
+				self.stats.overruns += 1
+				if self.policy == OVERRUN_SKIP:
+					missed = int((now - deadline) // self.period) + 1
+					self.stats.skipped += missed
+					deadline += missed * self.period
+				elif self.policy == OVERRUN_STRETCH:
+					deadline = now
+			self.deadline = deadline
+
+		# sleep may return early, so wait until the deadline has passed
+		while True:
+			now = self._clock()
+			if now >= self.deadline:
+				break
+			self._sleep(self.deadline - now)
+
+		self._started = now
+		self.stats.add_start(now - self.deadline)
+		return self.deadline
+
+	def reset(self):
+		"Start again with a new phase at the next wait, eg. after the logger has been restarted"
+		self.deadline = None
+		self._started = None
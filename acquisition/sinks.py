@@ -0,0 +1,201 @@
+"""
+Output sinks for logged records
+
+The acquisition runners pass every record (a timestamp followed by the readings)
+to a sink. start(columns, clock) is called each time a run starts, with the
+LogClock of the timestamps (acquisition/clock.py), write(record) for
+every record, and flush() when a run ends, eg. on a timeout before the run is
+restarted. The sink is closed by its owner, so one sink can span restarts.
+
+CsvSink writes the text rows the loggers have always produced. The batched
+sinks collect records in memory and write them as typed columns, DateTime as a
+datetime64 and every reading as a float64, once flush_rows records have been
+collected or flush_interval seconds have passed:
+
+	sink = ParquetSink('logs/two-in-two-out', flush_rows=600, flush_interval=300)
+	try:
+		RunScanPlan(plan, sink=sink)
+	finally:
+		sink.close()
+
+BinaryLogSink appends to a fixed record binary log, see acquisition/binlog.py.
+
+The Parquet and HDF5 sinks need pandas, and pyarrow or PyTables respectively.
+"""
+
+from acquisition.clock import RecordTimes, PosixSeconds
+from abc import ABCMeta, abstractmethod
+from datetime import datetime
+import time
+import sys
+import os
+
+
+class CsvSink(object):
+	"CSV rows on a stream (stdout by default), flushed every flush_rows records"
+
+	def __init__(self, stream=None, flush_rows=1, header=True):
+		self.stream = stream or sys.stdout
+		self.flush_rows = flush_rows
+		self.header = header
+		self._pending = 0
+
+	def start(self, columns, clock=None):
+		if self.header:
+			if clock is not None:
+				self.stream.write(clock.header())
+			self.write(columns)
+
+	def write(self, record):
+		self.stream.write(','.join(str(x) for x in record))
+		self.stream.write('\n')
+		self._pending += 1
+		if self._pending >= self.flush_rows:
+			self.flush()
+
+	def flush(self):
+		self.stream.flush()
+		self._pending = 0
+
+	def close(self):
+		self.flush()
+
+
+class BatchedSink(metaclass=ABCMeta):
+	"""
+	Base of the columnar sinks, collects records and writes them in batches
+
+	Derived classes implement _write_frame(frame) to write a pandas DataFrame
+	and may override close().
+	"""
+
+	def __init__(self, flush_rows=1000, flush_interval=60.0):
+		self.flush_rows = flush_rows
+		self.flush_interval = flush_interval
+		self.columns = None
+		self._records = []
+		self._flush_time = time.monotonic()
+
+	def start(self, columns, clock=None):
+		columns = list(columns)
+		if self.columns is not None and columns != self.columns:
+			raise ValueError('columns differ from those already written')
+		self.columns = columns
+
+	def write(self, record):
+		self._records.append(record)
+		if (len(self._records) >= self.flush_rows or
+				time.monotonic() - self._flush_time >= self.flush_interval):
+			self.flush()
+
+	def flush(self):
+		self._flush_time = time.monotonic()
+		if not self._records:
+			return
+		records = self._records
+		self._records = []
+		self._write_frame(self._frame(records))
+
+	def close(self):
+		self.flush()
+
+	def _frame(self, records):
+		import numpy as np
+		import pandas as pd
+
+		data = {self.columns[0]: RecordTimes([r[0] for r in records])}
+		values = np.array([r[1:] for r in records], dtype=np.float64)
+		for i, name in enumerate(self.columns[1:]):
+			data[name] = values[:, i]
+		return pd.DataFrame(data)
+
+	@abstractmethod
+	def _write_frame(self, frame):
+		"Write a batch of records, a pandas DataFrame"
+		pass
+
+
+class ParquetSink(BatchedSink):
+	"""
+	Parquet files in the directory path, each batch is a complete part file
+
+	Every flush writes a new part file, named after the time the sink wrote its
+	first batch (to the microsecond), the process and the number of the batch,
+	so neither a restarted logger nor another sink writing to the same directory
+	overwrites earlier data. A part is written under a hidden name and renamed
+	once complete, so a crash loses at most the unflushed records.
+	pandas.read_parquet(path) reads the whole directory as one table.
+	"""
+
+	def __init__(self, path, flush_rows=1000, flush_interval=60.0):
+		BatchedSink.__init__(self, flush_rows, flush_interval)
+		self.path = path
+		self.filename = None		# the last part written
+		self._prefix = None
+		self._parts = 0
+
+	def _write_frame(self, frame):
+		import pyarrow
+		import pyarrow.parquet
+
+		table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+		if self._prefix is None:
+			os.makedirs(self.path, exist_ok=True)
+			self._prefix = 'part-%s-%d' % (datetime.now().strftime('%Y%m%d-%H%M%S-%f'), os.getpid())
+		self._parts += 1
+		name = '%s-%05d.parquet' % (self._prefix, self._parts)
+		# readers of the directory skip names starting with '.'
+		temp = os.path.join(self.path, '.' + name)
+		pyarrow.parquet.write_table(table, temp)
+		self.filename = os.path.join(self.path, name)
+		os.replace(temp, self.filename)
+
+
+class HDF5Sink(BatchedSink):
+	"""
+	Table in an HDF5 file, each batch is appended to key
+
+	The file is only open while a batch is appended, so it can be read between
+	flushes and a crash loses at most the unflushed records.
+	"""
+
+	def __init__(self, path, key='log', flush_rows=1000, flush_interval=60.0):
+		BatchedSink.__init__(self, flush_rows, flush_interval)
+		self.path = path
+		self.key = key
+
+	def _write_frame(self, frame):
+		import pandas as pd
+
+		with pd.HDFStore(self.path, mode='a') as store:
+			store.append(self.key, frame, format='table', index=False)
+
+
+class BinaryLogSink(object):
+	"Fixed record binary log, records are durable every commit_rows records or commit_interval seconds"
+
+	def __init__(self, path, commit_rows=60, commit_interval=10.0):
+		self.path = path
+		self.commit_rows = commit_rows
+		self.commit_interval = commit_interval
+		self._writer = None
+
+	def start(self, columns, clock=None):
+		from acquisition.binlog import BinaryLogWriter
+
+		if self._writer is None:
+			self._writer = BinaryLogWriter(self.path, columns, self.commit_rows, self.commit_interval)
+		elif list(columns) != self._writer.columns:
+			raise ValueError('columns differ from those already written')
+
+	def write(self, record):
+		self._writer.write([PosixSeconds(record[0])] + list(record[1:]))
+
+	def flush(self):
+		if self._writer is not None:
+			self._writer.commit()
+
+	def close(self):
+		if self._writer is not None:
+			self._writer.close()
+			self._writer = None
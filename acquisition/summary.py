@@ -0,0 +1,34 @@
+"""
+Statistics over a block of readings
+
+Burst and buffered reads return many readings in one transfer, the block is
+summarised on the host rather than taking one reading per bus transaction.
+"""
+
+import math
+
+
+def ParseReadings(text):
+	"Convert a comma separated block of readings to a list of floats"
+	return [float(x) for x in text.split(',')]
+
+
+class ReadingSummary(object):
+	"Count, mean, sample standard deviation, minimum and maximum of a block of readings"
+
+	def __init__(self, values):
+		values = list(values)
+		if not values:
+			raise ValueError('no readings to summarise')
+		self.count = len(values)
+		self.mean = math.fsum(values) / self.count
+		if self.count > 1:
+			self.stdev = math.sqrt(math.fsum((x - self.mean) ** 2 for x in values) / (self.count - 1))
+		else:
+			self.stdev = 0.0
+		self.minimum = float(min(values))
+		self.maximum = float(max(values))
+
+	def __repr__(self):
+		return 'ReadingSummary(count=%d, mean=%r, stdev=%r, min=%r, max=%r)' % (
+			self.count, self.mean, self.stdev, self.minimum, self.maximum)
@@ -0,0 +1,141 @@
+"""
+Synchronised sampling with a group execute trigger
+
+Each instrument is set up to take a reading on a group execute trigger (GET).
+Every sample arms the instruments, fires one GET addressed to all of them so
+the conversions run at the same moment, waits for the conversion time and then
+fetches each result. The integration time is paid once per sample rather than
+once per instrument. The samples are sent as one batch, and each wait starts
+once the readings of the previous sample have been received, when the trigger
+queued behind them has reached the bus.
+
+	trigger = GroupTrigger(gpib, [K2015GroupTriggered(1), K196GroupTriggered(2)])
+	trigger.setup()
+	trigger.measure()					# the conversion time of each meter
+	k2015, k196 = trigger.sample(4)		# 4 readings from each meter
+	k2015, k196 = trigger.sample([4, 10])	# 4 from the K2015 and 10 from the K196
+
+With a count for each instrument, an instrument is only triggered until it has
+its readings, and the wait after each trigger is the longest conversion time of
+the instruments triggered.
+"""
+
+from acquisition.summary import ParseReadings
+import time
+
+
+class TriggeredInstrument(object):
+	"""
+	How to drive one instrument from a group execute trigger
+
+	setup commands configure the trigger source, arm commands are sent before
+	every trigger, and the reading is fetched by writing query (if any) and then
+	reading the response. conversion_time is the time the instrument needs for
+	its reading after a trigger, set or measured by GroupTrigger.measure().
+	"""
+
+	def __init__(self, addr, setup, arm=(), query=None, conversion_time=0.0):
+		self.addr = int(addr)
+		self.setup = list(setup)
+		self.arm = list(arm)
+		self.query = query
+		self.conversion_time = conversion_time
+
+
+class GroupTrigger(object):
+	"Trigger several instruments together and fetch their readings"
+
+	def __init__(self, gpib, instruments, conversion_time=0.0):
+		self.gpib = gpib
+		self.instruments = list(instruments)
+		self.conversion_time = conversion_time
+		self._batches = {}
+
+	def setup(self):
+		"Configure each instrument to take a reading on a group execute trigger"
+		with self.gpib.batch() as batch:
+			for instrument in self.instruments:
+				batch.select(instrument.addr)
+				for cmd in instrument.setup:
+					batch.write(cmd)
+
+	def sample(self, count=1):
+		"""
+		Take count synchronised samples, or a count for each instrument, returns a
+		list of float readings for each instrument. An instrument taking a burst per
+		trigger contributes all of its readings
+		"""
+		counts = self._counts(count)
+		compiled = self._batches.get(counts)
+		if compiled is None:
+			compiled = self._batches[counts] = self._compile(counts)
+		batch, order = compiled
+		results = batch.execute()
+
+		readings = [[] for instrument in self.instruments]
+		for i, x in zip(order, results):
+			readings[i].extend(ParseReadings(x))
+		return readings
+
+	def wait_time(self, count=1):
+		"Total of the waits for conversions in a sample of count, or a count for each instrument"
+		counts = self._counts(count)
+		return sum(self._wait(counts, i) for i in range(max(counts)))
+
+	def measure(self, repeats=5):
+		"""
+		Measure the conversion time of each instrument and use it, returns them in
+		order. The instruments hold off the bus until their reading is ready, so
+		this is the longest time from a trigger until the reading has been fetched,
+		less the round trip of the interface.
+		"""
+		rtt = self.gpib.calibrate()
+		for instrument in self.instruments:
+			instrument.conversion_time = 0.0
+			batch = self.gpib.batch()
+			self._add_sample(batch, [instrument], 0.0)
+			times = []
+			for i in range(repeats):
+				start = time.monotonic()
+				batch.execute()
+				times.append(time.monotonic() - start)
+			instrument.conversion_time = max(0.0, max(times) - rtt)
+		self._batches = {}
+		return [instrument.conversion_time for instrument in self.instruments]
+
+	def _counts(self, count):
+		if isinstance(count, int):
+			return (count,) * len(self.instruments)
+		if len(count) != len(self.instruments):
+			raise ValueError('%d counts for %d instruments' % (len(count), len(self.instruments)))
+		return tuple(count)
+
+	def _wait(self, counts, i):
+		# the longest conversion of the instruments taking a reading on trigger i
+		times = [instrument.conversion_time for instrument, c in zip(self.instruments, counts) if c > i]
+		return max([self.conversion_time] + times)
+
+	def _compile(self, counts):
+		# the batch, and the instrument of each reply
+		batch = self.gpib.batch()
+		order = []
+		for i in range(max(counts)):
+			triggered = [instrument for instrument, c in zip(self.instruments, counts) if c > i]
+			self._add_sample(batch, triggered, self._wait(counts, i))
+			order.extend(self.instruments.index(instrument) for instrument in triggered)
+		return batch, order
+
+	def _add_sample(self, batch, instruments, wait):
+		for instrument in instruments:
+			if instrument.arm:
+				batch.select(instrument.addr)
+				for cmd in instrument.arm:
+					batch.write(cmd)
+		batch.trigger([instrument.addr for instrument in instruments])
+		if wait:
+			batch.wait(wait)
+		for instrument in instruments:
+			batch.select(instrument.addr)
+			if instrument.query is not None:
+				batch.write(instrument.query)
+			batch.read()
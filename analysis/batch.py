@@ -0,0 +1,142 @@
+"""
+Rendering the reports of many logs at once
+
+Each plot script renders one log to <log>.pdf. BatchReport runs a layout over
+a set of logs in a pool of worker processes, one per core. Each worker imports
+pandas, matplotlib and the analysis modules once, then runs the layout script
+for every log it is given, so only the parsing and drawing are repeated. Logs
+whose PDF is newer than the log are skipped.
+
+	paths = FindLogs('logs/log-2017-07-*.csv')
+	for result in BatchReport(paths, 'plot_five_in_tc'):
+		print(result)
+
+A layout is the name of one of the plot scripts (LAYOUTS) or the path of
+another script that takes the log as sys.argv[1].
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import glob
+import os
+import re
+import runpy
+import sys
+import time
+
+LAYOUTS = {
+	'plot': 'plot.py',
+	'plot_five_in_tc': 'plot_five_in_tc.py',
+	'plot_twoin_twoout': 'plot_twoin_twoout.py',
+}
+
+LOG_EXTENSIONS = ('.csv', '.bin', '.h5', '.hdf5')
+# written next to the logs by the plot scripts and the pyramid of plot_range.py
+OUTPUT_SUFFIXES = ('.cache.bin', '.tempco.csv')
+OUTPUT_PATTERN = re.compile(r'\.pyramid-\d+s\.bin$')
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def LayoutScript(layout):
+	"Path of the script for a layout name, or the layout itself if it is a path"
+	if layout in LAYOUTS:
+		return os.path.join(_ROOT, LAYOUTS[layout])
+	if not os.path.isfile(layout):
+		raise ValueError('unknown layout %s, expected one of %s or a script' % (layout, ', '.join(sorted(LAYOUTS))))
+	return os.path.abspath(layout)
+
+
+def FindLogs(pattern):
+	"The logs in a directory, or matching a glob pattern, sorted by name"
+	if os.path.isdir(pattern):
+		pattern = os.path.join(pattern, '*')
+	return sorted(path for path in glob.glob(pattern)
+		if os.path.isfile(path) and path.endswith(LOG_EXTENSIONS) and not IsOutput(path))
+
+
+def IsOutput(path):
+	"True if path is a file written next to a log rather than a log"
+	return path.endswith(OUTPUT_SUFFIXES) or OUTPUT_PATTERN.search(path) is not None
+
+
+def ReportPath(path):
+	return path + '.pdf'
+
+
+def IsStale(path):
+	"True if the report of a log is missing or older than the log"
+	report = ReportPath(path)
+	return not os.path.exists(report) or os.path.getmtime(report) < os.path.getmtime(path)
+
+
+class ReportResult(object):
+	"Outcome of rendering one log, error is the exception text if it failed"
+
+	def __init__(self, path, seconds=0.0, skipped=False, error=None):
+		self.path = path
+		self.seconds = seconds
+		self.skipped = skipped
+		self.error = error
+
+	def __repr__(self):
+		if self.skipped:
+			return '%s: up to date' % self.path
+		if self.error is not None:
+			return '%s: failed, %s' % (self.path, self.error)
+		return '%s: %.1f sec' % (self.path, self.seconds)
+
+
+def _InitWorker():
+	# the analysis modules are imported from the root however the worker was started
+	if _ROOT not in sys.path:
+		sys.path.insert(0, _ROOT)
+	# import once per worker, the layout scripts then find them in sys.modules
+	import matplotlib
+	matplotlib.use('Agg')
+	import matplotlib.pyplot
+	import pandas
+	import analysis.cache
+	import analysis.decimate
+	import analysis.tempco
+
+
+def RenderReport(script, path):
+	"Run a layout script on one log in this process, returns a ReportResult"
+	import matplotlib.pyplot as plt
+
+	start = time.monotonic()
+	argv = sys.argv
+	sys.argv = [script, path]
+	try:
+		runpy.run_path(script, run_name='__main__')
+	except Exception as e:
+		return ReportResult(path, time.monotonic() - start, error='%s: %s' % (type(e).__name__, e))
+	finally:
+		sys.argv = argv
+		plt.close('all')		# the scripts draw on figure(1), start each log afresh
+	return ReportResult(path, time.monotonic() - start)
+
+
+def BatchReport(paths, layout, processes=None, force=False):
+	"""
+	Render the report of every log in paths with a layout, yields a ReportResult
+	for each log as it is finished. Up to date logs are skipped unless force.
+	"""
+	script = LayoutScript(layout)
+	pending = []
+	for path in paths:
+		if force or IsStale(path):
+			pending.append(path)
+		else:
+			yield ReportResult(path, skipped=True)
+	if not pending:
+		return
+
+	# the largest first, so a long log is not left running on its own at the end
+	pending.sort(key=os.path.getsize, reverse=True)
+	processes = min(processes or os.cpu_count() or 1, len(pending))
+	with ProcessPoolExecutor(max_workers=processes, initializer=_InitWorker) as pool:
+		futures = [pool.submit(RenderReport, script, path) for path in pending]
+		for future in as_completed(futures):
+			yield future.result()
@@ -0,0 +1,155 @@
+"""
+Incremental loading of a growing CSV log
+
+Plots are regenerated from logs that are still being written. CachedLog keeps a
+cache next to the log holding the parsed columns, their moving averages, and
+the byte offset reached in the log. On the next run only the rows appended
+since are parsed, and their moving averages are computed from the tail of the
+cached values, so a refresh costs the same however long the log has become.
+
+	log = CachedLog(sourceFile, ['T7', 'T8', 'C1'], windows=[300])
+	sourceData = log.update()
+	C1V_Y_avg = sourceData[AverageColumn('C1', 300)]
+
+The cache is two files: <log>.cache.bin, a binary log (acquisition/binlog.py)
+of the parsed rows that is extended in place and memory mapped when read, and
+<log>.cache.json with the offset. If the log is replaced, truncated or the
+columns change, the cache is rebuilt.
+"""
+
+from acquisition.binlog import BinaryLogWriter, BinaryLog
+from analysis.loading import LoadLog, ReadCsvHeader, ReadCsvBlocks, CsvHeaderNames, ParseCsvRows, CSV_CHUNK_ROWS
+
+import numpy as np
+import pandas as pd
+import json
+import os
+
+CACHE_VERSION = 1
+
+# the columns and moving average windows each plot layout loads, tools that
+# read a log alongside the plots use the same so they share its cache
+LAYOUT_COLUMNS = {
+	'plot': (['TWindow', 'TRoom', 'K2015A', 'K196A'], [60]),
+	'plot_five_in_tc': (['T7', 'T8', 'C1', 'C2', 'C3', 'C4', 'C5'], [300]),
+	'plot_twoin_twoout': (['TWindow', 'TRoom', 'K2015A_EDC', 'K196A_EDC', 'K2015A_JVR', 'K196A_JVR'], [60]),
+}
+
+
+def AverageColumn(name, window):
+	"Name of the moving average column of name"
+	return '%s SMA(%d)' % (name, window)
+
+
+def LoadCachedLog(path, columns, windows=()):
+	"""
+	Load a log with the moving averages of columns, as with CachedLog.update
+
+	Only CSV files are cached. Binary logs, HDF5 and Parquet (a directory or
+	.parquet file) are loaded in full and the averages calculated.
+	"""
+	extension = os.path.splitext(path)[1]
+	if os.path.isfile(path) and extension not in ('.bin', '.h5', '.hdf5', '.parquet'):
+		return CachedLog(path, columns, windows).update()
+
+	data = LoadLog(path, columns)
+	for window in windows:
+		for name in columns:
+			data[AverageColumn(name, window)] = data[name].rolling(window=window).mean()
+	return data
+
+
+class CachedLog(object):
+	"A CSV log with its parsed columns and moving averages cached"
+
+	def __init__(self, path, columns, windows=(), chunksize=CSV_CHUNK_ROWS):
+		self.path = path
+		self.columns = list(columns)
+		self.windows = list(windows)
+		self.chunksize = chunksize
+		self.cache_path = path + '.cache.bin'
+		self.state_path = path + '.cache.json'
+
+	def update(self):
+		"Parse any rows appended to the log, returns a DataFrame of all of the rows"
+		with open(self.path, 'rb') as f:
+			header = ReadCsvHeader(f)
+			state = self._load_state(header)
+			if state is None:
+				state = self._reset(header)
+			f.seek(state['offset'])
+			# in blocks of complete lines, a partly written line is read next time
+			for block in ReadCsvBlocks(f, self.chunksize):
+				rows = ParseCsvRows(block, header, self.columns)
+				if len(rows):
+					self._append(rows, state)
+				state['offset'] += len(block)
+				self._save_state(state)
+
+		return self.frame()
+
+	def frame(self):
+		"DataFrame of the cached rows, the timestamp, columns and the moving averages"
+		log = BinaryLog(self.cache_path)
+		data = {log.columns[0]: log.times()}
+		for name in log.columns[1:]:
+			data[name] = log.records[name]
+		return pd.DataFrame(data)
+
+	def _cache_columns(self, header):
+		names = [CsvHeaderNames(header)[0]] + self.columns
+		return names + [AverageColumn(name, window) for window in self.windows for name in self.columns]
+
+	def _load_state(self, header):
+		if not (os.path.exists(self.state_path) and os.path.exists(self.cache_path)):
+			return None
+		with open(self.state_path) as f:
+			state = json.load(f)
+		if (state.get('version') != CACHE_VERSION or state['header'] != header.decode('utf-8') or
+				state['columns'] != self._cache_columns(header) or state['offset'] > os.path.getsize(self.path)):
+			return None
+		if len(BinaryLog(self.cache_path)) != state['rows']:
+			return None		# interrupted while the cache was updated
+		return state
+
+	def _reset(self, header):
+		if os.path.exists(self.cache_path):
+			os.remove(self.cache_path)
+		BinaryLogWriter(self.cache_path, self._cache_columns(header)).close()
+		return {
+			'version': CACHE_VERSION,
+			'header': header.decode('utf-8'),
+			'columns': self._cache_columns(header),
+			'offset': 0,
+			'rows': 0,
+		}
+
+	def _save_state(self, state):
+		temp = self.state_path + '.tmp'
+		with open(temp, 'w') as f:
+			json.dump(state, f)
+		os.replace(temp, self.state_path)
+
+	def _append(self, rows, state):
+		columns = state['columns']
+		writer = BinaryLogWriter(self.cache_path, columns)
+		try:
+			records = np.zeros(len(rows), dtype=writer.dtype)
+			# naive timestamps are kept as they are, in seconds from 1970
+			records[columns[0]] = rows[columns[0]].values.astype('datetime64[ns]').astype(np.int64) / 1e9
+			for name in self.columns:
+				records[name] = rows[name].values
+
+			# moving averages continue from the last window - 1 cached values
+			cached = BinaryLog(self.cache_path).records
+			for window in self.windows:
+				for name in self.columns:
+					tail = cached[name][max(0, len(cached) - (window - 1)):]
+					values = np.concatenate((tail, records[name]))
+					average = pd.Series(values).rolling(window=window).mean().values
+					records[AverageColumn(name, window)] = average[len(tail):]
+
+			writer.write_many(records)
+		finally:
+			writer.close()
+		state['rows'] += len(records)
@@ -0,0 +1,126 @@
+"""
+Decimation of plotted data to the output resolution
+
+A multi-week log at a 1 second cadence has millions of points, far more than
+the pixels of the axes they are drawn on. Before plotting, the points are
+reduced to what can be seen:
+
+	MinMaxIndices	for time series, the first, minimum and maximum point of every
+					pixel column, so spikes and the envelope are kept exactly
+	LttbIndices		Largest Triangle Three Buckets, a smoother line with one point
+					per bucket
+	PathIndices		for X/Y lines and scatters, drops points that fall in the same
+					pixel as the point before
+
+Each returns the indices of the points to keep, so the same selection can be
+applied to the x values, the y values and anything else (eg. scatter colours).
+
+	x, y = DecimateSeries(axis, date_X, k2015aV_Y)
+	axis.plot(x, y, "b-", linewidth=0.1)
+"""
+
+import numpy as np
+
+OVERSAMPLE = 2		# buckets per pixel, keeps the drawn lines identical after antialiasing
+
+
+def AxisPixels(axis):
+	"Width and height of the axes in output pixels, at the figure dpi"
+	bbox = axis.get_window_extent()
+	return max(1, int(bbox.width)), max(1, int(bbox.height))
+
+
+def MinMaxIndices(y, buckets):
+	"Indices of the first, last, minimum and maximum points of each of buckets equal buckets"
+	y = np.asarray(y, dtype=np.float64)
+	n = len(y)
+	if n <= 4 * buckets:
+		return np.arange(n)
+
+	size = -(-n // buckets)
+	full = n // size * size
+	# NaN (eg. the start of a moving average) is never chosen unless the whole bucket is NaN
+	low = np.where(np.isnan(y), np.inf, y)
+	high = np.where(np.isnan(y), -np.inf, y)
+	starts = np.arange(0, full, size)
+	keep = [
+		starts,
+		low[:full].reshape(-1, size).argmin(axis=1) + starts,
+		high[:full].reshape(-1, size).argmax(axis=1) + starts,
+		[n - 1],
+	]
+	if full < n:
+		keep += [[full, full + low[full:].argmin(), full + high[full:].argmax()]]
+	return np.unique(np.concatenate(keep))
+
+
+def LttbIndices(x, y, threshold):
+	"Indices of threshold points chosen by Largest Triangle Three Buckets"
+	x = np.asarray(x).astype(np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	n = len(y)
+	if threshold >= n or threshold < 3:
+		return np.arange(n)
+
+	edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+	keep = np.empty(threshold, dtype=np.int64)
+	keep[0] = 0
+	keep[-1] = n - 1
+	a = 0
+	for i in range(threshold - 2):
+		start, end = edges[i], edges[i+1]
+		# average of the next bucket is the third point of the triangle
+		next_end = edges[i+2] if i + 2 < len(edges) else n
+		cx = x[end:next_end].mean()
+		cy = np.nanmean(y[end:next_end]) if np.any(~np.isnan(y[end:next_end])) else y[a]
+		area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+		a = start + (int(np.nanargmax(area)) if np.any(~np.isnan(area)) else 0)
+		keep[i+1] = a
+	return keep
+
+
+def PathIndices(x, y, width, height):
+	"Indices of points in a different pixel, of a width x height grid over the data, to the point before"
+	x = np.asarray(x, dtype=np.float64)
+	y = np.asarray(y, dtype=np.float64)
+	if len(x) <= width + height:
+		return np.arange(len(x))
+
+	def cells(values, count):
+		low, high = np.nanmin(values), np.nanmax(values)
+		scale = (count - 1) / (high - low) if high > low else 0.0
+		return np.nan_to_num((values - low) * scale, nan=-1).astype(np.int64)
+
+	cell = cells(x, width) * (height + 1) + cells(y, height)
+	keep = np.ones(len(cell), dtype=bool)
+	keep[1:] = cell[1:] != cell[:-1]
+	keep[-1] = True
+	return np.flatnonzero(keep)
+
+
+def DecimateSeries(axis, x, y, method='minmax'):
+	"Decimate a time series to the width of the axis, returns the x and y to plot"
+	width = AxisPixels(axis)[0] * OVERSAMPLE
+	if method == 'lttb':
+		index = LttbIndices(np.asarray(x).astype('datetime64[ns]').astype(np.int64) if _is_time(x) else x, y, width * 2)
+	else:
+		index = MinMaxIndices(y, width)
+	return _take(x, index), _take(y, index)
+
+
+def DecimatePath(axis, x, y, *others):
+	"Decimate an X/Y line or scatter to the pixels of the axis, returns x, y and the others"
+	width, height = AxisPixels(axis)
+	index = PathIndices(x, y, width * OVERSAMPLE, height * OVERSAMPLE)
+	return tuple(_take(values, index) for values in (x, y) + others)
+
+
+def _is_time(values):
+	return np.issubdtype(np.asarray(values).dtype, np.datetime64)
+
+
+def _take(values, index):
+	# keeps pandas Series as Series (with their index) so matplotlib handles dates the same way
+	if hasattr(values, 'iloc'):
+		return values.iloc[index]
+	return np.asarray(values)[index]
@@ -0,0 +1,268 @@
+"""
+Live view of a log while it is being written
+
+LogTail follows a growing CSV log by byte offset, parsing only the complete
+lines appended since it last looked. The last hours of the log are kept in a
+RingBuffer, fixed size numpy arrays that are never reallocated, with the
+moving averages computed for the new rows only from the tail of the buffer.
+
+LiveView draws a layout of time series from the buffer and refreshes it on a
+timer. Each refresh redraws only the traces, over a saved copy of the rest of
+the figure; the whole figure is only drawn again when the axes limits have to
+change, when the newest reading reaches the end of the time axis or leaves the
+range of the values.
+
+	view = LiveView('log.csv', 'plot_twoin_twoout', hours=12)
+	view.run()
+
+The layouts follow the plot scripts of the same name, see LIVE_LAYOUTS.
+"""
+
+from analysis.loading import ReadCsvHeader, ParseCsvRows
+from analysis.decimate import AxisPixels, MinMaxIndices, OVERSAMPLE
+
+import numpy as np
+import pandas as pd
+import os
+
+LIVE_HOURS = 6				# default length of the view
+LIVE_REFRESH = 2.0			# seconds between refreshes
+TIME_HEADROOM = 0.1			# fraction of the view the time axis extends past the newest reading
+VALUE_MARGIN = 0.05			# fraction of the range added above and below the values
+
+#
+# Each layout is (averaging window, sample period in seconds, panels). A panel
+# is a list of one or two axes (the second on the right), each axes is
+# (label, average, [(column, colour, name), ...]) where average shows the
+# moving average of its traces.
+#
+LIVE_LAYOUTS = {
+	'plot': (60, 1.0, [
+		[("Volts", True, [('K2015A', 'b', "K2015")]), ("Volts", True, [('K196A', 'r', "K196")])],
+		[("°C", False, [('TRoom', 'b', "Room Temp"), ('TWindow', 'r', "Window Temp")])],
+	]),
+	'plot_five_in_tc': (300, 1.0, [
+		[("Volts", True, [('C1', 'b', "C1")])],
+		[("Volts", True, [('C2', 'b', "C2")])],
+		[("Volts", True, [('C3', 'b', "C3")])],
+		[("Volts", True, [('C4', 'b', "C4")])],
+		[("Volts", True, [('C5', 'b', "Power Supply")])],
+		[("°C", False, [('T7', 'b', "Room Temp"), ('T8', 'r', "LM3900 Temp")])],
+	]),
+	'plot_twoin_twoout': (60, 10.0, [
+		[("Volts", True, [('K2015A_EDC', 'b', "K2015_EDC")]), ("Volts", True, [('K196A_EDC', 'r', "K196_EDC")])],
+		[("Volts", True, [('K2015A_JVR', 'b', "K2015_JVR")]), ("Volts", True, [('K196A_JVR', 'r', "K196_JVR")])],
+		[("°C", False, [('TRoom', 'b', "Room Temp"), ('TWindow', 'r', "Window Temp")])],
+	]),
+}
+
+
+class LogTail(object):
+	"Follow a growing CSV log, read returns the rows appended since the last read"
+
+	def __init__(self, path, columns):
+		self.path = path
+		self.columns = list(columns)
+		self.header = None
+		self.offset = 0
+
+	def start(self, rows):
+		"Start from about the last rows of the log rather than its beginning"
+		with open(self.path, 'rb') as f:
+			self.header = ReadCsvHeader(f)
+			begin = f.tell()
+			first = f.readline()
+			size = os.fstat(f.fileno()).st_size
+			start = max(begin, size - rows * max(1, len(first)))
+			if start > begin:
+				# continue from the start of the next line
+				f.seek(start - 1)
+				f.readline()
+				start = f.tell()
+		self.offset = start
+
+	def read(self):
+		"The complete rows appended since the last read, a DataFrame of the timestamp and columns"
+		with open(self.path, 'rb') as f:
+			size = os.fstat(f.fileno()).st_size
+			if self.header is None or size < self.offset:
+				# new or replaced log
+				self.header = ReadCsvHeader(f)
+				self.offset = f.tell()
+			f.seek(self.offset)
+			data = f.read(size - self.offset)
+
+		end = data.rfind(b'\n') + 1
+		if not end:
+			return None
+		self.offset += end
+		rows = ParseCsvRows(data[:end], self.header, self.columns)
+		return rows if len(rows) else None
+
+
+class RingBuffer(object):
+	"""
+	The last capacity rows of a log and the moving averages of its columns
+
+	Every row is stored twice, capacity rows apart, so the rows in order are
+	always a contiguous slice and times() and values() are views, not copies.
+	"""
+
+	def __init__(self, capacity, columns, window):
+		self.capacity = capacity
+		self.columns = list(columns)
+		self.window = window
+		self.count = 0			# rows held
+		self.total = 0			# rows appended
+		self._times = np.zeros(2 * capacity, dtype='datetime64[ns]')
+		self._values = np.full((2 * capacity, 2 * len(self.columns)), np.nan)
+
+	def append(self, times, values):
+		"Append rows, times a datetime64 array and values a 2D array of the columns"
+		values = np.asarray(values, dtype=np.float64)
+		# moving averages continue from the last window - 1 rows held
+		tail = self._raw()[max(0, self.count - (self.window - 1)):]
+		averages = pd.DataFrame(np.concatenate((tail, values))).rolling(self.window).mean().values[len(tail):]
+
+		times = np.asarray(times, dtype='datetime64[ns]')[-self.capacity:]
+		rows = np.concatenate((values, averages), axis=1)[-self.capacity:]
+		index = (self.total + np.arange(len(rows))) % self.capacity
+		self._times[index] = self._times[index + self.capacity] = times
+		self._values[index] = self._values[index + self.capacity] = rows
+		self.total += len(rows)
+		self.count = min(self.capacity, self.count + len(rows))
+
+	def _slice(self):
+		end = self.total % self.capacity + self.capacity
+		return slice(end - self.count, end)
+
+	def _raw(self):
+		return self._values[self._slice(), :len(self.columns)]
+
+	def times(self):
+		return self._times[self._slice()]
+
+	def values(self, column, average=False):
+		i = self.columns.index(column) + (len(self.columns) if average else 0)
+		return self._values[self._slice(), i]
+
+
+class LiveView(object):
+	"A layout of the last hours of a log, refreshed as the log grows"
+
+	def __init__(self, path, layout, hours=LIVE_HOURS, refresh=LIVE_REFRESH):
+		import matplotlib.pyplot as plt
+		from matplotlib.ticker import FuncFormatter
+
+		self.window, period, self.panels = LIVE_LAYOUTS[layout]
+		columns = [column for panel in self.panels for _, _, traces in panel for column, _, _ in traces]
+		self.buffer = RingBuffer(int(hours * 3600 / period), columns, self.window)
+		self.tail = LogTail(path, columns)
+		self.tail.start(self.buffer.capacity)
+
+		self.figure = plt.figure(figsize=(10, 2 * len(self.panels)))
+		self.figure.suptitle(path)
+		self.axes = []			# (axes, [(line, column, average), ...]) for each axes
+		for i, panel in enumerate(self.panels):
+			left = self.figure.add_subplot(len(self.panels), 1, i + 1)
+			for j, (label, average, traces) in enumerate(panel):
+				axis = left if j == 0 else left.twinx()
+				axis.xaxis_date()
+				axis.set_ylabel(label)
+				lines = []
+				for column, colour, name in traces:
+					lines.append((axis.plot([], [], colour + '-', label=name, alpha=0.3, linewidth=0.3, animated=True)[0], column, False))
+					if average:
+						l = "%s SMA(%d)" % (name, self.window)
+						lines.append((axis.plot([], [], colour + '-', label=l, linewidth=0.6, animated=True)[0], column, True))
+				axis.legend(loc=2 if j == 0 else 1)
+				self.axes.append((axis, lines))
+		self.figure.tight_layout()
+
+		self._backgrounds = None
+		self.figure.canvas.mpl_connect('draw_event', self._on_draw)
+		self.timer = self.figure.canvas.new_timer(interval=int(refresh * 1000))
+		self.timer.add_callback(self.update)
+
+	def run(self):
+		import matplotlib.pyplot as plt
+
+		self.update()
+		self.timer.start()
+		plt.show()
+
+	def update(self):
+		"Read the rows appended to the log and redraw the traces"
+		rows = self.tail.read()
+		if rows is None:
+			return False
+		self.buffer.append(rows.iloc[:, 0].values, rows[self.buffer.columns].values)
+
+		times = self.buffer.times()
+		for axis, lines in self.axes:
+			width = AxisPixels(axis)[0] * OVERSAMPLE
+			for line, column, average in lines:
+				y = self.buffer.values(column, average)
+				index = MinMaxIndices(y, width)
+				line.set_data(times[index], y[index])
+
+		if self._rescale(times):
+			# the axes have changed, the whole figure is drawn and _on_draw saves it
+			self.figure.canvas.draw_idle()
+		else:
+			self._blit()
+		return True
+
+	def _rescale(self, times):
+		"Set new limits if the readings have left the axes, returns True if any changed"
+		changed = False
+		newest, oldest = times[-1], times[0]
+		xmax = self.axes[0][0].get_xlim()[1]
+		if self._backgrounds is None or _num(newest) > xmax:
+			span = max(newest - oldest, np.timedelta64(60, 's'))
+			for axis, _ in self.axes:
+				axis.set_xlim(oldest, newest + span * TIME_HEADROOM)
+			changed = True
+
+		for axis, lines in self.axes:
+			values = np.concatenate([self.buffer.values(column, average) for _, column, average in lines])
+			if np.all(np.isnan(values)):
+				continue
+			low, high = np.nanmin(values), np.nanmax(values)
+			ylow, yhigh = axis.get_ylim()
+			if changed or low < ylow or high > yhigh:
+				margin = (high - low) * VALUE_MARGIN or abs(high) * 1e-6 or 1.0
+				axis.set_ylim(low - margin, high + margin)
+				changed = True
+		return changed
+
+	def _on_draw(self, event):
+		# save every axes without the traces, then draw the traces over them
+		canvas = self.figure.canvas
+		self._backgrounds = [canvas.copy_from_bbox(axis.bbox) for axis, _ in self.axes]
+		self._blit(restore=False)
+
+	def _blit(self, restore=True):
+		if self._backgrounds is None:
+			return
+		canvas = self.figure.canvas
+		# twin axes share a box, it is restored once and then all of its traces drawn
+		done = set()
+		for (axis, _), background in zip(self.axes, self._backgrounds):
+			box = tuple(axis.bbox.bounds)
+			if box in done:
+				continue
+			done.add(box)
+			if restore:
+				canvas.restore_region(background)
+			for other, lines in self.axes:
+				if tuple(other.bbox.bounds) == box:
+					for line, _, _ in lines:
+						other.draw_artist(line)
+			canvas.blit(axis.bbox)
+
+
+def _num(value):
+	import matplotlib.dates
+
+	return matplotlib.dates.date2num(value)
@@ -0,0 +1,125 @@
+"""
+Loading logs for analysis and plotting
+
+LoadLog returns a DataFrame with the timestamp column as datetime64 and the
+readings as float64, whatever the log format. A CSV log is read in blocks of
+whole lines with only the columns that are needed, and each block is converted
+to those types before the next is read, so memory use is close to the size of
+the result rather than that of the text. The header the loggers write again on
+every restart is dropped from each block. Text timestamps are converted with an explicit
+format, rather than by inferring it for every row, and epoch nanosecond
+timestamps (acquisition/clock.py) are read as integers and used as datetime64
+(UTC) directly. Comment lines, such as the anchor of epoch timestamps, are
+skipped.
+
+	data = LoadLog(sourceFile, ['TWindow', 'TRoom', 'K2015A'])
+
+Binary logs (.bin), HDF5 (.h5) and Parquet (a directory or .parquet file) from
+the acquisition sinks are also accepted.
+"""
+
+from acquisition.clock import TIMESTAMP_FORMAT
+
+import numpy as np
+import pandas as pd
+import io
+import os
+import re
+
+CSV_CHUNK_ROWS = 100000
+
+
+def LoadLog(path, columns=None, chunksize=CSV_CHUNK_ROWS):
+	"Load the timestamp and the readings in columns (all if None) from a log"
+	if path.endswith('.bin'):
+		from acquisition.binlog import BinaryLog
+		data = BinaryLog(path).to_frame()
+	elif path.endswith(('.h5', '.hdf5')):
+		data = pd.read_hdf(path)
+	elif path.endswith('.parquet') or os.path.isdir(path):
+		data = pd.read_parquet(path)
+	else:
+		return LoadCsvLog(path, columns, chunksize)
+
+	if columns is not None:
+		data = data[[data.columns[0]] + list(columns)]
+	return data
+
+
+def LoadCsvLog(path, columns=None, chunksize=CSV_CHUNK_ROWS):
+	"Load a CSV log in blocks of about chunksize rows, see LoadLog"
+	with open(path, 'rb') as f:
+		header = ReadCsvHeader(f)
+		names = CsvHeaderNames(header)
+		timestamp = names[0]
+		readings = names[1:] if columns is None else list(columns)
+		chunks = [ParseCsvRows(block, header, readings) for block in ReadCsvBlocks(f, chunksize, partial=True)]
+
+	chunks = [chunk for chunk in chunks if len(chunk)]
+	if not chunks:
+		return pd.DataFrame({timestamp: pd.Series(dtype='datetime64[ns]'),
+			**{name: pd.Series(dtype=np.float64) for name in readings}})
+	return pd.concat(chunks, ignore_index=True)
+
+
+def ParseTimestamps(values):
+	"Convert logged timestamps to datetime64, some older logs have fractional seconds"
+	if pd.api.types.is_integer_dtype(values):
+		# epoch nanoseconds
+		return values.astype('datetime64[ns]')
+	try:
+		return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+	except ValueError:
+		return pd.to_datetime(values, format='ISO8601')
+
+
+def ReadCsvHeader(f):
+	"Read the header line of a CSV log open in binary mode, after any comment lines"
+	line = f.readline()
+	while line.startswith(b'#'):
+		line = f.readline()
+	return line
+
+
+def ReadCsvBlocks(f, rows=CSV_CHUNK_ROWS, partial=False):
+	"""
+	Read a CSV log open in binary mode from its position in blocks of about rows
+	whole lines, yields each block (bytes). A partly written last line is not
+	yielded, unless partial.
+	"""
+	start = f.tell()
+	size = rows * max(1, len(f.readline()))
+	f.seek(start)
+	rest = b''
+	while True:
+		data = f.read(size)
+		if not data:
+			break
+		data = rest + data
+		end = data.rfind(b'\n') + 1
+		rest = data[end:]
+		if end:
+			yield data[:end]
+	if partial and rest:
+		yield rest + b'\n'
+
+
+def CsvHeaderNames(header):
+	"Column names of a CSV header line (bytes), the loggers write them as 'DateTime, T7, T8'"
+	return [name.strip() for name in header.decode('utf-8').strip().split(',')]
+
+
+def ParseCsvRows(data, header, columns):
+	"""
+	Parse complete lines of a CSV log (bytes) that follow its header line,
+	returns a DataFrame of the timestamp and columns
+	"""
+	names = CsvHeaderNames(header)
+	# the header is repeated each time the logger was restarted, whatever its spacing
+	first = names[0].encode('utf-8')
+	if first in data:
+		data = re.sub(rb'(?m)^[ \t]*' + re.escape(first) + rb'[ \t]*,.*\n', b'', data)
+	rows = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=[names[0]] + list(columns),
+		skipinitialspace=True, comment='#', dtype={name: np.float64 for name in columns})
+	rows[names[0]] = ParseTimestamps(rows[names[0]])
+	return rows[[names[0]] + list(columns)]
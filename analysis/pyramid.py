@@ -0,0 +1,270 @@
+"""
+Multi-resolution aggregates of a log
+
+Plotting or analysing a window of a long log would otherwise read every row in
+it. AggregatePyramid keeps, for every column, the minimum, maximum, mean, count
+and sum of squares of the readings in buckets of 1 sec, 10 sec, 1 min, 10 min
+and 1 hour. A query picks the coarsest level that still gives the number of
+points asked for, so any window costs about the same to read.
+
+	pyramid = OpenPyramid(sourceFile, ['TWindow', 'TRoom', 'K2015A'], [60])
+	data = pyramid.query('K2015A', start, end, points=2000)
+	axis.fill_between(data['Time'], data['min'], data['max'])
+
+Each level is a binary log (acquisition/binlog.py), <log>.pyramid-<n>s.bin,
+with a record for each bucket holding the start of the bucket (POSIX seconds)
+and '<column> min', '<column> max', '<column> mean', '<column> count' and
+'<column> sumsq' for every column. sumsq is the sum of squares of the readings
+about the bucket mean, rather than about zero, so the spread of a few uV on a
+10 V reading is not lost to rounding.
+
+Only complete buckets are stored, a bucket is complete once a reading after it
+has been logged. update() aggregates the readings appended since it last ran
+into the first level, and the new buckets of each level into the next, so it
+costs the same however long the log has become. query() uses the buckets of a
+level that lie wholly inside the range, and fills the parts of the range before
+and after them, and the buckets still open at the end of the log, from the
+finer levels and finally the readings.
+
+The readings are taken from a binary log, for a CSV log the cache of its parsed
+columns (analysis/cache.py) which is brought up to date first. The pyramid is
+rebuilt if that is replaced or the columns change.
+"""
+
+from acquisition.binlog import BinaryLogWriter, BinaryLog
+from analysis.cache import CachedLog
+
+import numpy as np
+import pandas as pd
+import json
+import os
+
+PYRAMID_VERSION = 1
+PYRAMID_LEVELS = [1, 10, 60, 600, 3600]		# bucket widths in seconds, each a multiple of the one before
+STATS = ['min', 'max', 'mean', 'count', 'sumsq']
+
+
+def OpenPyramid(path, columns, windows=()):
+	"""
+	The pyramid of columns of a log, brought up to date
+
+	For a CSV log use the same columns and windows as the plots of the log, so
+	they share its cache.
+	"""
+	pyramid = AggregatePyramid(path, columns, windows)
+	pyramid.update()
+	return pyramid
+
+
+def Aggregate(times, stats, width):
+	"""
+	Combine the buckets (or readings) of times and stats into buckets of width
+	seconds. stats is a dict of column to a dict of STATS arrays. Returns the
+	start times and stats of the complete buckets, and the number of inputs they
+	used; the inputs after them belong to the bucket that is still open.
+	"""
+	ids = np.floor(times / width).astype(np.int64)
+	begins = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+	used = int(begins[-1])
+	if not used:
+		return np.zeros(0), {}, 0
+	begins = begins[:-1]
+	sizes = np.diff(np.append(begins, used))
+	group = np.repeat(np.arange(len(begins)), sizes)
+
+	combined = {}
+	for column, s in stats.items():
+		count = s['count'][:used]
+		mean = np.nan_to_num(s['mean'][:used])
+		total = np.add.reduceat(count, begins)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			average = np.add.reduceat(mean * count, begins) / total
+		# sum of squares about the new mean, from those of the inputs about theirs
+		offset = np.where(count > 0, mean - np.nan_to_num(average)[group], 0.0)
+		combined[column] = {
+			'min': np.fmin.reduceat(s['min'][:used], begins),
+			'max': np.fmax.reduceat(s['max'][:used], begins),
+			'mean': average,
+			'count': total,
+			'sumsq': np.add.reduceat(np.nan_to_num(s['sumsq'][:used]) + count * offset * offset, begins),
+		}
+	return ids[begins] * float(width), combined, used
+
+
+def ReadingStats(values):
+	"The stats of single readings, as the inputs of the first level"
+	count = (~np.isnan(values)).astype(np.float64)
+	return {'min': values, 'max': values, 'mean': values, 'count': count, 'sumsq': np.zeros(len(values))}
+
+
+class AggregatePyramid(object):
+	"Aggregates of the columns of a log at each of levels (bucket widths in seconds)"
+
+	def __init__(self, path, columns, windows=(), levels=PYRAMID_LEVELS):
+		self.path = path
+		self.columns = list(columns)
+		self.windows = list(windows)
+		self.levels = list(levels)
+		self.state_path = path + '.pyramid.json'
+
+	def level_path(self, width):
+		return '%s.pyramid-%ds.bin' % (self.path, width)
+
+	def source(self):
+		"The binary log of the readings, bringing the cache of a CSV log up to date"
+		if self.path.endswith('.bin'):
+			return BinaryLog(self.path)
+		log = CachedLog(self.path, self.columns, self.windows)
+		log.update()
+		return BinaryLog(log.cache_path)
+
+	def update(self):
+		"Aggregate the readings appended since the last update, returns the number of new buckets"
+		source = self.source()
+		state = self._load_state(len(source))
+		if state is None:
+			state = self._reset()
+
+		times = source.records[source.columns[0]][state['used'][0]:]
+		stats = {column: ReadingStats(np.asarray(source.records[column][state['used'][0]:])) for column in self.columns}
+		added = 0
+		for i, width in enumerate(self.levels):
+			starts, buckets, used = Aggregate(np.asarray(times), stats, width)
+			state['used'][i] += used
+			if len(starts):
+				self._append(width, starts, buckets)
+				state['buckets'][i] += len(starts)
+				added += len(starts)
+			if i + 1 == len(self.levels):
+				break
+			# the next level continues from the buckets of this one it has not used
+			log = BinaryLog(self.level_path(width))
+			records = log.records[state['used'][i + 1]:]
+			times = records[log.columns[0]]
+			stats = {column: {stat: np.asarray(records['%s %s' % (column, stat)]) for stat in STATS} for column in self.columns}
+
+		state['source_rows'] = len(source)
+		self._save_state(state)
+		return added
+
+	def level_for(self, start, end, points):
+		"The width of the coarsest level with at least points buckets from start to end, 0 for the readings"
+		span = _seconds(end) - _seconds(start)
+		for width in reversed(self.levels):
+			if span / width >= points:
+				return width
+		return 0
+
+	def query(self, column, start=None, end=None, points=1000):
+		"""
+		Aggregates of column from start to end (datetime64, None for the ends of
+		the log) with at least points buckets where the log has them. Returns a
+		DataFrame of Time (the start of each bucket), min, max, mean, count and
+		std; the readings themselves if no level is fine enough.
+		"""
+		source = BinaryLog(self._source_path())
+		source_times = source.records[source.columns[0]]
+		if not len(source_times):
+			return _frame(np.zeros(0), {stat: np.zeros(0) for stat in STATS})
+		low = _seconds(start) if start is not None else source_times[0]
+		high = _seconds(end) if end is not None else source_times[-1] + 1
+		width = self.level_for(low, high, points)
+
+		levels = [w for w in reversed(self.levels) if w <= width] if width else []
+		parts = self._cover(column, source, levels, low, high)
+
+		times = np.concatenate([np.asarray(t) for t, _ in parts])
+		stats = {stat: np.concatenate([np.asarray(s[stat]) for _, s in parts]) for stat in STATS}
+		return _frame(times, stats)
+
+	def _cover(self, column, source, levels, low, high):
+		"""
+		Parts (times and stats) covering low to high: the buckets of the first of
+		levels wholly inside it, and the ends either side from the finer levels
+		"""
+		if high <= low:
+			return []
+		if not levels:
+			times = source.records[source.columns[0]]
+			a, b = np.searchsorted(times, [low, high])
+			return [(times[a:b], ReadingStats(np.asarray(source.records[column][a:b])))]
+
+		width = levels[0]
+		log = BinaryLog(self.level_path(width))
+		starts = log.records[log.columns[0]]
+		a = np.searchsorted(starts, low)
+		b = np.searchsorted(starts, high - width, side='right')
+		if b <= a:
+			return self._cover(column, source, levels[1:], low, high)
+		records = log.records[a:b]
+		part = (starts[a:b], {stat: records['%s %s' % (column, stat)] for stat in STATS})
+		return (self._cover(column, source, levels[1:], low, starts[a]) + [part] +
+			self._cover(column, source, levels[1:], starts[b - 1] + width, high))
+
+	def _source_path(self):
+		return self.path if self.path.endswith('.bin') else self.path + '.cache.bin'
+
+	def _level_columns(self):
+		return ['Time'] + ['%s %s' % (column, stat) for column in self.columns for stat in STATS]
+
+	def _append(self, width, starts, buckets):
+		writer = BinaryLogWriter(self.level_path(width), self._level_columns())
+		try:
+			records = np.zeros(len(starts), dtype=writer.dtype)
+			records['Time'] = starts
+			for column, stats in buckets.items():
+				for stat in STATS:
+					records['%s %s' % (column, stat)] = stats[stat]
+			writer.write_many(records)
+		finally:
+			writer.close()
+
+	def _load_state(self, source_rows):
+		if not os.path.exists(self.state_path):
+			return None
+		with open(self.state_path) as f:
+			state = json.load(f)
+		if (state.get('version') != PYRAMID_VERSION or state['columns'] != self.columns or
+				state['levels'] != self.levels or state['source_rows'] > source_rows):
+			return None
+		for width, buckets in zip(self.levels, state['buckets']):
+			if not os.path.exists(self.level_path(width)) or len(BinaryLog(self.level_path(width))) != buckets:
+				return None		# interrupted while the pyramid was updated
+		return state
+
+	def _reset(self):
+		for width in self.levels:
+			if os.path.exists(self.level_path(width)):
+				os.remove(self.level_path(width))
+			BinaryLogWriter(self.level_path(width), self._level_columns()).close()
+		return {
+			'version': PYRAMID_VERSION,
+			'columns': self.columns,
+			'levels': self.levels,
+			'source_rows': 0,
+			'used': [0] * len(self.levels),			# inputs of each level aggregated so far
+			'buckets': [0] * len(self.levels),
+		}
+
+	def _save_state(self, state):
+		temp = self.state_path + '.tmp'
+		with open(temp, 'w') as f:
+			json.dump(state, f)
+		os.replace(temp, self.state_path)
+
+
+def _seconds(value):
+	if isinstance(value, (int, float, np.floating, np.integer)):
+		return float(value)
+	return np.datetime64(value, 'us').astype(np.int64) / 1e6
+
+
+def _frame(times, stats):
+	with np.errstate(invalid='ignore', divide='ignore'):
+		std = np.sqrt(stats['sumsq'] / (stats['count'] - 1))
+	std[stats['count'] == 1] = 0.0
+	return pd.DataFrame({
+		'Time': np.round(np.asarray(times) * 1e6).astype(np.int64).astype('datetime64[us]'),
+		'min': stats['min'], 'max': stats['max'], 'mean': stats['mean'],
+		'count': stats['count'], 'std': std,
+	})
@@ -0,0 +1,198 @@
+"""
+Temperature coefficient estimation
+
+Fits the voltage of every column against a temperature in one pass, with numpy
+operating on all of the columns together:
+
+	FitTempco		linear and quadratic least squares fits, with 95% confidence
+					intervals, and separate linear fits to the heating and cooling
+					parts of the log to show hysteresis
+	SlidingTempco	the linear tempco over a sliding window of time, from running
+					sums so the cost does not depend on the window length
+
+Coefficients are given in ppm of the mean voltage:
+
+	results = FitTempco(sourceData['T8'], sourceData[['C1', 'C2', 'C3', 'C4']])
+	print(TempcoText(results['C1']))
+	WriteTempcoSummary(sourceFile + '.tempco.csv', results.values())
+"""
+
+import numpy as np
+import pandas as pd
+import csv
+
+# two sided 95% points of Student's t for small degrees of freedom, the normal value is used above
+_T975 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+	2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+	2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+HEATING_SMOOTH = 0.01		# fraction of the log the temperature is smoothed over before taking its direction
+MIN_WINDOW_SPAN = 0.2		# °C, a sliding window with less temperature change than this is not fitted
+
+
+def _t975(dof):
+	if dof < 1:
+		return np.nan
+	return _T975[dof-1] if dof <= len(_T975) else 1.960
+
+
+class TempcoResult(object):
+	"""
+	The temperature coefficient of one column
+
+	ppm and ppm_ci are the linear coefficient (ppm/°C) and its 95% confidence
+	interval. quad_ppm is the slope at the reference temperature t0 and
+	quad_ppm2 the curvature (ppm/°C²) of the quadratic fit. heating_ppm and
+	cooling_ppm are linear fits to those parts only, and hysteresis_ppm the
+	offset between them at t0.
+	"""
+
+	FIELDS = ['name', 'count', 't0', 'mean', 'ppm', 'ppm_ci', 'quad_ppm', 'quad_ppm_ci', 'quad_ppm2', 'quad_ppm2_ci',
+		'heating_ppm', 'cooling_ppm', 'hysteresis_ppm']
+
+	def __init__(self, **values):
+		for name in self.FIELDS:
+			setattr(self, name, values.get(name, np.nan))
+
+	def slope(self):
+		"The linear fit as volts per °C, for drawing"
+		return self.ppm * 1e-6 * self.mean
+
+	def row(self):
+		return [getattr(self, name) for name in self.FIELDS]
+
+
+def _fit(x, Y, degree):
+	"""
+	Least squares polynomial fits of every column of Y against x, returns the
+	coefficients (lowest order first) and their 95% confidence intervals
+	"""
+	n = len(x)
+	dof = n - (degree + 1)
+	if dof < 1:
+		nan = np.full((degree + 1, Y.shape[1]), np.nan)
+		return nan, nan
+	X = np.vander(x, degree + 1, increasing=True)
+	coefficients, residuals, rank, sv = np.linalg.lstsq(X, Y, rcond=None)
+	rss = ((Y - X @ coefficients) ** 2).sum(axis=0)
+	covariance = np.linalg.pinv(X.T @ X)
+	stderr = np.sqrt(np.outer(np.diag(covariance), rss / dof))
+	return coefficients, _t975(dof) * stderr
+
+
+def HeatingMask(temperature, smooth=HEATING_SMOOTH):
+	"""
+	True where the temperature is rising, from the direction of the temperature
+	smoothed over a fraction of the log, so sensor noise does not flip it
+	"""
+	rows = max(3, int(len(temperature) * smooth))
+	smoothed = pd.Series(np.asarray(temperature, dtype=np.float64)).rolling(rows, center=True, min_periods=1).mean().values
+	return np.gradient(smoothed) > 0 if len(smoothed) > 1 else np.zeros(len(smoothed), dtype=bool)
+
+
+def FitTempco(temperature, voltages):
+	"""
+	Fit every column of voltages (a DataFrame) against temperature, returns a dict of TempcoResult by column
+
+	Rows where the temperature or any voltage is NaN are left out.
+	"""
+	T = np.asarray(temperature, dtype=np.float64)
+	Y = np.asarray(voltages, dtype=np.float64)
+	names = list(voltages.columns)
+	heating = HeatingMask(T)
+
+	valid = ~np.isnan(T) & ~np.isnan(Y).any(axis=1)
+	T, Y, heating = T[valid], Y[valid], heating[valid]
+	if not len(T):
+		return {name: TempcoResult(name=name, count=0) for name in names}
+	t0 = T.mean()
+	x = T - t0
+	mean = Y.mean(axis=0)
+	scale = 1e6 / mean			# volts to ppm of the mean
+
+	linear, linear_ci = _fit(x, Y, 1)
+	quad, quad_ci = _fit(x, Y, 2)
+	heat, heat_ci = _fit(x[heating], Y[heating], 1)
+	cool, cool_ci = _fit(x[~heating], Y[~heating], 1)
+
+	results = {}
+	for i, name in enumerate(names):
+		results[name] = TempcoResult(
+			name=name, count=len(T), t0=t0, mean=mean[i],
+			ppm=linear[1, i] * scale[i], ppm_ci=linear_ci[1, i] * scale[i],
+			quad_ppm=quad[1, i] * scale[i], quad_ppm_ci=quad_ci[1, i] * scale[i],
+			quad_ppm2=quad[2, i] * scale[i], quad_ppm2_ci=quad_ci[2, i] * scale[i],
+			heating_ppm=heat[1, i] * scale[i], cooling_ppm=cool[1, i] * scale[i],
+			hysteresis_ppm=(heat[0, i] - cool[0, i]) * scale[i])
+	return results
+
+
+def SlidingTempco(times, temperature, voltages, window):
+	"""
+	Linear tempco (ppm/°C) of every column of voltages over a sliding window of rows
+
+	Returns a DataFrame indexed by the time at the centre of each window. Windows
+	with NaN, or where the temperature changes less than MIN_WINDOW_SPAN, are NaN.
+	"""
+	T = np.asarray(temperature, dtype=np.float64)
+	Y = np.asarray(voltages, dtype=np.float64)
+	n = len(T)
+	if n < window or window < 3:
+		return pd.DataFrame(columns=list(voltages.columns))
+
+	# running sums of values about the mean, which keeps the differences well conditioned
+	valid = ~np.isnan(T) & ~np.isnan(Y).any(axis=1)
+	x = np.where(valid, T - np.nanmean(T), 0.0)
+	Yc = np.where(valid[:, None], Y - np.nanmean(Y, axis=0), 0.0)
+
+	def windowed(values):
+		sums = np.cumsum(np.concatenate((np.zeros((1,) + values.shape[1:]), values)), axis=0)
+		return sums[window:] - sums[:-window]
+
+	count = windowed(valid.astype(np.float64))
+	sx = windowed(x)
+	sxx = windowed(x * x)
+	sy = windowed(Yc)
+	sxy = windowed(x[:, None] * Yc)
+
+	with np.errstate(invalid='ignore', divide='ignore'):
+		var = sxx - sx * sx / count
+		slope = (sxy - sx[:, None] * sy / count[:, None]) / var[:, None]
+		level = sy / count[:, None] + np.nanmean(Y, axis=0)
+		ppm = slope / level * 1e6
+
+	# the temperature span of each window, from a rolling max and min
+	span = pd.Series(T).rolling(window).max().values[window-1:] - pd.Series(T).rolling(window).min().values[window-1:]
+	ppm[(count < window) | ~(span >= MIN_WINDOW_SPAN)] = np.nan
+
+	centre = np.asarray(times)[window // 2:window // 2 + len(ppm)]
+	return pd.DataFrame(ppm, index=centre, columns=list(voltages.columns))
+
+
+def TempcoText(result):
+	"Short description of a result, for printing on a figure"
+	return ('%.3f ±%.3f ppm/°C  (n=%d, t0=%.2f°C)\n'
+		'quadratic %.3f ppm/°C %+.4f ppm/°C²\n'
+		'heating %.3f, cooling %.3f ppm/°C, hysteresis %.2f ppm') % (
+		result.ppm, result.ppm_ci, result.count, result.t0,
+		result.quad_ppm, result.quad_ppm2,
+		result.heating_ppm, result.cooling_ppm, result.hysteresis_ppm)
+
+
+def WriteTempcoSummary(path, results, sliding=None):
+	"""
+	Write the results to a CSV file, one row per column. With the sliding
+	tempco DataFrame, its median, minimum and maximum are added.
+	"""
+	with open(path, 'w', newline='') as f:
+		writer = csv.writer(f)
+		fields = list(TempcoResult.FIELDS)
+		if sliding is not None:
+			fields += ['window_ppm_median', 'window_ppm_min', 'window_ppm_max']
+		writer.writerow(fields)
+		for result in results:
+			row = result.row()
+			if sliding is not None:
+				values = sliding[result.name].dropna() if result.name in sliding else pd.Series(dtype=np.float64)
+				row += [values.median(), values.min(), values.max()] if len(values) else [np.nan] * 3
+			writer.writerow(['%.6g' % x if isinstance(x, float) else x for x in row])
@@ -0,0 +1,111 @@
+"""
+Throughput benchmark for the Prologix Ethernet GPIB driver
+
+Runs the driver against the local Prologix emulator and reports queries per
+second, write to read round trip latency and bulk transfer rate. Use this to
+check what a driver change does to throughput before it goes near the lab.
+
+	python benchmark_prologix.py [iterations] [pacing modes...]
+"""
+
+from gpib.prologix.ethernet import PrologixEthernetGPIB, PACING_FIXED, PACING_ADAPTIVE, PACING_SPOLL
+from gpib.prologix.emulator import PrologixEmulator, SimulatedScpiMeter, SimulatedTalkMeter
+
+import statistics
+import time
+import sys
+
+MAX_COMMAND_TIMEOUT_SEC = 3
+
+SCPI_ADDR = 1
+TALK_ADDR = 2
+
+BULK_SIZE = 256 * 1024
+BULK_ITERATIONS = 5
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+PACING_MODES = sys.argv[2:] or [PACING_FIXED, PACING_ADAPTIVE, PACING_SPOLL]
+
+
+def Report(name, times, size=None):
+	total = sum(times)
+	mean = statistics.mean(times)
+	line = '%-24s n=%-5d %9.1f ops/s  mean %8.3f ms  min %8.3f ms  max %8.3f ms' % (
+		name, len(times), len(times) / total, mean * 1e3, min(times) * 1e3, max(times) * 1e3)
+	if size is not None:
+		line += '  %9.1f kB/s' % (size * len(times) / total / 1024)
+	sys.stdout.write(line + '\n')
+	sys.stdout.flush()
+
+
+def Measure(operation, count):
+	times = []
+	for i in range(count):
+		start = time.perf_counter()
+		operation()
+		times.append(time.perf_counter() - start)
+	return times
+
+
+def RunBenchmarks(pacing):
+	bulk = ('%+.8E,' % 1.0) * (BULK_SIZE // 15)
+	instruments = {
+		SCPI_ADDR: SimulatedScpiMeter(latency=0.005, responses={':CAL:PROT:DATA?': bulk}),
+		TALK_ADDR: SimulatedTalkMeter(latency=0.01),
+	}
+
+	with PrologixEmulator(instruments) as emulator:
+		gpib = PrologixEthernetGPIB('127.0.0.1', MAX_COMMAND_TIMEOUT_SEC, port=emulator.port, pacing=pacing)
+		gpib.open()
+		try:
+			sys.stdout.write('pacing: %s, link rtt %.3f ms\n' % (pacing, gpib.link_rtt * 1e3))
+			gpib.select(SCPI_ADDR)
+			Report('write', Measure(lambda: gpib.write(':INIT:CONT OFF'), ITERATIONS))
+
+			def RoundTrip():
+				gpib.write(':READ?')
+				gpib.read()
+			Report('write->read', Measure(RoundTrip, ITERATIONS))
+
+			def RoundTripEol():
+				gpib.write(':READ?')
+				gpib.readeol()
+			Report('write->readeol', Measure(RoundTripEol, ITERATIONS))
+
+			Report('query', Measure(lambda: gpib.query(':READ?'), ITERATIONS))
+
+			gpib.select(TALK_ADDR)
+			Report('read (talk only)', Measure(lambda: gpib.read(), ITERATIONS))
+
+			def Sequential():
+				gpib.select(TALK_ADDR)
+				gpib.write('C07X')
+				gpib.read()
+				gpib.write('C08X')
+				gpib.read()
+				gpib.select(SCPI_ADDR)
+				gpib.query(':READ?')
+			Report('scan (sequential)', Measure(Sequential, ITERATIONS))
+
+			scan = gpib.batch()
+			scan.select(TALK_ADDR)
+			scan.write('C07X')
+			scan.read()
+			scan.write('C08X')
+			scan.read()
+			scan.select(SCPI_ADDR)
+			scan.query(':READ?')
+			Report('scan (batch)', Measure(scan.execute, ITERATIONS))
+
+			gpib.select(SCPI_ADDR)
+			Report('query (bulk)', Measure(lambda: gpib.query(':CAL:PROT:DATA?'), BULK_ITERATIONS), len(bulk))
+
+		finally:
+			gpib.close()
+
+
+#
+# Main Entry Point
+#
+for pacing in PACING_MODES:
+	RunBenchmarks(pacing)
@@ -1,10 +1,15 @@
 """
 Download the calibration constants from a Keithley 3322/3333 LCR meter
+
+The constants are saved as a snapshot in cal-cache, later runs report any
+differences from the snapshot.
 """
 
 # we need to select the specific GPIB interface driver needed
 from gpib.prologix.ethernet import PrologixEthernetGPIB
 from gpib.base import GPIBTimeout
+from acquisition.calibration import AuditCalibration
+from instruments.k3322 import K3322CalSource
 
 from datetime import datetime
 import time
@@ -14,12 +19,6 @@ GPIB_ETHERNET_HOST_NAME = '192.168.0.10'
 MAX_COMMAND_TIMEOUT_SEC = 1
 
 INSTRUMENT_A_ADDR = 2
-READ_DELAY = 0.15
-
-
-def PadHex(i, w):
-	s = hex(i)
-	return s[2:].zfill(w)
 
 def DumpCalConstants():
 	# create and open the connection to the interface
@@ -29,18 +28,16 @@ def DumpCalConstants():
 		# Clear the bus
 		gpib.interface_clear()
 
-		gpib.select(INSTRUMENT_A_ADDR)
-		
-		print(f'ID: {gpib.query("?ID")}')
-
-		for addr in range(0x1000, 0x1010, 2):
-			paddr = PadHex(addr, 7)
-			v = gpib.query(f'`~1,{paddr}')
-			
-			if addr % 8 == 0:
-				v = v + ' ' + gpib.query(f'`~2,{paddr}') + ' ' + gpib.query(f'`~3,{paddr}')
-			
-			print(f'{paddr}: {v}')
+		audit = AuditCalibration(gpib, INSTRUMENT_A_ADDR, K3322CalSource())
+		print(f'ID: {audit.snapshot.instrument_id}')
+
+		for paddr, values in audit.snapshot.regions.items():
+			print(f'{paddr}: {" ".join(values)}')
+
+		if audit.previous is not None:
+			print(f'Compared with snapshot of {audit.previous.timestamp}: {len(audit.changes)} changed')
+			for paddr, old, new in audit.changes:
+				print(f'{paddr}: {old} -> {new}')
 		
 
 
@@ -2,11 +2,16 @@
 Generic Logging for GPIB instrument data
 
 This is a pretty simple interface, you may need to add your own implementation for specific measurements
+
+The calibration data is saved as a snapshot in cal-cache. Later runs only read
+the calibration date, unless it has changed.
 """
 
 # we need to select the specific GPIB interface driver needed
 from gpib.prologix.ethernet import PrologixEthernetGPIB
 from gpib.base import GPIBTimeout
+from acquisition.calibration import AuditCalibration
+from instruments.k2015 import K2015CalSource
 
 from datetime import datetime
 import time
@@ -25,19 +30,20 @@ def RunMeasurements():
 		# Clear the bus
 		gpib.interface_clear()
 
-		gpib.select(K2015_A_ADDR)
-		gpib.write(":FUNC 'VOLT:DC'")
+		audit = AuditCalibration(gpib, K2015_A_ADDR, K2015CalSource())
+		regions = audit.snapshot.regions
 	
-		print(f'ID: {gpib.query("*IDN?")}')
-		print(f'Calibrated: {gpib.query(":CAL:PROT:DATE?")}')
-		print(f'Next Due: {gpib.query(":CAL:PROT:NDUE?")}')
+		print(f'ID: {audit.snapshot.instrument_id}')
+		print(f'Calibrated: {regions["date"][0]}')
+		print(f'Next Due: {regions["due"][0]}')
 		print('Data:')
-		
-		# cal data is long and there are weird effects with normal query
-		# to get the full data set we have to read twice
-		gpib.write(":CAL:PROT:DATA?")
-		
-		print(gpib.read() + gpib.read())
+		print(regions['data'][0])
+
+		if audit.previous is not None:
+			print(f'Compared with snapshot of {audit.previous.timestamp}:', 'changed' if audit.changes else 'unchanged',
+				'' if audit.full_read else '(calibration date only)')
+			for name, old, new in audit.changes:
+				print(f'{name}: {old} -> {new}')
 
 	finally:
 		# Something went wrong, close.
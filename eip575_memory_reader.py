@@ -20,6 +20,12 @@ that these reside on the EPROM that is fitted to the A107 Gate
 
 WARNING: this is a slow process. It took about 45 minutes to dump all the data.
 
+The reads are now batched by EIP575Memory, without a pacing delay on every write,
+and the read turnaround is measured on start up rather than fixed at 150ms.
+Progress is checkpointed to <name>.partial, if a dump is interrupted run the
+script again and it carries on from the checkpoint. Given a reference image,
+blocks that match it at a few sampled locations are not read in full.
+
 Ash. 2018-04-11
 
 """
@@ -27,8 +33,8 @@ Ash. 2018-04-11
 # we need to select the specific GPIB interface driver needed
 from gpib.prologix.ethernet import PrologixEthernetGPIB
 from gpib.base import GPIBTimeout
-
-from intelhex import IntelHex
+from instruments.eip575 import EIP575Memory
+from acquisition.memorydump import MemoryDump, LoadImage
 
 from datetime import datetime
 import time
@@ -38,28 +44,18 @@ GPIB_ETHERNET_HOST_NAME = '192.168.0.10'
 MAX_COMMAND_TIMEOUT_SEC = 3
 
 EIP_ADDR = 2
-READ_DELAY = 0.15
+TURNAROUND_TEST_ADDRESS = 0xC000	# CPU EPROM, varied contents to detect early reads
 	
 
-def ReadAddress(gpib, address): 
-	# send address
-	gpib.write('TA10')
-	gpib.write('%04X' % address)
-	time.sleep(READ_DELAY)
-	# read result and extract the byte in hex
-	data = gpib.readeol()
-	print(data[-7:], flush=True)	
-	gpib.write('TP')
-	return int(data[-2:], 16)
-	
-def ReadEprom(gpib, startAddress, length, name):
-	# new hex file storage
-	ih = IntelHex()
-	# iterate over memory and pull each byte
-	for i in range(0, length):
-		ih[i] = ReadAddress(gpib, startAddress+i)
-		
-	ih.tofile(name, format='hex')
+def ReadEprom(memory, startAddress, length, name, reference=None):
+	# pull the memory a block at a time, checkpointing as we go
+	if reference is not None:
+		reference = LoadImage(reference, length)
+	dump = MemoryDump(memory, startAddress, length, name, reference)
+	start = time.monotonic()
+	dump.run(progress=lambda n: print('%04X %d/%d bytes %.0fs' % (startAddress+n, n, length, time.monotonic()-start), flush=True))
+	print('%s MD5 %s: %d bytes resumed, %d matched the reference, %d read' % (
+		name, dump.md5, dump.resumed, dump.verified, dump.bytes_read), flush=True)
 
 	
 def DumpEproms():
@@ -69,12 +65,11 @@ def DumpEproms():
 	try:
 		# Configure the EIP 575
 		print('Resetting EIP 575')
-		gpib.select(EIP_ADDR)
-		gpib.interface_clear()
-		gpib.selected_device_clear()
+		memory = EIP575Memory(gpib, EIP_ADDR)
+		memory.reset()
 
-		# wait for it to complete
-		time.sleep(.5)
+		turnaround = memory.measure_turnaround(TURNAROUND_TEST_ADDRESS)
+		print('Read turnaround %.1fms' % (turnaround * 1000))
 		
 	
 		#
@@ -92,13 +87,13 @@ def DumpEproms():
 		# 0x???? - 6400002-04D	2Kx8 EPROM 131313120F0F0F0F0F0F0F0F0F0E0F10
 		# 
 		
-		#ReadEprom(gpib, 0x2800, 0x0800, '6400003-05D-Read.hex')
+		#ReadEprom(memory, 0x2800, 0x0800, '6400003-05D-Read.hex')
 
-		#ReadEprom(gpib, 0xC000, 0x1000, '6500003-01D-Read.hex')
-		#ReadEprom(gpib, 0xD000, 0x1000, '6500003-02D-Read.hex')
-		#ReadEprom(gpib, 0xE000, 0x1000, '6500003-03D-Read.hex')
-		#ReadEprom(gpib, 0xF000, 0x1000, '6500003-04D-Read.hex')
-		ReadEprom(gpib, 0x0000, 0x0800, '0000-07FF-Read.hex')
+		#ReadEprom(memory, 0xC000, 0x1000, '6500003-01D-Read.hex', reference='6500003-01D.hex')
+		#ReadEprom(memory, 0xD000, 0x1000, '6500003-02D-Read.hex')
+		#ReadEprom(memory, 0xE000, 0x1000, '6500003-03D-Read.hex')
+		#ReadEprom(memory, 0xF000, 0x1000, '6500003-04D-Read.hex')
+		ReadEprom(memory, 0x0000, 0x0800, '0000-07FF-Read.hex')
 		
 		
 	
@@ -7,8 +7,13 @@ This is a pretty simple interface, you may need to add your own implementation f
 # we need to select the specific GPIB interface driver needed
 from gpib.prologix.ethernet import PrologixEthernetGPIB
 from gpib.base import GPIBTimeout
+from acquisition.clock import LogClock, TIMESTAMP_TEXT, TIMESTAMP_EPOCH_NS
+from acquisition.schedule import DeadlineScheduler, OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_STRETCH
+from instruments.k740 import K740Thermometer, TYPE_K
+from instruments.k705 import K705Matrix
+from instruments.k2015 import K2015BinaryBurst
+from acquisition.binary import REAL64
 
-from datetime import datetime
 import time
 import sys
 
@@ -16,14 +21,21 @@ GPIB_ETHERNET_HOST_NAME = '192.168.0.10'
 MAX_COMMAND_TIMEOUT_SEC = 3
 
 MEASUREMENT_DELAY = 1.0
+OVERRUN_POLICY = OVERRUN_STRETCH		# the scan takes longer than MEASUREMENT_DELAY, run the cycles back to back
+TIMESTAMP_MODE = TIMESTAMP_TEXT		# TIMESTAMP_EPOCH_NS logs integer nanoseconds, see acquisition/clock.py
 MATRIX_SWITCH_STABILISE_DELAY = 0.2
 
 TMP_LOGGER_ADDR = 11
 MATRIX_SWITCH_ADDR = 10
 K2015_A_ADDR = 1
+K2015_SAMPLES = 1		# readings averaged for each input, taken in one burst
 
 
 def RunMeasurements():
+	# timestamps of the records, and the start of each cycle on a fixed phase
+	clock = LogClock(TIMESTAMP_MODE)
+	scheduler = DeadlineScheduler(MEASUREMENT_DELAY, OVERRUN_POLICY)
+
 	# create and open the connection to the interface
 	gpib = PrologixEthernetGPIB(GPIB_ETHERNET_HOST_NAME, MAX_COMMAND_TIMEOUT_SEC)
 	gpib.open()
@@ -31,113 +43,96 @@ def RunMeasurements():
 		# Clear the bus
 		gpib.interface_clear()
 	
-		#
 		# Configure the Keithley 740 Scanning Theromometer
 		# currently only channels 7 & 8 are K type, Channels 2-6 are J, Channels 9 & 10 are T.
-		#
-		gpib.select(TMP_LOGGER_ADDR)
-		gpib.write('K0X')		# Assert EOI, hold off bus until commands complete
-		gpib.write('P1X')		# filter on
-		gpib.write('O0X')		# celsius scale
-		gpib.write('N10X')		# set all channels off
-		gpib.write('T0X')		# trigger continous on talk (make a measurement when addressed to talk)
-		gpib.write('G2X')		# format without prefix or suffix
-		gpib.write('F0X')		# Function = current channel
-		gpib.write('B0X')		# Read mode = current channel
+		thermometer = K740Thermometer(gpib, TMP_LOGGER_ADDR, {7: TYPE_K, 8: TYPE_K})
+		thermometer.setup()
+	
+		# Configure the instruments, the commands are sent to the interface together
+		with gpib.batch() as batch:
 		
+			#
+			# Configure the Keithley 705 switch.
+			# This code assumes 2 * 7052 4*5 Matrix cards
+			# Column 01 - 05 is card slot 1
+			# Column 06 - 10 is card slot 2
+			# Rows are 1 - 4
+			# The "channel" numbers are then ccr (eg Col 3, row 2 = 03:2) close is C03:2, open is N03:2
+			#
+			# We will use columns as inputs, and rows as outputs. Note that we can tie the cards together to get more
+			# columns or rows.. 
+			# 
+			# we can then configure each input to go to 1 or more outputs or we can cycle them between each output
+			# and keep the outputs isolated. It is pretty flexible as we can open and close any cross-connect at any time.
+			# 
+			# WARNING: a delay is needed 
+			batch.select(MATRIX_SWITCH_ADDR)
+			batch.write('K0X')		# Assert EOI
+			batch.write('T6X')		# trigger on external (not using triggers)
+			batch.write('A0X')		# Matrix mode
+			batch.write('RX')		# Reset all channels
+			batch.wait(MATRIX_SWITCH_STABILISE_DELAY)	# the switch needs time to complete the reset
 		
-		# configure channels. Note if a reading is attempted on an "OFF" channel, the bus will lockup
-		gpib.write('C07N2X')	# Channel 7, Type K
-		gpib.write('C08N2X')	# Channel 8, Type K
+			batch.write('B011X')		# temp.. display col 1 row 1
 		
-		#
-		# Configure the Keithley 705 switch.
-		# This code assumes 2 * 7052 4*5 Matrix cards
-		# Column 01 - 05 is card slot 1
-		# Column 06 - 10 is card slot 2
-		# Rows are 1 - 4
-		# The "channel" numbers are then ccr (eg Col 3, row 2 = 03:2) close is C03:2, open is N03:2
-		#
-		# We will use columns as inputs, and rows as outputs. Note that we can tie the cards together to get more
-		# columns or rows.. 
-		# 
-		# we can then configure each input to go to 1 or more outputs or we can cycle them between each output
-		# and keep the outputs isolated. It is pretty flexible as we can open and close any cross-connect at any time.
-		# 
-		# WARNING: a delay is needed 
-		gpib.select(MATRIX_SWITCH_ADDR)
-		gpib.write('K0X')		# Assert EOI
-		gpib.write('T6X')		# trigger on external (not using triggers)
-		gpib.write('A0X')		# Matrix mode
-		gpib.write('RX')		# Reset all channels
+			# Configure the Keithley 2015
+			batch.select(K2015_A_ADDR)
+			batch.write(":FUNC 'VOLT:DC'")
+			batch.write(":VOLT:DC:RANGE 10")
+			batch.write(":VOLT:DC:NPLC 10")			# 10 = 'slow' rate, 1 = 'medium'
+			batch.write(":VOLT:DC:DIG MAX")
+			#batch.write(":VOLT:DC:AVER:TCON MOV")	# setup the averaging filter
+			#batch.write(":VOLT:DC:AVER:COUNT 10")	# 10 averages
+			batch.write(":VOLT:DC:AVER:STATE OFF")	# disable filter
+			batch.write(":INIT:CONT OFF")			# one shot trigger
+
 		
-		gpib.write('B011X')		# temp.. display col 1 row 1
 		
-		# Configure the Keithley 2015
-		gpib.select(K2015_A_ADDR)
-		gpib.write(":FUNC 'VOLT:DC'")
-		gpib.write(":VOLT:DC:RANGE 10")
-		gpib.write(":VOLT:DC:NPLC 10")			# 10 = 'slow' rate, 1 = 'medium'
-		gpib.write(":VOLT:DC:DIG MAX")
-		gpib.write(":FORMAT:DATA ASCII")
-		#gpib.write(":VOLT:DC:AVER:TCON MOV")	# setup the averaging filter
-		#gpib.write(":VOLT:DC:AVER:COUNT 10")	# 10 averages
-		gpib.write(":VOLT:DC:AVER:STATE OFF")	# disable filter
-		gpib.write(":INIT:CONT OFF")			# one shot trigger
-
+		# the matrix switch has been reset, all crosspoints are open
+		matrix = K705Matrix(gpib, MATRIX_SWITCH_ADDR)
 		
+		# K2015 readings for each input, returned together from one :READ? as doubles
+		burst = K2015BinaryBurst(gpib, K2015_A_ADDR, K2015_SAMPLES, REAL64)
+		burst.setup()
 		
 		# CSV header row.
+		sys.stdout.write(clock.header())
 		sys.stdout.write('DateTime, T7, T8, C1, C2, C3, C4, C5\n')
 		
 		while True:
 			measurements = []
-			# capture the time now, so we can get a consistent delay at the end
-			start = datetime.now()
+			# wait for the start of the cycle
+			scheduler.wait()
 			
 			# datetime
-			measurements.append(start.strftime("%Y-%m-%d %H:%M:%S"))
+			measurements.append(clock.now())
 			
 			# K740
-			gpib.select(TMP_LOGGER_ADDR)
-			# select Channel 7
-			gpib.write('C07X')
-			measurements.append(float(gpib.read()))				# trigger and fetch current reading
-			# select Channel 8
-			gpib.write('C08X')
-			measurements.append(float(gpib.read()))				# trigger and fetch current reading
+			measurements.extend(thermometer.read_channels())
 			
 		
 			# Row 1: K2015	
 			# Col 1 - 5: inputs
 			
 			for c in range(1, 6):
-				# enable the channel
-				gpib.select(MATRIX_SWITCH_ADDR)
-				gpib.write('C{col:02d}:{row:d}X'.format(col=c, row=1))
+				# enable the channel, this also disables the previous channel in the same command
+				matrix.route(['{col:02d}:{row:d}'.format(col=c, row=1)])
 				time.sleep(MATRIX_SWITCH_STABILISE_DELAY)				#stabilise
 				
 				# K2015
-				gpib.select(K2015_A_ADDR)
-				measurements.append(round(float(gpib.query(":READ?")), 7))
+				measurements.append(round(burst.read_summary().mean, 7))
 				
-				# disable channel
-				gpib.select(MATRIX_SWITCH_ADDR)
-				gpib.write('N{col:02d}:{row:d}X'.format(col=c, row=1))
+			# disable channel
+			matrix.route([])
 			
 						
 			sys.stdout.write(','.join(str(x) for x in measurements))
 			sys.stdout.write('\n')
 			sys.stdout.flush()
 
-			# compute the elapsed time and if it is under our measurement delay, we wait
-			# the appropraite time to sync to the start of the cycle again
-		#	elapsed = datetime.now() - start
-		#	if elapsed.total_seconds() < MEASUREMENT_DELAY:
-		#		time.sleep(MEASUREMENT_DELAY - elapsed.total_seconds())
-
 	finally:
 		# Something went wrong, close.
+		sys.stderr.write('%s\n' % scheduler.stats)
 		gpib.close()
 
 #
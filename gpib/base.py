@@ -32,6 +32,11 @@ class GPIBBase(metaclass=ABCMeta):
 		"Clear / reset the selected device"
 		pass
 		
+	@abstractmethod
+	def trigger(self, addrs):
+		"Send a group execute trigger to the given devices, or the selected device if none are given"
+		pass
+		
 	@abstractmethod
 	def write(self, cmd):
 		"Write a command to the device"
@@ -0,0 +1,247 @@
+from gpib.base import GPIBBase, GPIBTimeout
+from gpib.prologix.ethernet import PrologixEthernetGPIB, PACING_FIXED, PACING_SPOLL
+import collections
+import statistics
+import asyncio
+import socket
+import time
+
+class AsyncPrologixEthernetGPIB(GPIBBase):
+	"""
+	asyncio implementation of the Prologix Ethernet GPIB Interface
+
+	All of the GPIBBase methods are coroutines, so bus I/O can be overlapped with
+	file output, analysis or other interfaces in one event loop:
+
+		gpib = AsyncPrologixEthernetGPIB('192.168.0.10', 3)
+		await gpib.open()
+		await gpib.select(1)
+		value = float(await gpib.query(':READ?'))
+
+	Operations on one interface must not be interleaved between tasks, hold
+	lock for a select / write / read sequence when the interface is shared.
+
+	A timeout raises GPIBTimeout. If a read times out or is cancelled the reply
+	is still consumed and discarded when it arrives, until the interface read
+	timeout has passed, so it is never taken as the reply to a later read.
+	"""
+
+	_PORT = PrologixEthernetGPIB._PORT
+	_READ_DELAY = PrologixEthernetGPIB._READ_DELAY
+	_MAV = PrologixEthernetGPIB._MAV
+	_SPOLL_LIMIT = PrologixEthernetGPIB._SPOLL_LIMIT
+	_READ_TIMEOUT = PrologixEthernetGPIB._READ_TIMEOUT
+	_CALIBRATE_COUNT = PrologixEthernetGPIB._CALIBRATE_COUNT
+	_LF = PrologixEthernetGPIB._LF
+	_EOT = PrologixEthernetGPIB._EOT
+	_READ_SIZE = 64 * 1024
+	_FRAME_CACHE_SIZE = PrologixEthernetGPIB._FRAME_CACHE_SIZE
+	_ESCAPE_TABLE = PrologixEthernetGPIB._ESCAPE_TABLE
+
+	# command encoding is shared with the blocking driver
+	_escape = PrologixEthernetGPIB._escape
+	_frame = PrologixEthernetGPIB._frame
+	_data_frame = PrologixEthernetGPIB._data_frame
+	_trigger_command = PrologixEthernetGPIB._trigger_command
+
+	def __init__(self, hostname, timeout=1, port=_PORT, pacing=PACING_FIXED):
+		GPIBBase.__init__(self)
+		self.host = hostname
+		self.port = port
+		self.timeout = timeout
+		self.pacing = pacing
+		self.link_rtt = self._READ_DELAY
+		self.turnaround = {}
+		self.lock = asyncio.Lock()
+		self._no_mav = set()
+		self._addr = None
+		self._write_time = None
+		self._reader = None
+		self._writer = None
+		self._rx = bytearray()
+		self._owed = collections.deque()	# (terminator, skip_eot, expires) of replies requested but not yet received
+		self._skip_eot = False
+		self._frames = {}
+		self._data_frames = {}
+
+	async def open(self):
+		self._addr = None
+		self._rx.clear()
+		self._owed.clear()
+		try:
+			self._reader, self._writer = await asyncio.wait_for(
+				asyncio.open_connection(self.host, self.port), self.timeout)
+		except asyncio.TimeoutError:
+			raise GPIBTimeout()
+		sock = self._writer.get_extra_info('socket')
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+		await self._setup()
+		if self.pacing != PACING_FIXED:
+			self.link_rtt = await self.calibrate()
+
+	async def close(self):
+		if self._writer is not None:
+			self._writer.close()
+			try:
+				await self._writer.wait_closed()
+			except OSError:
+				pass
+			self._writer = None
+
+	async def select(self, addr):
+		addr = int(addr)
+		if addr == self._addr:
+			return
+		self._addr = None
+		await self._send('++addr %i' % addr)
+		self._addr = addr
+
+	async def interface_clear(self):
+		self._addr = None
+		await self._send('++ifc')
+
+	async def selected_device_clear(self):
+		await self._send('++clr')
+
+	async def trigger(self, addrs=()):
+		await self._send(self._trigger_command(addrs))
+
+	async def write(self, cmd):
+		self._writer.write(self._data_frame(cmd))
+		await self._writer.drain()
+		if self.pacing == PACING_FIXED:
+			await asyncio.sleep(self._READ_DELAY)
+		else:
+			self._write_time = time.monotonic()
+
+	async def read(self, num_bytes=1024):
+		await self._wait_ready()
+		value = await self._request('++read eoi', self._EOT)
+		return value.strip(' \t\n\r')
+
+	async def readeol(self, num_bytes=1024):
+		await self._wait_ready()
+		# if the LF was sent with EOI the interface follows it with EOT
+		value = await self._request('++read 10', self._LF, skip_eot=True)
+		return value.strip(' \t\n\r')
+
+	async def query(self, cmd, buffer_size=1024*1024):
+		await self.write(cmd)
+		return await self.read(buffer_size)
+
+	async def serial_poll(self):
+		"Read the status byte of the selected device"
+		return int((await self._request('++spoll', self._LF)).strip(' \t\n\r'))
+
+	def set_turnaround(self, addr, seconds):
+		"Set the time a device needs between a write and a read, used by adaptive pacing"
+		self.turnaround[int(addr)] = seconds
+
+	async def calibrate(self):
+		"Measure the round trip time of the adapter"
+		times = []
+		for i in range(self._CALIBRATE_COUNT):
+			start = time.perf_counter()
+			await self._request('++ver', self._LF)
+			times.append(time.perf_counter() - start)
+		return statistics.median(times)
+
+
+	#
+	# Internal implementation
+	#
+	async def _send(self, value):
+		self._writer.write(self._frame(value))
+		await self._writer.drain()
+
+	async def _request(self, value, terminator, skip_eot=False):
+		# Send a command and wait for its reply. Replies owed to requests that timed
+		# out or were cancelled are discarded, or dropped once the interface would
+		# have given up on them
+		loop = asyncio.get_running_loop()
+		self._writer.write(self._frame(value))
+		now = loop.time()
+		self._owed.append((terminator, skip_eot, now + self._READ_TIMEOUT + self.link_rtt))
+		deadline = now + self.timeout
+		try:
+			await self._writer.drain()
+			while True:
+				terminator, skip_eot, expires = self._owed[0]
+				stale = len(self._owed) > 1
+				try:
+					message = await self._recv_message(terminator, min(deadline, expires) if stale else deadline)
+				except GPIBTimeout:
+					if stale and loop.time() >= expires:
+						# the interface gave up on the reply, it will not arrive
+						self._owed.popleft()
+						continue
+					raise
+				self._owed.popleft()
+				if skip_eot:
+					self._skip_eot = True
+				if not stale:
+					return message.decode('ascii')
+		except GPIBTimeout:
+			self._addr = None
+			raise
+
+	async def _recv_message(self, terminator, deadline):
+		# Receive up to the terminator, which is removed. Reading from the stream is
+		# cancellation safe, received data stays in _rx until a message is complete
+		loop = asyncio.get_running_loop()
+		scanned = 0
+		while True:
+			if self._skip_eot and self._rx:
+				self._skip_eot = False
+				if self._rx[0] == self._EOT:
+					del self._rx[0]
+
+			end = self._rx.find(terminator, scanned)
+			if end >= 0:
+				message = bytes(self._rx[:end])
+				del self._rx[:end+1]
+				return message
+			scanned = len(self._rx)
+
+			try:
+				data = await asyncio.wait_for(self._reader.read(self._READ_SIZE), deadline - loop.time())
+			except asyncio.TimeoutError:
+				if self._rx:
+					# no terminator, the device did not assert EOI. Return what we have
+					message = bytes(self._rx)
+					self._rx.clear()
+					return message
+				raise GPIBTimeout()
+			if not data:
+				self._addr = None
+				raise ConnectionError('GPIB interface closed the connection')
+			self._rx += data
+
+	async def _wait_ready(self):
+		if self._write_time is None:
+			return
+		write_time = self._write_time
+		self._write_time = None
+
+		if self.pacing == PACING_SPOLL and self._addr not in self._no_mav:
+			while not (await self.serial_poll()) & self._MAV:
+				if time.monotonic() - write_time > self._SPOLL_LIMIT:
+					self._no_mav.add(self._addr)
+					return
+			self.turnaround[self._addr] = time.monotonic() - write_time
+			return
+
+		turnaround = self.turnaround.get(self._addr, self.link_rtt)
+		delay = write_time + turnaround - time.monotonic()
+		if delay > 0:
+			await asyncio.sleep(delay)
+
+	async def _setup(self):
+		await self._send('++savecfg 0')
+		await self._send('++mode 1')
+		await self._send('++auto 0')
+		await self._send('++read_tmo_ms %d' % (self._READ_TIMEOUT * 1000))
+		await self._send('++eos 3')
+		await self._send('++eot_enable 1')
+		await self._send('++eot_char %d' % self._EOT)
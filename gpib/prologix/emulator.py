@@ -0,0 +1,413 @@
+"""
+Local emulator for the Prologix Ethernet GPIB interface
+
+Runs a TCP server that speaks the Prologix '++' controller protocol and hosts
+simulated instruments at GPIB addresses. This allows the drivers and logging
+scripts to be exercised and benchmarked without the physical adapter.
+
+	emulator = PrologixEmulator({10: SimulatedScpiMeter()})
+	emulator.start()
+	gpib = PrologixEthernetGPIB('127.0.0.1', port=emulator.port)
+	...
+	emulator.stop()
+
+The emulator can also be used as a context manager.
+"""
+
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+ESC = 0x1B
+CR = 0x0D
+LF = 0x0A
+PLUS = 0x2B
+
+# ++eos modes, terminator appended to data sent to the instruments
+EOS_TERMINATORS = {0: b'\r\n', 1: b'\r', 2: b'\n', 3: b''}
+
+VERSION = b'Prologix GPIB-ETHERNET Controller version 01.06.06.00 (emulated)\r\n'
+
+
+class SimulatedInstrument(object):
+	"""
+	Base class for instruments hosted by the emulator
+
+	Messages written to the device are passed to handle(), which may queue a
+	response using respond(). The response becomes available once the simulated
+	latency has passed, this models the conversion / processing time of the
+	instrument.
+	"""
+
+	def __init__(self, latency=0.0):
+		self.latency = latency
+		self._output = bytearray()
+		self._ready_at = 0.0
+		self.lock = threading.Lock()
+
+	def write(self, message):
+		"A message (without terminator) has been addressed to the device"
+		self._ready_at = time.monotonic() + self.latency
+		self.handle(message)
+
+	def handle(self, message):
+		"Override to process messages sent to the device"
+		pass
+
+	def respond(self, data):
+		"Queue response data to be read when the device is addressed to talk"
+		if isinstance(data, str):
+			data = data.encode('ascii')
+		self._output += data
+
+	def talk(self):
+		"The device has been addressed to talk, wait until it is ready"
+		delay = self._ready_at - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+
+	def read(self, until_lf=False):
+		"Read the pending output, optionally stopping after the first LF"
+		self.talk()
+		if until_lf:
+			end = self._output.find(b'\n')
+			if end >= 0:
+				data = bytes(self._output[:end+1])
+				del self._output[:end+1]
+				return data
+		data = bytes(self._output)
+		self._output.clear()
+		return data
+
+	def has_output(self):
+		"True if there is still output pending, the last byte read is sent with EOI when there is not"
+		return bool(self._output)
+
+	def clear(self):
+		"Selected device clear"
+		self._output.clear()
+		self._ready_at = 0.0
+
+	def trigger(self):
+		"Group execute trigger"
+		pass
+
+	def is_ready(self):
+		"True if output is available and the device is no longer busy"
+		return bool(self._output) and time.monotonic() >= self._ready_at
+
+	def serial_poll(self):
+		"Status byte, bit 4 (MAV) is set when a response is available"
+		return 0x10 if self.is_ready() else 0x00
+
+
+class SimulatedTalkMeter(SimulatedInstrument):
+	"""
+	Meter that makes a measurement whenever it is addressed to talk
+
+	Models older instruments such as the K196 and K740 configured with T0X.
+	Commands are accepted and ignored.
+	"""
+
+	def __init__(self, reading=None, latency=0.0, fmt='%+.6E'):
+		SimulatedInstrument.__init__(self, latency)
+		self.reading = reading or (lambda: random.gauss(1.0, 1e-6))
+		self.fmt = fmt
+		self.commands = []
+		self.triggered = None		# reading taken on the last group execute trigger
+
+	def handle(self, message):
+		self.commands.append(message)
+
+	def trigger(self):
+		self._ready_at = time.monotonic() + self.latency
+		self.triggered = self.reading()
+
+	def talk(self):
+		SimulatedInstrument.talk(self)
+		if not self._output:
+			value = self.triggered if self.triggered is not None else self.reading()
+			self.triggered = None
+			self.respond((self.fmt % value) + '\r\n')
+
+	def is_ready(self):
+		return time.monotonic() >= self._ready_at
+
+
+class SimulatedScpiMeter(SimulatedInstrument):
+	"""
+	Minimal SCPI meter such as the K2015
+
+	Queries (commands ending with '?') return a reading, or a fixed response
+	when one is registered in responses. Other commands are recorded. :READ?
+	and :FETCH? return :SAMP:COUN readings separated by commas, or as an IEEE
+	488.2 definite length block after :FORM:DATA REAL,32 / REAL,64 / DREAL.
+	"""
+
+	def __init__(self, reading=None, latency=0.0, responses=None):
+		SimulatedInstrument.__init__(self, latency)
+		self.reading = reading or (lambda: random.gauss(1.0, 1e-6))
+		self.responses = {
+			'*IDN?': 'KEITHLEY INSTRUMENTS INC.,MODEL 2015,0000000,A00 (emulated)',
+		}
+		self.responses.update(responses or {})
+		self.commands = []
+		self.sample_count = 1
+		self.data_format = 'ASCII'
+		self.swapped = False		# :FORM:BORD SWAP, binary readings are little endian
+		self.triggered = None		# readings taken on the last group execute trigger
+
+	def write(self, message):
+		# only a measurement makes the meter busy, query() and trigger() set when it is ready
+		self.handle(message)
+
+	def handle(self, message):
+		for cmd in message.decode('ascii').split(';'):
+			cmd = cmd.strip()
+			if not cmd:
+				continue
+			self.commands.append(cmd)
+			if cmd.endswith('?'):
+				self.query(cmd)
+				continue
+			header, _, value = cmd.upper().partition(' ')
+			if header in (':SAMP:COUN', ':SAMPLE:COUNT'):
+				self.sample_count = int(value)
+			elif header in (':FORM', ':FORM:DATA', ':FORMAT', ':FORMAT:DATA'):
+				self.data_format = value.replace(' ', '')
+			elif header in (':FORM:BORD', ':FORMAT:BORDER'):
+				self.swapped = value.startswith('SWAP')
+
+	def trigger(self):
+		self._ready_at = time.monotonic() + self.latency * self.sample_count
+		self.triggered = self.readings()
+
+	def readings(self):
+		values = [self.reading() for i in range(self.sample_count)]
+		if self.data_format.startswith('ASC'):
+			return ','.join('%+.8E' % x for x in values)
+		code = 'f' if self.data_format in ('REAL', 'REAL,32', 'SREAL', 'SRE') else 'd'
+		data = struct.pack(('<' if self.swapped else '>') + code * len(values), *values)
+		length = b'%d' % len(data)
+		return b'#%d%s%s' % (len(length), length, data)
+
+	def query(self, cmd):
+		response = self.responses.get(cmd.upper(), None)
+		if response is None and cmd.upper() == ':FETCH?' and self.triggered is not None:
+			response = self.triggered
+		elif response is None:
+			self._ready_at = time.monotonic() + self.latency * self.sample_count
+			response = self.readings()
+		elif callable(response):
+			response = response()
+		self.respond(response)
+		self.respond('\n')
+
+
+class PrologixEmulator(object):
+	"""
+	TCP server emulating a Prologix GPIB-ETHERNET controller
+
+	instruments maps GPIB addresses to SimulatedInstrument objects. Use port 0
+	to pick a free port, the chosen port is available from the port attribute
+	once started.
+	"""
+
+	def __init__(self, instruments=None, host='127.0.0.1', port=0, chunk_size=None):
+		self.instruments = dict(instruments or {})
+		self.host = host
+		self.port = port
+		self.chunk_size = chunk_size	# split responses into segments of this size
+		self.commands = []				# log of all '++' commands received
+		self.messages = []				# log of (address, bytes sent on the bus, EOI asserted) for device data
+		self._server = None
+		self._thread = None
+
+	def start(self):
+		emulator = self
+
+		class Handler(socketserver.BaseRequestHandler):
+			def handle(self):
+				self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+				_PrologixSession(emulator, self.request).run()
+
+		self._server = socketserver.ThreadingTCPServer((self.host, self.port), Handler, bind_and_activate=False)
+		self._server.allow_reuse_address = True
+		self._server.daemon_threads = True
+		self._server.server_bind()
+		self._server.server_activate()
+		self.port = self._server.server_address[1]
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
+
+
+class _PrologixSession(object):
+	"Protocol state for one client connection"
+
+	def __init__(self, emulator, connection):
+		self.emulator = emulator
+		self.connection = connection
+		self.addr = None
+		self.auto = False
+		self.eos = 0
+		self.eoi = True
+		self._message = bytearray()		# data sent to the device before the end of its message
+		self.eot_enable = False
+		self.eot_char = 0
+		self.read_tmo = 0.5
+
+	def run(self):
+		line = bytearray()
+		command = True		# until proven otherwise, a line may be a '++' command
+		escaped = False
+		while True:
+			try:
+				data = self.connection.recv(65536)
+			except OSError:
+				return
+			if not data:
+				return
+			for b in data:
+				if escaped:
+					escaped = False
+					if len(line) < 2:
+						command = False
+					line.append(b)
+				elif b == ESC:
+					escaped = True
+				elif b == CR or b == LF:
+					if line:
+						try:
+							self._dispatch(bytes(line), command)
+						except OSError:
+							return		# client has gone away
+					line = bytearray()
+					command = True
+				else:
+					if len(line) < 2 and b != PLUS:
+						command = False
+					line.append(b)
+
+	def _dispatch(self, line, command):
+		if command and line.startswith(b'++'):
+			self._controller_command(line[2:].decode('ascii').strip())
+		else:
+			self._data(line)
+
+	def _send(self, data):
+		size = self.emulator.chunk_size
+		if not size:
+			self.connection.sendall(data)
+			return
+		for i in range(0, len(data), size):
+			self.connection.sendall(data[i:i+size])
+
+	def _instrument(self):
+		return self.emulator.instruments.get(self.addr, None)
+
+	def _data(self, line):
+		instrument = self._instrument()
+		if instrument is None:
+			return
+		# ++eos appends the terminator, ++eoi asserts EOI with the last byte. The
+		# device only sees the end of the message at EOI or a LF
+		data = line + EOS_TERMINATORS[self.eos]
+		self.emulator.messages.append((self.addr, data, self.eoi))
+		self._message += data
+		if not self.eoi and not data.endswith(b'\n'):
+			return
+		message = bytes(self._message).rstrip(b'\r\n')
+		self._message.clear()
+		with instrument.lock:
+			instrument.write(message)
+		if self.auto:
+			self._read(False)
+
+	def _read(self, until_lf):
+		instrument = self._instrument()
+		if instrument is None:
+			time.sleep(self.read_tmo)
+			return
+		with instrument.lock:
+			data = instrument.read(until_lf)
+			eoi = not instrument.has_output()
+		if not data:
+			time.sleep(self.read_tmo)
+			return
+		if self.eot_enable and eoi:
+			data = data + bytes([self.eot_char])
+		self._send(data)
+
+	def _controller_command(self, text):
+		self.emulator.commands.append(text)
+		parts = text.split(None, 1)
+		name = parts[0].lower() if parts else ''
+		arg = parts[1].strip() if len(parts) > 1 else None
+
+		if name == 'addr':
+			if arg is None:
+				self._send(b'%d\r\n' % (self.addr or 0))
+			else:
+				self.addr = int(arg.split()[0])
+				self._message.clear()
+		elif name == 'read':
+			self._read(arg is not None and arg.lower() != 'eoi' and int(arg) == LF)
+		elif name == 'auto':
+			self._setting('auto', arg, bool)
+		elif name == 'eos':
+			self._setting('eos', arg, int)
+		elif name == 'eoi':
+			self._setting('eoi', arg, bool)
+		elif name == 'eot_enable':
+			self._setting('eot_enable', arg, bool)
+		elif name == 'eot_char':
+			self._setting('eot_char', arg, int)
+		elif name == 'read_tmo_ms':
+			self.read_tmo = int(arg) / 1000.0
+		elif name == 'ifc':
+			pass
+		elif name == 'clr':
+			instrument = self._instrument()
+			if instrument is not None:
+				with instrument.lock:
+					instrument.clear()
+		elif name == 'trg':
+			addresses = [int(a) for a in arg.split()] if arg else [self.addr]
+			for a in addresses:
+				instrument = self.emulator.instruments.get(a, None)
+				if instrument is not None:
+					with instrument.lock:
+						instrument.trigger()
+		elif name == 'spoll':
+			a = int(arg.split()[0]) if arg else self.addr
+			instrument = self.emulator.instruments.get(a, None)
+			status = 0
+			if instrument is not None:
+				with instrument.lock:
+					status = instrument.serial_poll()
+			self._send(b'%d\r\n' % status)
+		elif name == 'ver':
+			self._send(VERSION)
+		# mode, savecfg and other commands are accepted and ignored
+
+	def _setting(self, name, arg, convert):
+		if arg is None:
+			self._send(b'%d\r\n' % int(getattr(self, name)))
+		else:
+			setattr(self, name, convert(int(arg)))
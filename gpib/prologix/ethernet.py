@@ -1,18 +1,47 @@
 from gpib.base import GPIBBase, GPIBTimeout
+import statistics
 import socket
 import time
 
+# Pacing modes, control how long to wait between a write and the following read
+PACING_FIXED = 'fixed'			# sleep for _READ_DELAY after every write
+PACING_ADAPTIVE = 'adaptive'	# only wait before a read that follows a write, for the device turnaround
+PACING_SPOLL = 'spoll'			# serial poll until the device reports a message is available
+
 class PrologixEthernetGPIB(GPIBBase):
 	"Allows the use of the Prologix Ethernet GPIB Interface"
 
 	_PORT = 1234		#ethernet interface always uses this port number
 	_ESC = '\x1B'
 	_READ_DELAY = .05
+	_MAV = 0x10			# status byte Message AVailable bit
+	_SPOLL_LIMIT = 1.0	# give up polling a device that never reports MAV after this long
+	_READ_TIMEOUT = 3.0	# ++read_tmo_ms, after which the interface gives up on a reply
+	_CALIBRATE_COUNT = 5
+	_LF = 0x0A
+	_EOT = 0x04			# appended by the interface when EOI is detected, marks the end of a message
+	_HASH = 0x23		# start of an IEEE 488.2 binary block
+	_ZERO = 0x30
+	_BUFFER_SIZE = 64 * 1024
+	_FRAME_CACHE_SIZE = 256
+	_ESCAPE_TABLE = str.maketrans({c: '\x1B' + c for c in '\x1B+\n\r'})
 
-	def __init__(self, hostname, timeout=1):
+	def __init__(self, hostname, timeout=1, port=_PORT, pacing=PACING_FIXED):
 		GPIBBase.__init__(self)
 		self.host = hostname
+		self.port = port
 		self.timeout = timeout
+		self.pacing = pacing
+		self.link_rtt = self._READ_DELAY	# adapter round trip time, measured on open
+		self.turnaround = {}				# per device turnaround, set or measured
+		self._no_mav = set()				# devices that do not report MAV in the status byte
+		self._addr = None
+		self._write_time = None				# time of a write that has not been followed by a read
+		self._buffer = bytearray(self._BUFFER_SIZE)	# receive buffer, reused for every response
+		self._rx_len = 0					# bytes received beyond the end of the last message
+		self._skip_eot = False				# a readeol may be followed by the EOT of the same message
+		self._frames = {}					# encoded controller commands
+		self._data_frames = {}				# escaped and encoded device commands
 		self.socket = socket.socket(socket.AF_INET,
 									socket.SOCK_STREAM,
 									socket.IPPROTO_TCP)
@@ -22,66 +51,326 @@ class PrologixEthernetGPIB(GPIBBase):
 
 	def open(self):
 		# Open attempt to connect to the Ethernert GPIB Interface
-		self.socket.connect( (self.host, self._PORT) )
+		self._addr = None
+		self._rx_len = 0
+		self.socket.connect( (self.host, self.port) )
 		# perform the house keeping initialisation
 		self._setup()
+		if self.pacing != PACING_FIXED:
+			self.link_rtt = self.calibrate()
 
 
 	def close(self):
 		self.socket.close()
 
 	def select(self, addr):
-		self._send('++addr %i' % int(addr))
+		addr = int(addr)
+		if addr == self._addr:
+			return		# already addressed, nothing to send
+		self._addr = None
+		self._send('++addr %i' % addr)
+		self._addr = addr
 
 	def interface_clear(self):
+		self._addr = None
 		self._send('++ifc')
 
 	def selected_device_clear(self):
 		self._send('++clr')
 
+	def trigger(self, addrs=()):
+		self._send(self._trigger_command(addrs))
+
 	def write(self, cmd):
-		self._send(self._escape(cmd))
-		time.sleep(self._READ_DELAY) # A delay is needed between writes and reads
+		self.socket.sendall(self._data_frame(cmd))
+		if self.pacing == PACING_FIXED:
+			time.sleep(self._READ_DELAY) # A delay is needed between writes and reads
+		else:
+			self._write_time = time.monotonic()
 		
 	def read(self, num_bytes=1024):
+		self._wait_ready()
 		self._send('++read eoi')
 		try:
-			return self._recv(num_bytes).strip(' \t\n\r')
+			return self._recv(num_bytes, self._EOT).strip(' \t\n\r')
 		except socket.timeout:
+			self._addr = None
 			raise GPIBTimeout()
 
 	def readeol(self, num_bytes=1024):
+		self._wait_ready()
 		self._send('++read 10')	# read to LF character
 		try:
-			return self._recv(num_bytes).strip(' \t\n\r')
+			value = self._recv(num_bytes, self._LF)
 		except socket.timeout:
+			self._addr = None
 			raise GPIBTimeout()
+		# if the LF was sent with EOI the interface follows it with EOT
+		self._skip_eot = True
+		return value.strip(' \t\n\r')
 
 	def query(self, cmd, buffer_size=1024*1024):
-		self.write(self._escape(cmd))
+		self.write(cmd)
 		return self.read(buffer_size)
 
+	def read_block(self, size=None):
+		"""
+		Read an IEEE 488.2 binary block, returns the data without the header
+
+		The data is received straight into a new bytearray, so it can be decoded in
+		place (eg. with numpy.frombuffer). A definite length block (#<n><length>)
+		gives its own size. An indefinite length block (#0) needs size, as the data
+		may contain the EOT that marks the end of a message.
+		"""
+		self._wait_ready()
+		self._send('++read eoi')
+		try:
+			return self._recv_block(size)
+		except socket.timeout:
+			self._rx_len = 0
+			self._addr = None
+			raise GPIBTimeout()
+
+	def query_block(self, cmd, size=None):
+		"Send a command and read the binary block response, see read_block"
+		self.write(cmd)
+		return self.read_block(size)
+
+	def batch(self):
+		"Create a batch of operations that are sent to the interface together, see PrologixBatch"
+		return PrologixBatch(self)
+
+	def serial_poll(self):
+		"Read the status byte of the selected device"
+		self._send('++spoll')
+		try:
+			return int(self._recv(16, self._LF).strip(' \t\n\r'))
+		except socket.timeout:
+			self._addr = None
+			raise GPIBTimeout()
+
+	def set_turnaround(self, addr, seconds):
+		"Set the time a device needs between a write and a read, used by adaptive pacing"
+		self.turnaround[int(addr)] = seconds
+
+	def discard_replies(self):
+		"""
+		Discard the replies the interface still owes, eg. to a batch that timed out
+
+		The interface answers ++ver after everything queued before it, so all that
+		is received up to its reply is dropped. Each queued read may take up to the
+		interface read timeout without sending anything.
+		"""
+		self._rx_len = 0
+		self._skip_eot = False
+		self._send('++ver')
+		received = time.monotonic()
+		while True:
+			try:
+				line = self._recv_message(self._BUFFER_SIZE, self._LF)
+			except socket.timeout:
+				if time.monotonic() - received > self._READ_TIMEOUT + self.timeout:
+					self._addr = None
+					raise GPIBTimeout()
+				continue
+			received = time.monotonic()
+			if b'Prologix' in line:
+				return
+
+	def calibrate(self):
+		"Measure the round trip time of the adapter"
+		times = []
+		for i in range(self._CALIBRATE_COUNT):
+			start = time.perf_counter()
+			self._send('++ver')
+			try:
+				self._recv(256, self._LF)
+			except socket.timeout:
+				raise GPIBTimeout()
+			times.append(time.perf_counter() - start)
+		return statistics.median(times)
+
 
 	#
 	# Internal implementation
 	#
 	def _escape(self, command):
-		command = command.replace(self._ESC, self._ESC + self._ESC)
-		command = command.replace('+', self._ESC + '+')
-		command = command.replace('\n', self._ESC + '\n')
-		command = command.replace('\r', self._ESC + '\r')
-		return command
+		# ESC, '+', LF and CR are escaped in a single pass
+		return command.translate(self._ESCAPE_TABLE)
 
+	def _trigger_command(self, addrs):
+		# the interface accepts up to 15 addresses for a group execute trigger
+		return ' '.join(['++trg'] + ['%i' % int(a) for a in addrs])
+
+	def _frame(self, value):
+		# encoded line for a controller command, cached as the same commands are sent repeatedly
+		frame = self._frames.get(value)
+		if frame is None:
+			if len(self._frames) >= self._FRAME_CACHE_SIZE:
+				self._frames.clear()
+			frame = self._frames[value] = ('%s\n' % value).encode('ascii')
+		return frame
+
+	def _data_frame(self, cmd):
+		# escaped and encoded line for a device command, cached like _frame
+		frame = self._data_frames.get(cmd)
+		if frame is None:
+			if len(self._data_frames) >= self._FRAME_CACHE_SIZE:
+				self._data_frames.clear()
+			frame = self._data_frames[cmd] = ('%s\n' % self._escape(cmd)).encode('ascii')
+		return frame
 
 	def _send(self, value):
-		encoded_value = ('%s\n' % value).encode('ascii')
-		self.socket.sendall(encoded_value)
+		self.socket.sendall(self._frame(value))
 		
 
-	def _recv(self, byte_num):
-		value = self.socket.recv(byte_num)
-		value = value[:-1]		# remove trailing null
-		return value.decode('ascii')
+	def _recv(self, byte_num, terminator):
+		return self._recv_message(byte_num, terminator).decode('ascii')
+
+	def _recv_message(self, byte_num, terminator):
+		"""
+		Receive a complete message up to the terminator, which is removed
+
+		Data is received into a single buffer that is reused between calls and only
+		grows when a message does not fit. Anything received after the terminator is
+		kept for the next message.
+		"""
+		if len(self._buffer) < byte_num:
+			self._buffer.extend(bytes(byte_num - len(self._buffer)))
+
+		length = self._rx_len
+		scanned = 0
+		while True:
+			if self._skip_eot and length:
+				# discard the EOT that followed the LF of the previous readeol
+				self._skip_eot = False
+				if self._buffer[0] == self._EOT:
+					self._buffer[:length-1] = self._buffer[1:length]
+					length -= 1
+
+			end = self._buffer.find(terminator, scanned, length)
+			if end >= 0:
+				break
+			scanned = length
+
+			if length == len(self._buffer):
+				self._buffer.extend(bytes(len(self._buffer)))
+			try:
+				with memoryview(self._buffer) as view:
+					received = self.socket.recv_into(view[length:])
+			except socket.timeout:
+				self._rx_len = 0
+				if length:
+					# no terminator, the device did not assert EOI. Return what we have
+					return bytes(self._buffer[:length])
+				raise
+			if received == 0:
+				self._rx_len = 0
+				self._addr = None
+				raise ConnectionError('GPIB interface closed the connection')
+			length += received
+
+		message = bytes(self._buffer[:end])
+		rest = length - end - 1
+		self._buffer[:rest] = self._buffer[end+1:length]
+		self._rx_len = rest
+		return message
+
+	def _recv_block(self, size):
+		self._fill(2)
+		if self._buffer[0] != self._HASH:
+			self._discard_message()
+			raise ValueError('response is not an IEEE 488.2 block')
+		digits = self._buffer[1] - self._ZERO
+		if not 0 <= digits <= 9:
+			self._discard_message()
+			raise ValueError('invalid IEEE 488.2 block header')
+		if digits:
+			self._fill(2 + digits)
+			length = bytes(self._buffer[2:2+digits])
+			if not length.isdigit():
+				self._discard_message()
+				raise ValueError('invalid IEEE 488.2 block header')
+			size = int(length)
+		elif size is None:
+			self._discard_message()
+			raise ValueError('the size of an indefinite length block must be given')
+
+		# copy what has already arrived, then receive the rest directly into the block
+		block = bytearray(size)
+		header = 2 + digits
+		have = min(size, self._rx_len - header)
+		block[:have] = self._buffer[header:header+have]
+		self._consume(header + have)
+		with memoryview(block) as view:
+			while have < size:
+				received = self.socket.recv_into(view[have:])
+				if received == 0:
+					self._addr = None
+					raise ConnectionError('GPIB interface closed the connection')
+				have += received
+
+		# discard the terminator (LF sent with EOI) and the EOT that follows it
+		self._recv_message(16, self._EOT)
+		return block
+
+	def _discard_message(self):
+		# drop the rest of a reply that cannot be decoded, up to the EOT that ends
+		# it, so the next read starts at the next reply
+		try:
+			self._recv_message(self._BUFFER_SIZE, self._EOT)
+		except socket.timeout:
+			self._rx_len = 0
+
+	def _fill(self, count):
+		# receive until at least count bytes are held in the buffer
+		while True:
+			if self._skip_eot and self._rx_len:
+				self._skip_eot = False
+				if self._buffer[0] == self._EOT:
+					self._consume(1)
+			if self._rx_len >= count:
+				return
+			if len(self._buffer) < count:
+				self._buffer.extend(bytes(count - len(self._buffer)))
+			with memoryview(self._buffer) as view:
+				received = self.socket.recv_into(view[self._rx_len:])
+			if received == 0:
+				self._rx_len = 0
+				self._addr = None
+				raise ConnectionError('GPIB interface closed the connection')
+			self._rx_len += received
+
+	def _consume(self, count):
+		# remove count bytes from the front of the buffer
+		rest = self._rx_len - count
+		self._buffer[:rest] = self._buffer[count:self._rx_len]
+		self._rx_len = rest
+
+	def _wait_ready(self):
+		# Only a read that follows a write needs to wait for the device
+		if self._write_time is None:
+			return
+		write_time = self._write_time
+		self._write_time = None
+
+		if self.pacing == PACING_SPOLL and self._addr not in self._no_mav:
+			self._poll_until_ready(write_time)
+			return
+
+		turnaround = self.turnaround.get(self._addr, self.link_rtt)
+		delay = write_time + turnaround - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+
+	def _poll_until_ready(self, write_time):
+		# each poll costs one adapter round trip, so no additional sleep is needed
+		while not self.serial_poll() & self._MAV:
+			if time.monotonic() - write_time > self._SPOLL_LIMIT:
+				# device does not report MAV (eg. talk only instruments), fall back to adaptive pacing
+				self._no_mav.add(self._addr)
+				return
+		self.turnaround[self._addr] = time.monotonic() - write_time
 
 	def _setup(self):
 		#  First, disable configuration saving to prevent spamming the EEPROM
@@ -94,9 +383,158 @@ class PrologixEthernetGPIB(GPIBBase):
 		self._send('++auto 0')
 
 		# set GPIB timeout
-		self._send('++read_tmo_ms 3000')
+		self._send('++read_tmo_ms %d' % (self._READ_TIMEOUT * 1000))
 
 		#
 		self._send('++eos 3')
 
+		# append EOT to the data when EOI is detected so the end of a message is unambiguous
+		self._send('++eot_enable 1')
+		self._send('++eot_char %d' % self._EOT)
+
+
+
+class PrologixBatch(object):
+	"""
+	A sequence of select / write / read operations sent to the interface together
+
+	The commands are escaped and encoded once, then sent with a single sendall
+	(or one per wait()) and the replies are collected in order. Selects of the
+	device that is already addressed are left out. The interface processes the
+	commands in sequence, so a read still follows its write on the bus, but no
+	pacing delay is inserted between them. Use wait() where a device needs time,
+	eg. for a switch to settle. The interface queues the commands, so a wait only
+	starts once the replies of the reads before it have been received; the bus
+	has then reached it, rather than just the host.
+
+	A batch may be executed repeatedly, so a scan can be built once and run every
+	cycle:
+
+		scan = gpib.batch()
+		scan.select(11)
+		scan.write('C07X')
+		scan.read()
+		scan.write('C08X')
+		scan.read()
+		...
+		t7, t8 = scan.execute()
+
+	It can also be used as a context manager, it is executed on exit and the
+	replies are available from results.
+	"""
+
+	def __init__(self, gpib):
+		self.gpib = gpib
+		self.results = []
+		self._steps = []		# encoded frames, or (seconds, replies before it) for a wait
+		self._replies = []		# terminator for each expected reply
+		self._lead_addr = None	# leading select, only sent if the device is not already addressed
+		self._addr = None		# address selected at the end of the batch
+		self._changes_addr = False
+		self._compiled = None
+
+	def select(self, addr):
+		addr = int(addr)
+		if self._changes_addr and addr == self._addr:
+			return
+		if not self._steps and self._lead_addr is None:
+			self._lead_addr = addr
+		else:
+			self._append(self.gpib._frame('++addr %i' % addr))
+		self._addr = addr
+		self._changes_addr = True
+
+	def interface_clear(self):
+		self._append(self.gpib._frame('++ifc'))
+		self._addr = None
+		self._changes_addr = True
+
+	def selected_device_clear(self):
+		self._append(self.gpib._frame('++clr'))
+
+	def trigger(self, addrs=()):
+		self._append(self.gpib._frame(self.gpib._trigger_command(addrs)))
+
+	def write(self, cmd):
+		self._append(self.gpib._data_frame(cmd))
+
+	def read(self):
+		self._append(self.gpib._frame('++read eoi'))
+		self._replies.append(self.gpib._EOT)
+
+	def readeol(self):
+		self._append(self.gpib._frame('++read 10'))
+		self._replies.append(self.gpib._LF)
+
+	def query(self, cmd):
+		self.write(cmd)
+		self.read()
+
+	def wait(self, seconds):
+		"Pause before sending the rest of the batch, once the replies before it have been received"
+		self._append((float(seconds), len(self._replies)))
+
+	def execute(self):
+		"Send the batch and return the list of replies, in order"
+		gpib = self.gpib
+		if self._compiled is None:
+			self._compiled = self._compile()
+
+		compiled = self._compiled
+		if self._lead_addr is not None and gpib._addr != self._lead_addr:
+			compiled = self._compiled_with_lead
+
+		addr = gpib._addr
+		gpib._addr = None	# unknown until the batch has completed
+		self.results = []
+		try:
+			for frames, delay, replies in compiled:
+				if frames:
+					gpib.socket.sendall(frames)
+				if delay:
+					self._collect(replies)
+					time.sleep(delay)
+			gpib._write_time = None
+			self._collect(len(self._replies))
+		except socket.timeout:
+			raise GPIBTimeout()
+
+		gpib._addr = self._addr if self._changes_addr else addr
+		return self.results
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.execute()
+
+	def _collect(self, count):
+		# receive the replies up to count
+		gpib = self.gpib
+		for terminator in self._replies[len(self.results):count]:
+			value = gpib._recv(gpib._BUFFER_SIZE, terminator)
+			if terminator == gpib._LF:
+				gpib._skip_eot = True
+			self.results.append(value.strip(' \t\n\r'))
+
+	def _append(self, step):
+		self._steps.append(step)
+		self._compiled = None
+
+	def _compile(self):
+		# join consecutive frames so each segment is sent in one call
+		compiled = []
+		frames = []
+		for step in self._steps:
+			if isinstance(step, tuple):
+				compiled.append((b''.join(frames),) + step)
+				frames = []
+			else:
+				frames.append(step)
+		if frames or not compiled:
+			compiled.append((b''.join(frames), 0.0, len(self._replies)))
 
+		lead = self.gpib._frame('++addr %i' % self._lead_addr) if self._lead_addr is not None else b''
+		self._compiled_with_lead = [(lead + compiled[0][0],) + compiled[0][1:]] + compiled[1:]
+		return compiled
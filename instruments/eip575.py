@@ -0,0 +1,117 @@
+"""
+EIP 575 memory access through the test command
+
+Test 10 (TA10) reads the memory location given by the following four hex digits,
+the result line ends with the byte in hex. TP ends the test.
+
+Each location is read with a fixed sequence, so a block of locations is built
+into one batch: the writes are not paced, and the only wait is the turnaround
+the EIP needs before its result can be read. The request for the next location
+is sent with the read of the previous one, so it is queued in the interface
+while the previous result is received and parsed; the turnaround starts once
+that result has been received, so it is kept on the bus.
+
+	memory = EIP575Memory(gpib, EIP_ADDR)
+	memory.measure_turnaround(0xC000)
+	data = memory.read(0xC000, 0x1000)
+"""
+
+from gpib.base import GPIBTimeout
+import time
+
+EIP_SAFE_TURNAROUND = 0.15		# delay used by the original reader, known to work
+EIP_TURNAROUND_MARGIN = 1.5		# measured turnaround is scaled by this
+EIP_BLOCK_SIZE = 64				# locations read in each batch
+EIP_TURNAROUND_STEPS = 10		# reads made to find the turnaround
+
+
+class EIP575Memory(object):
+	"Read memory from an EIP 575 counter"
+
+	def __init__(self, gpib, addr, turnaround=EIP_SAFE_TURNAROUND, block_size=EIP_BLOCK_SIZE):
+		self.gpib = gpib
+		self.addr = addr
+		self.turnaround = turnaround
+		self.block_size = block_size
+		self.trace = None		# called with each result line, eg. print
+
+	def reset(self):
+		"Clear the interface and the EIP, leaving it ready for test commands"
+		self.gpib.discard_replies()		# still owed to a read that failed part way
+		self.gpib.select(self.addr)
+		self.gpib.interface_clear()
+		self.gpib.selected_device_clear()
+		time.sleep(.5)
+
+	def read(self, address, length, progress=None):
+		"Read length bytes from address, progress is called with the number of bytes read after each block"
+		data = bytearray()
+		while len(data) < length:
+			count = min(self.block_size, length - len(data))
+			data += self.read_block(address + len(data), count)
+			if progress is not None:
+				progress(len(data))
+		return bytes(data)
+
+	def read_block(self, address, count):
+		"Read count bytes from address in a single batch"
+		return self.read_locations(range(address, address + count))
+
+	def read_locations(self, addresses):
+		"Read the byte at each of the addresses in a single batch"
+		batch = self.gpib.batch()
+		batch.select(self.addr)
+		for i, address in enumerate(addresses):
+			if i:
+				batch.write('TP')			# end the previous test
+			batch.write('TA10')
+			batch.write('%04X' % address)
+			batch.wait(self.turnaround)
+			batch.readeol()
+		batch.write('TP')
+
+		data = bytearray()
+		for line in batch.execute():
+			if self.trace is not None:
+				self.trace(line[-7:])
+			data.append(int(line[-2:], 16))
+		return bytes(data)
+
+	def measure_turnaround(self, address, count=16, shortest=0.002):
+		"""
+		Find the shortest turnaround that reads correctly, and use it (with a margin)
+
+		count locations from address are read with the known safe turnaround, then
+		read again with shorter turnarounds, narrowing in on the point where a result
+		differs or the EIP stops responding. Choose a region with varied contents,
+		eg. code, so an early read of the previous location is detected.
+		"""
+		safe = EIP_SAFE_TURNAROUND
+		self.turnaround = safe
+		reference = self.read_block(address, count)
+
+		# halve the turnaround until it fails, then narrow the gap to the last good one
+		good = safe
+		bad = None
+		candidate = safe / 2
+		for i in range(EIP_TURNAROUND_STEPS):
+			if candidate < shortest:
+				break
+			if self._reads_correctly(address, reference, candidate):
+				good = candidate
+			else:
+				bad = candidate
+			candidate = good / 2 if bad is None else (good + bad) / 2
+
+		self.turnaround = min(safe, good * EIP_TURNAROUND_MARGIN)
+		return self.turnaround
+
+	def _reads_correctly(self, address, reference, turnaround):
+		self.turnaround = turnaround
+		try:
+			if self.read_block(address, len(reference)) == reference:
+				return True
+		except (GPIBTimeout, ValueError):
+			pass
+		self.reset()		# the EIP may be part way through a test
+		return False
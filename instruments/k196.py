@@ -0,0 +1,14 @@
+"""
+Keithley 196 multimeter
+"""
+
+from acquisition.trigger import TriggeredInstrument
+
+
+def K196GroupTriggered(addr):
+	"K196 taking one reading for each group execute trigger, the result is read when addressed to talk"
+	return TriggeredInstrument(addr,
+		setup=[
+			'K0X',		# enable EOI and bus hold off
+			'T3X',		# one shot on GET
+		])
@@ -0,0 +1,107 @@
+"""
+Keithley 2015 multimeter
+"""
+
+from acquisition.trigger import TriggeredInstrument
+from acquisition.summary import ParseReadings, ReadingSummary
+from acquisition.binary import REAL32, REAL64, ReadingDtype, DecodeReadings
+from acquisition.calibration import CalSource, CalRegion
+
+K2015_MAX_SAMPLES = 1024		# largest sample count, the readings are held in the instrument buffer
+
+
+def K2015GroupTriggered(addr, samples=1):
+	"K2015 taking samples readings for each group execute trigger, the result is fetched with :FETCH?"
+	return TriggeredInstrument(addr,
+		setup=[
+			":INIT:CONT OFF",		# one shot trigger
+			":TRIG:SOUR BUS",		# trigger on GET
+			":TRIG:COUN 1",
+			":SAMP:COUN %d" % samples,
+		],
+		arm=[":INIT"],				# wait for the trigger
+		query=":FETCH?")
+
+
+def K2015CalSource():
+	"Calibration data, an audit checks the calibration date before reading the constants"
+	return CalSource("*IDN?", [
+		CalRegion('date', [":CAL:PROT:DATE?"], check=True),
+		CalRegion('due', [":CAL:PROT:NDUE?"]),
+		CalRegion('data', [":CAL:PROT:DATA?"]),	# long, the driver reads until the end of message
+	])
+
+
+class K2015Burst(object):
+	"""
+	K2015 taking a burst of readings that are returned in a single transfer
+
+	Rather than one :READ? per reading, the sample count is set so one :READ?
+	triggers all of the readings and returns them together:
+
+		burst = K2015Burst(gpib, K2015_A_ADDR, 4)
+		burst.setup()
+		summary = burst.read_summary()
+	"""
+
+	def __init__(self, gpib, addr, count):
+		if not 1 <= count <= K2015_MAX_SAMPLES:
+			raise ValueError('K2015 sample count must be 1 to %d' % K2015_MAX_SAMPLES)
+		self.gpib = gpib
+		self.addr = addr
+		self.count = count
+
+	def setup(self):
+		with self.gpib.batch() as batch:
+			batch.select(self.addr)
+			batch.write(":INIT:CONT OFF")			# one shot trigger
+			batch.write(":TRIG:SOUR IMM")			# trigger immediately on :READ?
+			batch.write(":TRIG:COUN 1")
+			batch.write(":SAMP:COUN %d" % self.count)
+
+	def read(self):
+		"Take the burst, returns the list of readings"
+		self.gpib.select(self.addr)
+		values = ParseReadings(self.gpib.query(":READ?"))
+		if len(values) != self.count:
+			raise ValueError('K2015 returned %d readings, expected %d' % (len(values), self.count))
+		return values
+
+	def read_summary(self):
+		return ReadingSummary(self.read())
+
+
+class K2015BinaryBurst(K2015Burst):
+	"""
+	K2015Burst transferring the readings as IEEE 754 values rather than ASCII
+
+	read() returns a numpy array decoded in place from the received block. The
+	byte order is swapped to little endian so the host does not convert it.
+	"""
+
+	_FORMATS = {
+		REAL32: ":FORM:DATA REAL,32",
+		REAL64: ":FORM:DATA DREAL",		# the K2015 double precision format
+	}
+
+	def __init__(self, gpib, addr, count, bits=REAL32):
+		K2015Burst.__init__(self, gpib, addr, count)
+		self.dtype = ReadingDtype(bits, swapped=True)
+		self.bits = bits
+
+	def setup(self):
+		K2015Burst.setup(self)
+		with self.gpib.batch() as batch:
+			batch.select(self.addr)
+			batch.write(":FORM:ELEM READ")			# readings only, no timestamp or channel
+			batch.write(self._FORMATS[self.bits])
+			batch.write(":FORM:BORD SWAP")			# little endian
+
+	def read(self):
+		"Take the burst, returns a numpy array of the readings"
+		self.gpib.select(self.addr)
+		self.gpib.write(":READ?")
+		values = DecodeReadings(self.gpib.read_block(self.count * self.dtype.itemsize), self.dtype)
+		if len(values) != self.count:
+			raise ValueError('K2015 returned %d readings, expected %d' % (len(values), self.count))
+		return values
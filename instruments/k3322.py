@@ -0,0 +1,26 @@
+"""
+Keithley 3322 / 3333 LCR meter
+"""
+
+from acquisition.calibration import CalSource, CalRegion
+
+K3322_CAL_START = 0x1000
+K3322_CAL_END = 0x1010
+
+
+def K3322CalSource(start=K3322_CAL_START, end=K3322_CAL_END):
+	"""
+	Calibration memory read with the `~ memory commands, a region per word
+
+	`~1 reads the word at an address, every 8th address also has `~2 and `~3.
+	The meter has no calibration date or count to check, so an audit compares
+	every word, the reads are pipelined in one batch.
+	"""
+	regions = []
+	for addr in range(start, end, 2):
+		paddr = '%07x' % addr
+		queries = ['`~1,%s' % paddr]
+		if addr % 8 == 0:
+			queries += ['`~2,%s' % paddr, '`~3,%s' % paddr]
+		regions.append(CalRegion(paddr, queries))
+	return CalSource('?ID', regions)
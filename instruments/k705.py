@@ -0,0 +1,76 @@
+"""
+Keithley 705 scanner in matrix mode
+
+Crosspoints are written as column:row, eg. '03:2' is column 3 row 2. With two
+7052 4*5 matrix cards, columns 01 - 05 are card slot 1, columns 06 - 10 are
+card slot 2 and rows are 1 - 4. Close is C03:2, open is N03:2.
+
+The controller tracks which crosspoints are closed. Moving to a new route only
+sends the differences, as one command string where the opens are executed
+before the closes (break before make):
+
+	matrix = K705Matrix(gpib, MATRIX_SWITCH_ADDR)
+	matrix.reset()
+	matrix.route(['01:2', '02:1'])	# C01:2 C02:1X
+	matrix.route(['01:1', '02:2'])	# N01:2 N02:1X C01:1 C02:2X
+	matrix.route([])				# N01:1 N02:2X
+"""
+
+
+def ParseCrosspoint(crosspoint):
+	"Convert '03:2' or (3, 2) to a (column, row) tuple"
+	if isinstance(crosspoint, str):
+		column, row = crosspoint.split(':')
+		return (int(column), int(row))
+	column, row = crosspoint
+	return (int(column), int(row))
+
+
+def FormatCrosspoints(prefix, crosspoints):
+	return ' '.join('%s%02d:%d' % (prefix, c, r) for c, r in sorted(crosspoints))
+
+
+class K705Matrix(object):
+	"Keithley 705 matrix switch that tracks the closed crosspoints"
+
+	def __init__(self, gpib, addr):
+		self.gpib = gpib
+		self.addr = addr
+		self.closed = set()
+
+	def reset(self):
+		"Open all crosspoints"
+		self.gpib.select(self.addr)
+		self.gpib.write('RX')
+		self.closed.clear()
+
+	def route(self, crosspoints):
+		"Close exactly the given crosspoints, sending only the changes. Returns True if anything changed"
+		cmd = self.route_command(crosspoints)
+		if cmd is None:
+			return False
+		self.gpib.select(self.addr)
+		self.gpib.write(cmd)
+		return True
+
+	def route_command(self, crosspoints):
+		"""
+		The command that moves from the current state to the given crosspoints, or
+		None if they are already closed. The state is updated as if the command was sent.
+
+		Each group is terminated by its own X so the opens are executed before the
+		closes, the instrument does not guarantee the order within one group.
+		"""
+		desired = set(ParseCrosspoint(c) for c in crosspoints)
+		opens = self.closed - desired
+		closes = desired - self.closed
+		if not opens and not closes:
+			return None
+
+		groups = []
+		if opens:
+			groups.append(FormatCrosspoints('N', opens) + 'X')
+		if closes:
+			groups.append(FormatCrosspoints('C', closes) + 'X')
+		self.closed = desired
+		return ' '.join(groups)
@@ -0,0 +1,53 @@
+"""
+Keithley 740 scanning thermometer
+"""
+
+# thermocouple types for the N command
+TYPE_J = 1
+TYPE_K = 2
+TYPE_T = 3
+
+
+class K740Thermometer(object):
+	"""
+	K740 reading a set of thermocouple channels
+
+	All of the configured channels are read in one bus transaction, the channel
+	selects and reads are prebuilt into a batch that is executed every cycle:
+
+		thermometer = K740Thermometer(gpib, TMP_LOGGER_ADDR, {7: TYPE_K, 8: TYPE_K})
+		thermometer.setup()
+		t7, t8 = thermometer.read_channels()
+	"""
+
+	def __init__(self, gpib, addr, channels):
+		self.gpib = gpib
+		self.addr = addr
+		self.channels = dict(channels)
+		self._scan = None
+
+	def setup(self):
+		with self.gpib.batch() as batch:
+			batch.select(self.addr)
+			batch.write('K0X')		# Assert EOI, hold off bus until commands complete
+			batch.write('P1X')		# filter on
+			batch.write('O0X')		# celsius scale
+			batch.write('N10X')		# set all channels off
+			batch.write('T0X')		# trigger continous on talk (make a measurement when addressed to talk)
+			batch.write('G2X')		# format without prefix or suffix
+			batch.write('F0X')		# Function = current channel
+			batch.write('B0X')		# Read mode = current channel
+
+			# configure channels. Note if a reading is attempted on an "OFF" channel, the bus will lockup
+			for channel, tctype in sorted(self.channels.items()):
+				batch.write('C%02dN%dX' % (channel, tctype))
+
+	def read_channels(self):
+		"Read every configured channel, returns the temperatures in channel order"
+		if self._scan is None:
+			self._scan = self.gpib.batch()
+			self._scan.select(self.addr)
+			for channel in sorted(self.channels):
+				self._scan.write('C%02dX' % channel)	# select the channel
+				self._scan.read()						# trigger and fetch the reading
+		return [float(x) for x in self._scan.execute()]
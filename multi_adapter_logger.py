@@ -0,0 +1,106 @@
+"""
+Logging across multiple Prologix interfaces
+
+The K740 thermometer is on one interface and the meters are on another. Both
+buses are scanned in parallel each cycle and the readings are merged into one
+CSV row.
+"""
+
+# we need to select the specific GPIB interface driver needed
+from gpib.prologix.ethernet import PrologixEthernetGPIB, PACING_ADAPTIVE
+from gpib.base import GPIBTimeout
+from acquisition.multibus import Bus, MultiBusRunner
+
+import sys
+
+TEMPERATURE_HOST_NAME = '192.168.0.10'
+METER_HOST_NAME = '192.168.0.11'
+MAX_COMMAND_TIMEOUT_SEC = 3
+
+MEASUREMENT_DELAY = 5.0
+
+TMP_LOGGER_ADDR = 11
+K2015_A_ADDR = 1
+K196_A_ADDR = 2
+
+
+def SetupTemperature(gpib):
+	gpib.interface_clear()
+	with gpib.batch() as batch:
+		# Keithley 740 Scanning Theromometer
+		batch.select(TMP_LOGGER_ADDR)
+		batch.write('K0X')		# Assert EOI, hold off bus until commands complete
+		batch.write('P1X')		# filter on
+		batch.write('O0X')		# celsius scale
+		batch.write('N10X')		# set all channels off
+		batch.write('T0X')		# trigger continous on talk (make a measurement when addressed to talk)
+		batch.write('G2X')		# format without prefix or suffix
+		batch.write('F0X')		# Function = current channel
+		batch.write('B0X')		# Read mode = current channel
+		batch.write('C07N2X')	# Channel 7, Type K
+		batch.write('C08N2X')	# Channel 8, Type K
+
+def ScanTemperature(gpib):
+	gpib.select(TMP_LOGGER_ADDR)
+	gpib.write('C07X')
+	t7 = float(gpib.read())
+	gpib.write('C08X')
+	t8 = float(gpib.read())
+	return [t7, t8]
+
+
+def SetupMeters(gpib):
+	gpib.interface_clear()
+	with gpib.batch() as batch:
+		# Keithley 2015
+		batch.select(K2015_A_ADDR)
+		batch.write(":FUNC 'VOLT:DC'")
+		batch.write(":VOLT:DC:RANGE 10")
+		batch.write(":VOLT:DC:NPLC 10")			# 10 = 'slow' rate, 1 = 'medium'
+		batch.write(":VOLT:DC:DIG MAX")
+		batch.write(":FORMAT:DATA ASCII")
+		batch.write(":VOLT:DC:AVER:STATE OFF")	# disable filter
+		batch.write(":INIT:CONT OFF")			# one shot trigger
+
+		# Keithley 196
+		batch.select(K196_A_ADDR)
+		batch.write("K0X")	# enable EOI and bus hold off
+		batch.write('F0X')	# DC Volts
+		batch.write('R3X')	# 30V range
+		batch.write('S3X')	# 6.5d rate
+		batch.write('G1X')	# data format without prefixes
+		batch.write('T0X')	# continous on talk
+
+def ScanMeters(gpib):
+	gpib.select(K2015_A_ADDR)
+	k2015 = round(float(gpib.query(":READ?")), 7)
+	gpib.select(K196_A_ADDR)
+	k196 = round(float(gpib.read()), 6)
+	return [k2015, k196]
+
+
+def RunMeasurements():
+	buses = [
+		Bus('temperature',
+			PrologixEthernetGPIB(TEMPERATURE_HOST_NAME, MAX_COMMAND_TIMEOUT_SEC, pacing=PACING_ADAPTIVE),
+			ScanTemperature, ['T7', 'T8'], SetupTemperature),
+		Bus('meters',
+			PrologixEthernetGPIB(METER_HOST_NAME, MAX_COMMAND_TIMEOUT_SEC, pacing=PACING_ADAPTIVE),
+			ScanMeters, ['K2015A', 'K196A'], SetupMeters),
+	]
+	MultiBusRunner(buses, MEASUREMENT_DELAY).run()
+
+#
+# Main Entry Point
+#
+# Continously run the measurements, catching the GPIBTimeout exception
+# if we get one and restarting measurements. If a different exception occurs
+# the loop is terminated
+#
+while True:
+	try:
+		RunMeasurements()
+	except GPIBTimeout as e:
+		sys.stderr.write('GPIB Timeout Reading value, restarting\n')
+		sys.stderr.flush()
+		continue
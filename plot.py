@@ -2,13 +2,17 @@
 Test Plotting routines from CSV
 """
 
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 from matplotlib.ticker import FuncFormatter
+
+from analysis.cache import LoadCachedLog, AverageColumn
+from analysis.decimate import DecimateSeries
  
 
-sourceFile = '../../log-2017-07-22.csv'
+sourceFile = sys.argv[1] if len(sys.argv) > 1 else '../../log-2017-07-22.csv'
 
 avgWindow = 60
 
@@ -18,16 +22,16 @@ def make_patch_spines_invisible(ax):
     for sp in ax.spines.values():
         sp.set_visible(False)
 
-# import the CSV data
-sourceData = pd.read_csv(sourceFile, parse_dates=[0], skipinitialspace=True)
+# import the log data
+sourceData = LoadCachedLog(sourceFile, ['TWindow', 'TRoom', 'K2015A', 'K196A'], [avgWindow])
 
 date_X = sourceData['DateTime']
 windowT_Y = sourceData['TWindow']
 roomT_Y = sourceData['TRoom']
 k2015aV_Y = sourceData['K2015A']
-k2015aV_Y_avg = k2015aV_Y.rolling(window=avgWindow).mean()
+k2015aV_Y_avg = sourceData[AverageColumn('K2015A', avgWindow)]
 k196aV_Y = sourceData['K196A']
-k196aV_Y_avg = k196aV_Y.rolling(window=avgWindow).mean()
+k196aV_Y_avg = sourceData[AverageColumn('K196A', avgWindow)]
 
 
 
@@ -51,15 +55,15 @@ laxis.set_ylabel("Volts")
 laxis.tick_params(axis='y', colors='b')
 
 # plot left axis
-laxis.plot(date_X, k2015aV_Y, "b-", label="K2015", zorder=1, alpha=0.3, linewidth=0.1)
-laxis.plot(date_X, k2015aV_Y_avg, "b-", label="K2015 SMA(%d)"%avgWindow, zorder=2, alpha=1, linewidth=0.2)
+laxis.plot(*DecimateSeries(laxis, date_X, k2015aV_Y), "b-", label="K2015", zorder=1, alpha=0.3, linewidth=0.1)
+laxis.plot(*DecimateSeries(laxis, date_X, k2015aV_Y_avg), "b-", label="K2015 SMA(%d)"%avgWindow, zorder=2, alpha=1, linewidth=0.2)
 # plot right axis
 raxis = plt.twinx()
 
 raxis.set_ylabel("Volts")
 raxis.tick_params(axis='y', colors='r')
-raxis.plot(date_X, k196aV_Y, "r-", label="K196", zorder=1, alpha=0.3, linewidth=0.1)
-raxis.plot(date_X, k196aV_Y_avg, "r-", label="K196 SMA(%d)"%avgWindow, zorder=1, alpha=1, linewidth=0.2)
+raxis.plot(*DecimateSeries(raxis, date_X, k196aV_Y), "r-", label="K196", zorder=1, alpha=0.3, linewidth=0.1)
+raxis.plot(*DecimateSeries(raxis, date_X, k196aV_Y_avg), "r-", label="K196 SMA(%d)"%avgWindow, zorder=1, alpha=1, linewidth=0.2)
 
 laxis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
 raxis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.5f')%x))
@@ -74,8 +78,8 @@ laxis = plt.subplot(212)
 
 
 # plot left axis
-roomTplot = laxis.plot(date_X, roomT_Y, "b-", label="Room Temp", linewidth=0.1)
-windowTplot = laxis.plot(date_X, windowT_Y, "r-", label="Window Temp", linewidth=0.1)
+roomTplot = laxis.plot(*DecimateSeries(laxis, date_X, roomT_Y), "b-", label="Room Temp", linewidth=0.1)
+windowTplot = laxis.plot(*DecimateSeries(laxis, date_X, windowT_Y), "r-", label="Window Temp", linewidth=0.1)
 		
 laxis.set_ylabel("°C")
 
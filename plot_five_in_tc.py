@@ -8,11 +8,17 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from matplotlib.ticker import FuncFormatter
 
+from analysis.cache import LoadCachedLog, AverageColumn
+from analysis.decimate import DecimateSeries, DecimatePath
+from analysis.tempco import FitTempco, SlidingTempco, TempcoText, WriteTempcoSummary
+
 
 sourceFile = sys.argv[1]
 
 avgWindow = 300
 
+tempcoWindow = 6 * 60 * 60		# 6 hours of 1 sec readings for the sliding tempco
+
 
 def make_patch_spines_invisible(ax):
     ax.set_frame_on(True)
@@ -22,23 +28,24 @@ def make_patch_spines_invisible(ax):
 		
 
 def plot_series_and_average(axis, xSeries, mainSeries, avgSeries, color, name):
-	axis.plot(xSeries, mainSeries, color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
+	# only plot the points that can be seen at the output resolution
+	axis.plot(*DecimateSeries(axis, xSeries, mainSeries), color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
 	l = "%s SMA(%d)"%(name,avgWindow)
-	axis.plot(xSeries, avgSeries, color, label=l, zorder=2, alpha=1, linewidth=0.2)
+	axis.plot(*DecimateSeries(axis, xSeries, avgSeries), color, label=l, zorder=2, alpha=1, linewidth=0.2)
 	axis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
 
 def plot_series(axis, xSeries, mainSeries, color, name):
-	axis.plot(xSeries, mainSeries, color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
+	axis.plot(*DecimateSeries(axis, xSeries, mainSeries), color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
 	axis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
 
 	
-def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label):
+def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label, result=None):
 	axis.set_xlabel("°C")
 	axis.set_ylabel("Volts")
 	axis.set_title(label)
 	
 	#axis.scatter(tempSeries, voltSeries, marker='.', linewidths=0.5, s=0.1) #, c=timeSeries, cmap='inferno')
-	axis.plot(tempSeries, voltSeries, "r-", linewidth=0.1)
+	axis.plot(*DecimatePath(axis, tempSeries, voltSeries), "r-", linewidth=0.1)
 	
 	xmin = tempSeries.min()
 	xmax = tempSeries.max()
@@ -51,11 +58,18 @@ def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label):
 	axis.set_xlim(xmin-xfudge, xmax+xfudge)
 	axis.set_ylim(ymin-yfudge, ymax+yfudge)
 	axis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
+
+	if result is not None:
+		# fitted line and the coefficients
+		t = np.array([xmin, xmax])
+		axis.plot(t, result.mean + result.slope() * (t - result.t0), "k-", linewidth=0.3)
+		axis.text(0.02, 0.98, TempcoText(result), transform=axis.transAxes, va='top', fontsize='x-small')
 	
 
 
-# import the CSV data
-sourceData = pd.read_csv(sourceFile, parse_dates=[0], skipinitialspace=True)
+# import the log data
+# only the rows added since the last run are parsed, the rest are cached with their averages
+sourceData = LoadCachedLog(sourceFile, ['T7', 'T8', 'C1', 'C2', 'C3', 'C4', 'C5'], [avgWindow])
 
 date_X = sourceData['DateTime']
 T7_Y = sourceData['T7']
@@ -67,11 +81,11 @@ C4V_Y = sourceData['C4']
 C5V_Y = sourceData['C5']
 
 
-C1V_Y_avg = C1V_Y.rolling(window=avgWindow).mean()
-C2V_Y_avg = C2V_Y.rolling(window=avgWindow).mean()
-C3V_Y_avg = C3V_Y.rolling(window=avgWindow).mean()
-C4V_Y_avg = C4V_Y.rolling(window=avgWindow).mean()
-C5V_Y_avg = C5V_Y.rolling(window=avgWindow).mean()
+C1V_Y_avg = sourceData[AverageColumn('C1', avgWindow)]
+C2V_Y_avg = sourceData[AverageColumn('C2', avgWindow)]
+C3V_Y_avg = sourceData[AverageColumn('C3', avgWindow)]
+C4V_Y_avg = sourceData[AverageColumn('C4', avgWindow)]
+C5V_Y_avg = sourceData[AverageColumn('C5', avgWindow)]
 
 plt.rcParams['font.size'] = 4
 plt.rcParams['legend.fontsize'] = 'small'
@@ -104,6 +118,12 @@ tempAxes = plt.subplot2grid( (nrows, ncols), (5, 0), rowspan=1, colspan=ncols )
 
 temperatureData_Y = T8_Y		# choose which temperature to plot against
 
+# fit every channel against the temperature together
+tempcoColumns = ['C1', 'C2', 'C3', 'C4']
+tempco = FitTempco(temperatureData_Y, sourceData[tempcoColumns])
+windowTempco = SlidingTempco(date_X, temperatureData_Y, sourceData[tempcoColumns], tempcoWindow)
+WriteTempcoSummary(sourceFile + '.tempco.csv', tempco.values(), windowTempco)
+
 plot_series_and_average(v1Axes, date_X, C1V_Y, C1V_Y_avg, "b-", "C1")
 plot_series_and_average(v2Axes, date_X, C2V_Y, C2V_Y_avg,  "b-", "C2")
 plot_series_and_average(v3Axes, date_X, C3V_Y, C3V_Y_avg,  "b-", "C3")
@@ -114,16 +134,16 @@ v2Axes.legend(loc=2)
 v3Axes.legend(loc=2)
 v4Axes.legend(loc=2)
 
-plot_temp_coefficient(tc1Axes, temperatureData_Y, C1V_Y, date_X, "C1 TC")
+plot_temp_coefficient(tc1Axes, temperatureData_Y, C1V_Y, date_X, "C1 TC", tempco['C1'])
 plt.tight_layout()
 
-plot_temp_coefficient(tc2Axes, temperatureData_Y, C2V_Y, date_X, "C2 TC")
+plot_temp_coefficient(tc2Axes, temperatureData_Y, C2V_Y, date_X, "C2 TC", tempco['C2'])
 plt.tight_layout()
 
-plot_temp_coefficient(tc3Axes, temperatureData_Y, C3V_Y, date_X, "C3 TC")
+plot_temp_coefficient(tc3Axes, temperatureData_Y, C3V_Y, date_X, "C3 TC", tempco['C3'])
 plt.tight_layout()
 
-plot_temp_coefficient(tc4Axes, temperatureData_Y, C4V_Y, date_X, "C4 TC")
+plot_temp_coefficient(tc4Axes, temperatureData_Y, C4V_Y, date_X, "C4 TC", tempco['C4'])
 plt.tight_layout()
 
 
@@ -144,8 +164,8 @@ plt.tight_layout()
 laxis = tempAxes
 
 # plot left axis
-roomTplot = laxis.plot(date_X, T7_Y, "b-", label="Room Temp", linewidth=0.1)
-windowTplot = laxis.plot(date_X, T8_Y, "r-", label="LM3900 Temp", linewidth=0.1)
+roomTplot = laxis.plot(*DecimateSeries(laxis, date_X, T7_Y), "b-", label="Room Temp", linewidth=0.1)
+windowTplot = laxis.plot(*DecimateSeries(laxis, date_X, T8_Y), "r-", label="LM3900 Temp", linewidth=0.1)
 		
 laxis.set_ylabel("°C")
 
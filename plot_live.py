@@ -0,0 +1,18 @@
+"""
+Live view of a log while it is being written
+
+	python plot_live.py plot_twoin_twoout log.csv [hours]
+
+The layout is one of plot, plot_five_in_tc or plot_twoin_twoout, showing the
+last hours of the log (6 by default) and following it as it grows. See
+analysis/live.py.
+"""
+
+from analysis.live import LiveView, LIVE_HOURS
+
+import sys
+
+hours = float(sys.argv[3]) if len(sys.argv) > 3 else LIVE_HOURS
+
+view = LiveView(sys.argv[2], sys.argv[1], hours=hours)
+view.run()
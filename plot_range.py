@@ -0,0 +1,54 @@
+"""
+Plot a time range of a long log from its aggregate pyramid
+
+	python plot_range.py plot_twoin_twoout log.csv "2017-07-22 10:00" "2017-07-22 11:00" K2015A_EDC,K196A_EDC
+
+The layout is the plot script the log is plotted with (plot, plot_five_in_tc
+or plot_twoin_twoout), the pyramid is built from the same cache of the log.
+The start and end are optional, without them the whole log is plotted, as is
+the list of columns, all of those of the layout by default. Each column is
+drawn as the band between the minimum and maximum of the buckets with the mean
+over it, from the coarsest level of the pyramid that has enough buckets for the
+width of the plot, so a three month view costs the same to draw as an hour. Written to <log>.range.pdf. See analysis/pyramid.py.
+"""
+
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+
+from analysis.pyramid import OpenPyramid
+from analysis.cache import LAYOUT_COLUMNS
+from analysis.decimate import AxisPixels, OVERSAMPLE
+
+
+layoutColumns, layoutWindows = LAYOUT_COLUMNS[sys.argv[1]]
+sourceFile = sys.argv[2]
+start = np.datetime64(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3] else None
+end = np.datetime64(sys.argv[4]) if len(sys.argv) > 4 and sys.argv[4] else None
+columns = sys.argv[5].split(',') if len(sys.argv) > 5 else layoutColumns
+
+# the same columns and windows as the plots of the layout, so they share the cache of the log
+pyramid = OpenPyramid(sourceFile, layoutColumns, layoutWindows)
+
+
+plt.rcParams['font.size'] = 6
+plt.rcParams['legend.fontsize'] = 'small'
+plt.rcParams['figure.dpi'] = 600
+plt.rcParams['savefig.dpi'] = 600
+
+figure = plt.figure(figsize=(10.5, 2 * len(columns)))
+
+for i, column in enumerate(columns):
+	axis = plt.subplot(len(columns), 1, i + 1)
+	data = pyramid.query(column, start, end, points=AxisPixels(axis)[0] * OVERSAMPLE)
+
+	axis.fill_between(data['Time'], data['min'], data['max'], color='b', alpha=0.3, linewidth=0, label="%s min/max" % column)
+	axis.plot(data['Time'], data['mean'], "b-", linewidth=0.2, label="%s mean" % column)
+	axis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
+	axis.legend(loc=2)
+
+plt.tight_layout()
+
+#plt.show()
+figure.savefig(sourceFile + '.range.pdf', format='pdf', orientation='landscape')
@@ -0,0 +1,29 @@
+"""
+Render the reports of a directory of logs
+
+	python plot_reports.py plot_five_in_tc logs/
+	python plot_reports.py plot_twoin_twoout "logs/log-2017-07-*.csv"
+
+The layout is one of plot, plot_five_in_tc or plot_twoin_twoout. The logs are
+rendered in a process pool sized to the cores, each to <log>.pdf, and logs
+whose PDF is newer than the log are skipped. See analysis/batch.py.
+"""
+
+from analysis.batch import FindLogs, BatchReport
+
+import sys
+
+
+if __name__ == '__main__':
+	layout = sys.argv[1]
+	paths = FindLogs(sys.argv[2])
+	if not paths:
+		sys.exit('no logs found in %s' % sys.argv[2])
+
+	failed = 0
+	for result in BatchReport(paths, layout):
+		print(result)
+		sys.stdout.flush()
+		if result.error is not None:
+			failed += 1
+	sys.exit(1 if failed else 0)
@@ -8,6 +8,10 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from matplotlib.ticker import FuncFormatter
 
+from analysis.cache import LoadCachedLog, AverageColumn
+from analysis.decimate import DecimateSeries, DecimatePath
+from analysis.tempco import FitTempco, SlidingTempco, TempcoText, WriteTempcoSummary
+
  
 
 sourceFile = sys.argv[1]
@@ -16,6 +20,8 @@ avgWindow = 30		# 10 sec * 30 = 5 min average
 
 avgWindow = avgWindow * 2
 
+tempcoWindow = 6 * 60 * 6		# 6 hours of 10 sec readings for the sliding tempco
+
 def make_patch_spines_invisible(ax):
     ax.set_frame_on(True)
     ax.patch.set_visible(False)
@@ -24,17 +30,20 @@ def make_patch_spines_invisible(ax):
 		
 
 def plot_series_and_average(axis, xSeries, mainSeries, avgSeries, color, name):
-	axis.plot(xSeries, mainSeries, color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
+	# only plot the points that can be seen at the output resolution
+	axis.plot(*DecimateSeries(axis, xSeries, mainSeries), color, label=name, zorder=1, alpha=0.3, linewidth=0.1)
 	l = "%s SMA(%d)"%(name,avgWindow)
-	axis.plot(xSeries, avgSeries, color, label=l, zorder=2, alpha=1, linewidth=0.2)
+	axis.plot(*DecimateSeries(axis, xSeries, avgSeries), color, label=l, zorder=2, alpha=1, linewidth=0.2)
 
 	
-def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label):
+def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label, result=None):
 	axis.set_xlabel("°C")
 	axis.set_ylabel("Volts")
 	axis.set_title(label)
 	
-	axis.scatter(tempSeries, voltSeries, marker='.', linewidths=0.2, s=0.1, c=timeSeries, cmap='inferno')
+	# points in the same pixel as the point before are not drawn
+	x, y, c = DecimatePath(axis, tempSeries, voltSeries, timeSeries)
+	axis.scatter(x, y, marker='.', linewidths=0.2, s=0.1, c=c, cmap='inferno')
 	
 	xmin = tempSeries.min()
 	xmax = tempSeries.max()
@@ -47,24 +56,31 @@ def plot_temp_coefficient(axis, tempSeries, voltSeries, timeSeries, label):
 	axis.set_xlim(xmin-xfudge, xmax+xfudge)
 	axis.set_ylim(ymin-yfudge, ymax+yfudge)
 	axis.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: ('%.7f')%x))
+
+	if result is not None:
+		# fitted line and the coefficients
+		t = np.array([xmin, xmax])
+		axis.plot(t, result.mean + result.slope() * (t - result.t0), "k-", linewidth=0.3)
+		axis.text(0.02, 0.98, TempcoText(result), transform=axis.transAxes, va='top', fontsize='x-small')
 	
 
 
-# import the CSV data
-sourceData = pd.read_csv(sourceFile, parse_dates=[0], skipinitialspace=True)
+# import the log data
+# only the rows added since the last run are parsed, the rest are cached with their averages
+sourceData = LoadCachedLog(sourceFile, ['TWindow', 'TRoom', 'K2015A_EDC', 'K196A_EDC', 'K2015A_JVR', 'K196A_JVR'], [avgWindow])
 
 date_X = sourceData['DateTime']
 windowT_Y = sourceData['TWindow']
 roomT_Y = sourceData['TRoom']
 k2015a_edcV_Y = sourceData['K2015A_EDC']
-k2015a_edcV_Y_avg = k2015a_edcV_Y.rolling(window=avgWindow).mean()
+k2015a_edcV_Y_avg = sourceData[AverageColumn('K2015A_EDC', avgWindow)]
 k196a_edcV_Y = sourceData['K196A_EDC']
-k196a_edcV_Y_avg = k196a_edcV_Y.rolling(window=avgWindow).mean()
+k196a_edcV_Y_avg = sourceData[AverageColumn('K196A_EDC', avgWindow)]
 
 k2015a_jvrV_Y = sourceData['K2015A_JVR']
-k2015a_jvrV_Y_avg = k2015a_jvrV_Y.rolling(window=avgWindow).mean()
+k2015a_jvrV_Y_avg = sourceData[AverageColumn('K2015A_JVR', avgWindow)]
 k196a_jvrV_Y = sourceData['K196A_JVR']
-k196a_jvrV_Y_avg = k196a_jvrV_Y.rolling(window=avgWindow).mean()
+k196a_jvrV_Y_avg = sourceData[AverageColumn('K196A_JVR', avgWindow)]
 
 plt.rcParams['font.size'] = 4
 plt.rcParams['legend.fontsize'] = 'small'
@@ -135,8 +151,8 @@ raxis.legend(loc=1)
 laxis = tempAxes
 
 # plot left axis
-roomTplot = laxis.plot(date_X, roomT_Y, "b-", label="Room Temp", linewidth=0.1)
-windowTplot = laxis.plot(date_X, windowT_Y, "r-", label="Window Temp", linewidth=0.1)
+roomTplot = laxis.plot(*DecimateSeries(laxis, date_X, roomT_Y), "b-", label="Room Temp", linewidth=0.1)
+windowTplot = laxis.plot(*DecimateSeries(laxis, date_X, windowT_Y), "r-", label="Window Temp", linewidth=0.1)
 		
 laxis.set_ylabel("°C")
 
@@ -144,14 +160,21 @@ laxis.legend()
 
 plt.tight_layout()	
 
+###############################################################################
+# Temp Co of every reading against the room temperature
+tempcoColumns = ['K2015A_EDC', 'K2015A_JVR', 'K196A_EDC', 'K196A_JVR']
+tempco = FitTempco(roomT_Y, sourceData[tempcoColumns])
+windowTempco = SlidingTempco(date_X, roomT_Y, sourceData[tempcoColumns], tempcoWindow)
+WriteTempcoSummary(sourceFile + '.tempco.csv', tempco.values(), windowTempco)
+
 ###############################################################################
 # EDC Temp Co 
-plot_temp_coefficient(edcTcAxes, roomT_Y, k2015a_edcV_Y_avg, date_X, "EDC/K2015")
+plot_temp_coefficient(edcTcAxes, roomT_Y, k2015a_edcV_Y_avg, date_X, "EDC/K2015", tempco['K2015A_EDC'])
 
 
 ############################################################################### 
 # JVR Temp Co 
-plot_temp_coefficient(jvrTcAxes, roomT_Y, k2015a_jvrV_Y_avg, date_X, "JVR/K2015")
+plot_temp_coefficient(jvrTcAxes, roomT_Y, k2015a_jvrV_Y_avg, date_X, "JVR/K2015", tempco['K2015A_JVR'])
 
 
 plt.tight_layout()
@@ -0,0 +1,52 @@
+"""
+Logging driven by a scan plan
+
+	python run_scan_plan.py plans/five_in_one_meter_matrix.json > log.csv
+
+An output can be given to log to typed columns in batches instead of CSV,
+a .h5 file for HDF5, a .bin file for a binary log (acquisition/binlog.py),
+otherwise a directory of Parquet files:
+
+	python run_scan_plan.py plans/five_in_one_meter_matrix.json logs/five-in-one
+
+The plan describes the instruments, setup, switch routes and readings, see
+acquisition/scanplan.py for the format.
+"""
+
+from acquisition.scanplan import LoadScanPlan, RunScanPlan
+from acquisition.sinks import CsvSink, ParquetSink, HDF5Sink, BinaryLogSink
+from gpib.base import GPIBTimeout
+
+import sys
+
+FLUSH_ROWS = 1000
+FLUSH_INTERVAL_SEC = 300
+
+plan = LoadScanPlan(sys.argv[1])
+
+if len(sys.argv) < 3:
+	sink = CsvSink()
+elif sys.argv[2].endswith('.bin'):
+	sink = BinaryLogSink(sys.argv[2])
+elif sys.argv[2].endswith(('.h5', '.hdf5')):
+	sink = HDF5Sink(sys.argv[2], flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL_SEC)
+else:
+	sink = ParquetSink(sys.argv[2], flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL_SEC)
+
+#
+# Main Entry Point
+#
+# Continously run the measurements, catching the GPIBTimeout exception
+# if we get one and restarting measurements. If a different exception occurs
+# the loop is terminated
+#
+try:
+	while True:
+		try:
+			RunScanPlan(plan, sink=sink)
+		except GPIBTimeout as e:
+			sys.stderr.write('GPIB Timeout Reading value, restarting\n')
+			sys.stderr.flush()
+			continue
+finally:
+	sink.close()
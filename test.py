@@ -7,19 +7,25 @@ This is a pretty simple interface, you may need to add your own implementation f
 # we need to select the specific GPIB interface driver needed
 from gpib.prologix.ethernet import PrologixEthernetGPIB
 from gpib.base import GPIBTimeout
+from acquisition.clock import LogClock, TIMESTAMP_TEXT, TIMESTAMP_EPOCH_NS
+from acquisition.schedule import DeadlineScheduler, OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_STRETCH
 
-from datetime import datetime
-import time
 import sys
 
 GPIB_ETHERNET_HOST_NAME = 'GPIB'
 MAX_COMMAND_TIMEOUT_SEC = 3
 
 MEASUREMENT_DELAY = 5.0
+OVERRUN_POLICY = OVERRUN_SKIP		# what to do with a cycle longer than MEASUREMENT_DELAY, see acquisition/schedule.py
+TIMESTAMP_MODE = TIMESTAMP_TEXT		# TIMESTAMP_EPOCH_NS logs integer nanoseconds, see acquisition/clock.py
 
 
 
 def RunMeasurements():
+	# timestamps of the records, and the start of each cycle on a fixed phase
+	clock = LogClock(TIMESTAMP_MODE)
+	scheduler = DeadlineScheduler(MEASUREMENT_DELAY, OVERRUN_POLICY)
+
 	# create and open the connection to the interface
 	gpib = PrologixEthernetGPIB(GPIB_ETHERNET_HOST_NAME, MAX_COMMAND_TIMEOUT_SEC)
 	gpib.open()
@@ -52,15 +58,16 @@ def RunMeasurements():
 		
 
 		# CSV header row.
+		#sys.stdout.write(clock.header())
 		#sys.stdout.write('DateTime, TempC, K2015, K196\n')
 		
 		while True:
 			measurements = []
-			# capture the time now, so we can get a consistent delay at the end
-			start = datetime.now()
+			# wait for the start of the cycle
+			scheduler.wait()
 			
 			# datetime
-			measurements.append(start)
+			measurements.append(clock.now())
 			measurements.append('23.0')
 			
 			# K2015
@@ -78,14 +85,9 @@ def RunMeasurements():
 			sys.stdout.write('\n')
 			sys.stdout.flush()
 
-			# compute the elapsed time and if it is under our measurement delay, we wait
-			# the appropraite time to sync to the start of the cycle again
-			elapsed = datetime.now() - start
-			if elapsed.total_seconds() < MEASUREMENT_DELAY:
-				time.sleep(MEASUREMENT_DELAY - elapsed.total_seconds())
-
 	finally:
 		# Something went wrong, close.
+		sys.stderr.write('%s\n' % scheduler.stats)
 		gpib.close()
 
 #
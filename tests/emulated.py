@@ -0,0 +1,83 @@
+"""
+Instruments and a connected interface emulator for the tests of the drivers
+
+	meter = RecordingMeter(latency=0.1)
+	with EmulatedBus({1: meter}) as gpib:
+		...
+	reads = meter.times(TALK)
+"""
+
+from gpib.prologix.emulator import PrologixEmulator, SimulatedTalkMeter
+from gpib.prologix.ethernet import PrologixEthernetGPIB
+
+import time
+
+TRIGGER = 'trigger'
+TALK = 'talk'
+
+
+class RecordingMeter(SimulatedTalkMeter):
+	"""
+	Talk meter that records when each command arrives, when it is triggered and
+	when each reading is taken, in log as (time, command, TRIGGER or TALK). The
+	bus is held for readout seconds after each reading.
+	"""
+
+	def __init__(self, reading=None, latency=0.0, fmt='%.2f', readout=0.0):
+		SimulatedTalkMeter.__init__(self, reading, latency, fmt)
+		self.readout = readout
+		self.log = []
+
+	def handle(self, message):
+		self.log.append((time.monotonic(), message))
+		SimulatedTalkMeter.handle(self, message)
+
+	def trigger(self):
+		self.log.append((time.monotonic(), TRIGGER))
+		SimulatedTalkMeter.trigger(self)
+
+	def talk(self):
+		SimulatedTalkMeter.talk(self)
+		self.log.append((time.monotonic(), TALK))
+		time.sleep(self.readout)
+
+	def times(self, event):
+		"Times event was logged, a command matches every command starting with it"
+		return [t for t, logged in self.log if logged == event or
+			isinstance(event, bytes) and isinstance(logged, bytes) and logged.startswith(event)]
+
+
+class EmulatedBus(object):
+	"""
+	Interface emulator hosting instruments, with a driver connected to it
+
+	start() returns the driver, stop() closes it and the emulator. It can also
+	be used as a context manager.
+	"""
+
+	def __init__(self, instruments, timeout=1):
+		self.emulator = PrologixEmulator(instruments)
+		self.timeout = timeout
+		self.gpib = None
+
+	def start(self):
+		self.emulator.start()
+		self.gpib = PrologixEthernetGPIB('127.0.0.1', self.timeout, self.emulator.port)
+		try:
+			self.gpib.open()
+		except Exception:
+			self.emulator.stop()
+			raise
+		return self.gpib
+
+	def stop(self):
+		try:
+			self.gpib.close()
+		finally:
+			self.emulator.stop()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *args):
+		self.stop()
@@ -0,0 +1,57 @@
+"""
+The asyncio Prologix driver against the interface emulator
+"""
+
+from gpib.prologix.emulator import PrologixEmulator, SimulatedTalkMeter
+from gpib.prologix.async_ethernet import AsyncPrologixEthernetGPIB
+from gpib.base import GPIBTimeout
+
+import asyncio
+import unittest
+
+TIMEOUT = 0.3
+
+
+class LateReplyTest(unittest.TestCase):
+
+	def run_with_meters(self, test):
+		# a slow meter that replies after the driver has given up, and a fast one
+		slow = SimulatedTalkMeter(lambda: 1.0, latency=TIMEOUT + 0.1, fmt='%.2f')
+		fast = SimulatedTalkMeter(lambda: 2.0, fmt='%.2f')
+
+		async def main(port):
+			gpib = AsyncPrologixEthernetGPIB('127.0.0.1', TIMEOUT, port)
+			await gpib.open()
+			try:
+				await test(gpib)
+			finally:
+				await gpib.close()
+
+		with PrologixEmulator({1: slow, 2: fast}) as emulator:
+			asyncio.run(main(emulator.port))
+
+	def test_timed_out_reply_discarded(self):
+		async def test(gpib):
+			await gpib.select(1)
+			with self.assertRaises(GPIBTimeout):
+				await gpib.query('X')
+			await gpib.select(2)
+			self.assertEqual(await gpib.query('X'), '2.00')
+			self.assertEqual(await gpib.query('X'), '2.00')
+		self.run_with_meters(test)
+
+	def test_cancelled_readeol(self):
+		async def test(gpib):
+			await gpib.select(1)
+			await gpib.write('X')
+			task = asyncio.ensure_future(gpib.readeol())
+			await asyncio.sleep(0.1)
+			task.cancel()
+			await gpib.select(2)
+			# the EOT after the discarded reply is not taken as an empty reply
+			self.assertEqual(await gpib.query('X'), '2.00')
+		self.run_with_meters(test)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,34 @@
+"""
+Finding the logs to render in a directory of logs and the files written next to them
+"""
+
+from analysis.batch import FindLogs
+
+import shutil
+import tempfile
+import unittest
+import os
+
+
+class FindLogsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def touch(self, name):
+		with open(os.path.join(self.directory, name), 'w'):
+			pass
+
+	def test_outputs_skipped(self):
+		for name in ('log.csv', 'log.csv.cache.bin', 'log.csv.cache.json', 'log.csv.pyramid-60s.bin',
+				'log.csv.pyramid-3600s.bin', 'log.csv.pyramid.json', 'log.csv.tempco.csv', 'log.csv.pdf', 'run.bin'):
+			self.touch(name)
+		os.mkdir(os.path.join(self.directory, 'parts.csv'))
+		self.assertEqual(FindLogs(self.directory), [os.path.join(self.directory, name) for name in ('log.csv', 'run.bin')])
+
+
+if __name__ == '__main__':
+	unittest.main()
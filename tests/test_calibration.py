@@ -0,0 +1,47 @@
+"""
+Calibration data audits against the interface emulator
+"""
+
+from gpib.prologix.emulator import PrologixEmulator, SimulatedScpiMeter
+from gpib.prologix.ethernet import PrologixEthernetGPIB
+from acquisition.calibration import CalSource, CalRegion, AuditCalibration
+
+import shutil
+import tempfile
+import unittest
+
+
+class CalSourceTest(unittest.TestCase):
+
+	def test_regions_not_changed(self):
+		regions = [CalRegion('a', ['A?']), CalRegion('b', ['B?'])]
+		source = CalSource('*IDN?', regions)
+		self.assertEqual(source.checks, regions)
+		self.assertFalse(any(region.check for region in regions))
+
+	def test_check_regions(self):
+		date = CalRegion('date', ['D?'], check=True)
+		source = CalSource('*IDN?', [date, CalRegion('data', ['X?'])])
+		self.assertEqual(source.checks, [date])
+
+	def test_audit(self):
+		directory = tempfile.mkdtemp()
+		meter = SimulatedScpiMeter(responses={'D?': '2017-07-22', 'X?': '1,2,3'})
+		try:
+			with PrologixEmulator({1: meter}) as emulator:
+				gpib = PrologixEthernetGPIB('127.0.0.1', port=emulator.port)
+				gpib.open()
+				try:
+					source = CalSource('*IDN?', [CalRegion('date', ['D?'], check=True), CalRegion('data', ['X?'])])
+					self.assertTrue(AuditCalibration(gpib, 1, source, directory).full_read)
+					audit = AuditCalibration(gpib, 1, source, directory)
+					self.assertFalse(audit.full_read)
+					self.assertEqual(audit.changes, [])
+				finally:
+					gpib.close()
+		finally:
+			shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+	unittest.main()
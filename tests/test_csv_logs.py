@@ -0,0 +1,126 @@
+"""
+Loading of CSV logs as the loggers write them, with a space after every comma
+in the header and the header written again each time the logger restarts
+"""
+
+from analysis.cache import CachedLog, AverageColumn
+from analysis.live import LogTail
+from analysis.loading import LoadCsvLog
+from analysis.pyramid import OpenPyramid
+from acquisition.binlog import BinaryLog
+
+import numpy as np
+import json
+import shutil
+import tempfile
+import unittest
+import os
+
+HEADER = 'DateTime, T7, T8, C1\n'
+
+
+def LoggerRows(start, count):
+	return ''.join('2017-07-22 10:%02d:%02d,%.2f,%.2f,%.7f\n' % ((start + i) // 60, (start + i) % 60,
+		23.0 + i * 0.01, 22.0, 1.0 + i * 1e-6) for i in range(count))
+
+
+class CsvLogTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, 'log.csv')
+		with open(self.path, 'w') as f:
+			f.write(HEADER + LoggerRows(0, 20))
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def append(self, text):
+		with open(self.path, 'a') as f:
+			f.write(text)
+
+
+class LoadCsvLogTest(CsvLogTestCase):
+
+	def test_restart_header(self):
+		self.append('DateTime, T7, T8, C1\n' + LoggerRows(20, 10) + '2017-07-22 10:00:30,23.5,22.00,1.0')
+		for chunksize in (1, 7, 1000):
+			data = LoadCsvLog(self.path, ['T7', 'C1'], chunksize)
+			self.assertEqual(list(data.columns), ['DateTime', 'T7', 'C1'])
+			self.assertEqual(len(data), 31)
+			self.assertTrue(np.all(np.diff(data['DateTime'].values).astype(np.int64) > 0))
+			self.assertEqual(data['T7'].iloc[-1], 23.5)
+
+
+class CachedLogTest(CsvLogTestCase):
+
+	def test_logger_header(self):
+		data = CachedLog(self.path, ['T7', 'C1'], [5]).update()
+		self.assertEqual(list(data.columns), ['DateTime', 'T7', 'C1', AverageColumn('T7', 5), AverageColumn('C1', 5)])
+		self.assertEqual(len(data), 20)
+		self.assertAlmostEqual(data['T7'].iloc[-1], 23.19)
+
+	def test_restart_header(self):
+		log = CachedLog(self.path, ['T7', 'C1'], [5])
+		log.update()
+		# restarted logger, the header again with different spacing
+		self.append('DateTime,T7,  T8,C1\n' + LoggerRows(20, 10))
+		data = log.update()
+		self.assertEqual(len(data), 30)
+		self.assertTrue(np.all(np.diff(data['DateTime'].values).astype(np.int64) > 0))
+		self.assertAlmostEqual(data[AverageColumn('T7', 5)].iloc[-1], np.mean(23.0 + np.arange(5, 10) * 0.01))
+
+	def test_blocks(self):
+		self.append(LoggerRows(20, 10) + '2017-07-22 10:00:30,23')
+		whole = CachedLog(self.path, ['T7', 'C1'], [5]).update()
+		os.remove(self.path + '.cache.json')
+		# a block at a time, the moving averages continue across them
+		data = CachedLog(self.path, ['T7', 'C1'], [5], chunksize=3).update()
+		self.assertEqual(len(data), 30)
+		np.testing.assert_array_equal(data['DateTime'].values, whole['DateTime'].values)
+		for name in whole.columns[1:]:
+			np.testing.assert_allclose(data[name].values, whole[name].values)
+		with open(self.path + '.cache.json') as f:
+			self.assertEqual(json.load(f)['offset'], os.path.getsize(self.path) - len('2017-07-22 10:00:30,23'))
+
+
+class LogTailTest(CsvLogTestCase):
+
+	def test_logger_header(self):
+		tail = LogTail(self.path, ['T7', 'C1'])
+		tail.start(5)
+		rows = tail.read()
+		self.assertEqual(list(rows.columns), ['DateTime', 'T7', 'C1'])
+		self.assertAlmostEqual(rows['T7'].iloc[-1], 23.19)
+		self.assertIsNone(tail.read())
+
+		# a partly written line is left for the next read, a restart header is skipped
+		self.append('DateTime, T7, T8, C1\n' + LoggerRows(20, 3) + '2017-07-22 10:00:23,23')
+		rows = tail.read()
+		self.assertEqual(len(rows), 3)
+		self.append('.03,22.00,1.0000030\n')
+		self.assertEqual(len(tail.read()), 1)
+
+
+class PyramidTest(CsvLogTestCase):
+
+	def test_range_inside_buckets(self):
+		# 200 readings a second apart, the range starts and ends part way through minutes
+		self.append(LoggerRows(20, 180))
+		pyramid = OpenPyramid(self.path, ['T7', 'C1'], [5])
+		source = BinaryLog(self.path + '.cache.bin')
+		times = source.records[source.columns[0]]
+		low, high = times[0] + 7.5, times[0] + 187.5
+		self.assertEqual(pyramid.level_for(low, high, 3), 60)
+
+		data = pyramid.query('T7', low, high, points=3)
+		readings = source.records['T7'][(times >= low) & (times < high)]
+		self.assertEqual(data['count'].sum(), len(readings))
+		self.assertTrue(np.all(np.diff(data['Time'].values).astype(np.int64) > 0))
+		self.assertEqual(data['min'].min(), readings.min())
+		self.assertEqual(data['max'].max(), readings.max())
+		self.assertAlmostEqual((data['mean'] * data['count']).sum() / len(readings), readings.mean())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,48 @@
+"""
+Controller settings of the interface emulator
+"""
+
+from gpib.prologix.emulator import PrologixEmulator, SimulatedTalkMeter
+from gpib.prologix.ethernet import PrologixEthernetGPIB
+
+import unittest
+
+
+class EmulatorSettingsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.meter = SimulatedTalkMeter()
+		self.emulator = PrologixEmulator({1: self.meter}).start()
+		self.gpib = PrologixEthernetGPIB('127.0.0.1', port=self.emulator.port)
+		self.gpib.open()
+		self.gpib.select(1)
+
+	def tearDown(self):
+		self.gpib.close()
+		self.emulator.stop()
+
+	def settle(self):
+		# the interface has processed everything sent before a reply
+		self.gpib.serial_poll()
+
+	def test_eos(self):
+		self.gpib._send('++eos 1')
+		self.gpib.write('F0X')
+		self.settle()
+		self.assertEqual(self.emulator.messages[-1], (1, b'F0X\r', True))
+		self.assertEqual(self.meter.commands[-1], b'F0X')
+
+	def test_eoi_off(self):
+		# without EOI or a LF the device waits for the rest of the message
+		self.gpib._send('++eoi 0')
+		self.gpib.write('F0')
+		self.settle()
+		self.assertEqual(self.meter.commands, [])
+		self.gpib._send('++eos 2')
+		self.gpib.write('X')
+		self.settle()
+		self.assertEqual(self.meter.commands, [b'F0X'])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,92 @@
+"""
+Instrument drivers against the interface emulator
+"""
+
+from gpib.prologix.emulator import SimulatedTalkMeter, SimulatedScpiMeter
+from tests.emulated import RecordingMeter, EmulatedBus, TALK
+from instruments.k740 import K740Thermometer, TYPE_K
+from instruments.k2015 import K2015Burst, K2015BinaryBurst
+from acquisition.binary import REAL64
+from instruments.eip575 import EIP575Memory
+from gpib.base import GPIBTimeout
+
+import unittest
+
+
+class InstrumentTestCase(unittest.TestCase):
+
+	def setUp(self):
+		self.k740 = SimulatedTalkMeter(lambda: 23.5, fmt='%.1f')
+		self.k2015 = SimulatedScpiMeter(iter([1.0, 2.0, 3.0, 6.0]).__next__)
+		self.bus = EmulatedBus({11: self.k740, 1: self.k2015})
+		self.gpib = self.bus.start()
+
+	def tearDown(self):
+		self.bus.stop()
+
+
+class K740ThermometerTest(InstrumentTestCase):
+
+	def test_read_channels(self):
+		thermometer = K740Thermometer(self.gpib, 11, {8: TYPE_K, 7: TYPE_K})
+		thermometer.setup()
+		self.assertEqual(thermometer.read_channels(), [23.5, 23.5])
+		self.assertEqual(self.k740.commands[-4:], [b'C07N2X', b'C08N2X', b'C07X', b'C08X'])
+
+
+class K2015BurstTest(InstrumentTestCase):
+
+	def test_read_summary(self):
+		burst = K2015Burst(self.gpib, 1, 4)
+		burst.setup()
+		summary = burst.read_summary()
+		self.assertEqual(summary.count, 4)
+		self.assertEqual(summary.mean, 3.0)
+		self.assertEqual((summary.minimum, summary.maximum), (1.0, 6.0))
+
+
+	def test_binary_burst(self):
+		burst = K2015BinaryBurst(self.gpib, 1, 4, REAL64)
+		burst.setup()
+		summary = burst.read_summary()
+		self.assertEqual((summary.count, summary.mean), (4, 3.0))
+
+	def test_not_a_block(self):
+		# an ASCII reply where a block is expected is discarded, the next read is in step
+		self.gpib.select(1)
+		self.assertRaises(ValueError, self.gpib.query_block, ':READ?')
+		self.assertIn('MODEL 2015', self.gpib.query('*IDN?'))
+
+
+def SimulatedEIP(latency=0.0):
+	"EIP answering every test with the same byte"
+	return RecordingMeter(lambda: 0x3F, latency, fmt='TA10 %02X')
+
+
+class EIP575MemoryTest(unittest.TestCase):
+
+	def run_eip(self, eip, test):
+		with EmulatedBus({5: eip, 1: SimulatedScpiMeter(lambda: 2.0)}, 0.3) as gpib:
+			test(EIP575Memory(gpib, 5, turnaround=0.05))
+
+	def test_turnaround_on_the_bus(self):
+		eip = SimulatedEIP()
+		self.run_eip(eip, lambda memory: self.assertEqual(memory.read_block(0xC000, 4), b'\x3F' * 4))
+		addresses = eip.times(b'C00')
+		reads = eip.times(TALK)
+		self.assertEqual(len(addresses), 4)
+		for address, read in zip(addresses, reads):
+			self.assertGreaterEqual(read - address, 0.05 * 0.95)
+
+	def test_reset_discards_replies(self):
+		def test(memory):
+			# the EIP answers after the driver has given up on the first result
+			self.assertRaises(GPIBTimeout, memory.read_block, 0xC000, 3)
+			memory.reset()
+			memory.gpib.select(1)
+			self.assertEqual(float(memory.gpib.query(':READ?')), 2.0)
+		self.run_eip(SimulatedEIP(latency=0.4), test)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,35 @@
+"""
+Routing the K705 matrix, only the changed crosspoints are sent, opens before closes
+"""
+
+from instruments.k705 import K705Matrix
+from tests.emulated import RecordingMeter, EmulatedBus
+
+import unittest
+
+
+class K705MatrixTest(unittest.TestCase):
+
+	def test_route_command(self):
+		matrix = K705Matrix(None, 17)
+		self.assertEqual(matrix.route_command(['01:2', (2, 1)]), 'C01:2 C02:1X')
+		# 01:2 stays closed, nothing is sent for it
+		self.assertEqual(matrix.route_command(['06:3', '01:2']), 'N02:1X C06:3X')
+		self.assertIsNone(matrix.route_command([(6, 3), (1, 2)]))
+		self.assertEqual(matrix.route_command(['01:1', '02:2', '06:3']), 'N01:2X C01:1 C02:2X')
+		self.assertEqual(matrix.route_command([]), 'N01:1 N02:2 N06:3X')
+		self.assertEqual(matrix.closed, set())
+
+	def test_route_on_the_bus(self):
+		switch = RecordingMeter()
+		with EmulatedBus({17: switch}) as gpib:
+			matrix = K705Matrix(gpib, 17)
+			matrix.reset()
+			self.assertTrue(matrix.route(['01:2', '02:1']))
+			self.assertFalse(matrix.route(['02:1', '01:2']))
+			self.assertTrue(matrix.route(['01:1', '02:1']))
+		self.assertEqual(switch.commands, [b'RX', b'C01:2 C02:1X', b'N01:2X C01:1X'])
+
+
+if __name__ == '__main__':
+	unittest.main()
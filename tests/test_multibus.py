@@ -0,0 +1,51 @@
+"""
+Scanning several buses in parallel
+"""
+
+from acquisition.multibus import Bus, MultiBusRunner
+from acquisition.sinks import CsvSink
+
+import io
+import threading
+import time
+import unittest
+
+
+class FakeInterface(object):
+	"Records whether it is open, enough of an interface for Bus"
+
+	def __init__(self):
+		self.is_open = False
+
+	def open(self):
+		self.is_open = True
+
+	def close(self):
+		self.is_open = False
+
+
+class MultiBusRunnerTest(unittest.TestCase):
+
+	def test_failed_bus_waits_for_the_others(self):
+		slow = FakeInterface()
+		finished = threading.Event()
+
+		def fail(gpib):
+			raise ValueError('bus failed')
+
+		def scan(gpib):
+			time.sleep(0.2)
+			# still open while the scan runs
+			self.assertTrue(gpib.is_open)
+			finished.set()
+			return [1.0]
+
+		buses = [Bus('failing', FakeInterface(), fail, ['A']), Bus('slow', slow, scan, ['B'])]
+		runner = MultiBusRunner(buses, sink=CsvSink(io.StringIO()))
+		self.assertRaises(ValueError, runner.run, 1)
+		self.assertTrue(finished.is_set())
+		self.assertFalse(slow.is_open)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,38 @@
+"""
+Scan plans run against the interface emulator
+"""
+
+from tests.emulated import RecordingMeter, EmulatedBus
+from acquisition.scanplan import ScanPlan
+
+import unittest
+
+SETTLE = 0.2
+LATENCY = 0.15
+
+
+class SettleTest(unittest.TestCase):
+
+	def test_route_settles_on_the_bus(self):
+		switch, meter = RecordingMeter(), RecordingMeter(latency=LATENCY)
+		plan = ScanPlan({
+			'settle': SETTLE,
+			'instruments': {'matrix': {'addr': 10}, 'meter': {'addr': 1}},
+			'points': [
+				{'column': 'C%d' % i, 'instrument': 'meter', 'query': ':READ?',
+					'route': {'switch': 'matrix', 'close': ['C0%d:1X' % i], 'open': ['N0%d:1X' % i]}}
+				for i in (1, 2, 3)
+			],
+		})
+		with EmulatedBus({10: switch, 1: meter}) as gpib:
+			self.assertEqual(len(plan.compile(gpib).scan()), 3)
+
+		closed = switch.times(b'C')
+		queries = meter.times(b':READ?')
+		self.assertEqual(len(closed), 3)
+		for route, query in zip(closed, queries):
+			self.assertGreaterEqual(query - route, SETTLE * 0.95)
+
+
+if __name__ == '__main__':
+	unittest.main()
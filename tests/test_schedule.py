@@ -0,0 +1,138 @@
+"""
+Pacing of the measurement cycles on a simulated clock
+"""
+
+from acquisition.schedule import DeadlineScheduler, OVERRUN_SKIP, OVERRUN_CATCH_UP, OVERRUN_STRETCH
+
+import math
+import unittest
+
+PERIOD = 10.0
+
+
+class FakeClock(object):
+	"""
+	Clock that only moves when slept on or a cycle does its work, sleeps
+	overshoot by late seconds and the first early sleeps return half way
+	"""
+
+	def __init__(self, late=0.0, early=0):
+		self.now = 100.0
+		self.late = late
+		self.early = early
+		self.sleeps = []
+
+	def __call__(self):
+		return self.now
+
+	def sleep(self, seconds):
+		self.sleeps.append(seconds)
+		if len(self.sleeps) <= self.early:
+			self.now += seconds / 2
+		else:
+			self.now += seconds + self.late
+
+	def work(self, seconds):
+		self.now += seconds
+
+
+class DeadlineSchedulerTest(unittest.TestCase):
+
+	def scheduler(self, policy, clock):
+		return DeadlineScheduler(PERIOD, policy, clock, clock.sleep)
+
+	def test_on_schedule(self):
+		clock = FakeClock()
+		scheduler = self.scheduler(OVERRUN_SKIP, clock)
+		self.assertEqual(scheduler.wait(), 100.0)
+		for n in range(1, 4):
+			clock.work(3.0)
+			self.assertEqual(scheduler.wait(), 100.0 + n * PERIOD)
+		self.assertEqual(clock.sleeps, [7.0] * 3)
+		self.assertEqual((scheduler.stats.cycles, scheduler.stats.overruns), (4, 0))
+		self.assertEqual(scheduler.stats.utilisation(), 0.3)
+
+	def test_skip(self):
+		clock = FakeClock()
+		scheduler = self.scheduler(OVERRUN_SKIP, clock)
+		scheduler.wait()
+		clock.work(25.0)
+		# the deadlines at 110 and 120 have passed, the next cycle keeps the phase
+		self.assertEqual(scheduler.wait(), 130.0)
+		self.assertEqual(clock.now, 130.0)
+		self.assertEqual((scheduler.stats.overruns, scheduler.stats.skipped), (1, 2))
+		clock.work(1.0)
+		self.assertEqual(scheduler.wait(), 140.0)
+		self.assertEqual(scheduler.stats.skipped, 2)
+
+	def test_catch_up(self):
+		clock = FakeClock()
+		scheduler = self.scheduler(OVERRUN_CATCH_UP, clock)
+		scheduler.wait()
+		clock.work(25.0)
+		# the missed cycles start at once, one after another
+		self.assertEqual(scheduler.wait(), 110.0)
+		self.assertEqual(scheduler.wait(), 120.0)
+		self.assertEqual(clock.sleeps, [])
+		self.assertEqual(scheduler.stats.jitter, 5.0)
+		self.assertEqual(scheduler.stats.max_jitter, 15.0)
+		# back on schedule
+		self.assertEqual(scheduler.wait(), 130.0)
+		self.assertEqual(clock.now, 130.0)
+		self.assertEqual((scheduler.stats.overruns, scheduler.stats.skipped), (2, 0))
+
+	def test_stretch(self):
+		clock = FakeClock()
+		scheduler = self.scheduler(OVERRUN_STRETCH, clock)
+		scheduler.wait()
+		clock.work(25.0)
+		# the next cycle starts at once, the phase continues from there
+		self.assertEqual(scheduler.wait(), 125.0)
+		clock.work(1.0)
+		self.assertEqual(scheduler.wait(), 135.0)
+		self.assertEqual(scheduler.stats.jitter, 0.0)
+		self.assertEqual((scheduler.stats.overruns, scheduler.stats.skipped), (1, 0))
+
+	def test_jitter_and_durations(self):
+		clock = FakeClock(late=0.25)
+		scheduler = self.scheduler(OVERRUN_SKIP, clock)
+		scheduler.wait()
+		for duration in (2.0, 4.0, 6.0):
+			clock.work(duration)
+			scheduler.wait()
+		stats = scheduler.stats
+		# the first cycle starts on time, every sleep after it wakes a quarter second late
+		self.assertEqual(stats.cycles, 4)
+		self.assertEqual((stats.jitter, stats.max_jitter), (0.25, 0.25))
+		self.assertEqual(stats.mean_jitter(), 0.75 / 4)
+		self.assertEqual(stats.rms_jitter(), math.sqrt(3 * 0.25 ** 2 / 4))
+		self.assertEqual((stats.duration, stats.max_duration), (6.0, 6.0))
+		self.assertEqual(stats.mean_duration(), 4.0)
+		self.assertEqual(stats.utilisation(), 0.4)
+
+	def test_early_wakeup(self):
+		clock = FakeClock(early=2)
+		scheduler = self.scheduler(OVERRUN_SKIP, clock)
+		scheduler.wait()
+		clock.work(4.0)
+		# sleep returned before the deadline, it is slept on again
+		self.assertEqual(scheduler.wait(), 110.0)
+		self.assertEqual(clock.now, 110.0)
+		self.assertEqual(clock.sleeps, [6.0, 3.0, 1.5])
+		self.assertEqual(scheduler.stats.jitter, 0.0)
+
+	def test_reset(self):
+		clock = FakeClock()
+		scheduler = self.scheduler(OVERRUN_SKIP, clock)
+		scheduler.wait()
+		scheduler.reset()
+		clock.work(33.0)
+		self.assertEqual(scheduler.wait(), 133.0)
+		self.assertEqual(scheduler.stats.overruns, 0)
+
+	def test_unknown_policy(self):
+		self.assertRaises(ValueError, DeadlineScheduler, PERIOD, 'later')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,70 @@
+"""
+Batched sinks writing typed columns
+"""
+
+from acquisition.sinks import BatchedSink, ParquetSink
+from analysis.cache import LoadCachedLog, AverageColumn
+
+import pandas as pd
+import shutil
+import tempfile
+import unittest
+import os
+
+COLUMNS = ['DateTime', 'T7', 'C1']
+
+
+def Record(i):
+	return ['2017-07-22 10:00:%02d' % i, 23.0 + i * 0.01, 1.0 + i * 1e-6]
+
+
+class ParquetSinkTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_parts_readable_after_flush(self):
+		sink = ParquetSink(self.directory, flush_rows=5)
+		sink.start(COLUMNS)
+		for i in range(7):
+			sink.write(Record(i))
+		# the first batch is complete before the sink is closed
+		self.assertEqual(len(pd.read_parquet(self.directory)), 5)
+		sink.close()
+		data = pd.read_parquet(self.directory)
+		self.assertEqual(len(data), 7)
+		self.assertEqual(list(data.columns), COLUMNS)
+
+	def test_load_with_averages(self):
+		sink = ParquetSink(self.directory, flush_rows=5)
+		sink.start(COLUMNS)
+		for i in range(7):
+			sink.write(Record(i))
+		sink.close()
+		# the directory has no extension, it is loaded rather than cached
+		data = LoadCachedLog(self.directory, ['T7', 'C1'], [3])
+		self.assertEqual(len(data), 7)
+		self.assertAlmostEqual(data[AverageColumn('T7', 3)].iloc[-1], 23.05)
+		self.assertFalse(os.path.exists(self.directory + '.cache.bin'))
+
+	def test_sinks_started_together(self):
+		sinks = [ParquetSink(self.directory, flush_rows=3) for i in range(2)]
+		for sink in sinks:
+			sink.start(COLUMNS)
+		for i in range(6):
+			for sink in sinks:
+				sink.write(Record(i))
+		for sink in sinks:
+			sink.close()
+		self.assertEqual(len(os.listdir(self.directory)), 4)
+		self.assertEqual(len(pd.read_parquet(self.directory)), 12)
+
+	def test_abstract(self):
+		self.assertRaises(TypeError, BatchedSink)
+
+
+if __name__ == '__main__':
+	unittest.main()
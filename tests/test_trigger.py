@@ -0,0 +1,45 @@
+"""
+Group triggered sampling against the interface emulator
+"""
+
+from gpib.prologix.emulator import SimulatedTalkMeter
+from tests.emulated import RecordingMeter, EmulatedBus, TRIGGER, TALK
+from acquisition.trigger import GroupTrigger, TriggeredInstrument
+
+import unittest
+
+CONVERSION_TIME = 0.1
+READOUT_TIME = 0.15		# longer than the conversion, so the bus falls behind the host
+
+
+class GroupTriggerTest(unittest.TestCase):
+
+	def test_conversion_time_on_the_bus(self):
+		meters = {1: RecordingMeter(lambda: 1.0, readout=READOUT_TIME), 2: RecordingMeter(lambda: 2.0, readout=READOUT_TIME)}
+		with EmulatedBus(meters) as gpib:
+			trigger = GroupTrigger(gpib, [TriggeredInstrument(addr, []) for addr in sorted(meters)], CONVERSION_TIME)
+			self.assertEqual(trigger.sample(3), [[1.0] * 3, [2.0] * 3])
+
+		for meter in meters.values():
+			triggers = meter.times(TRIGGER)
+			talks = meter.times(TALK)
+			self.assertEqual(len(triggers), 3)
+			for triggered, talked in zip(triggers, talks):
+				self.assertGreaterEqual(talked - triggered, CONVERSION_TIME * 0.95)
+
+
+	def test_count_for_each_instrument(self):
+		meters = {1: SimulatedTalkMeter(lambda: 1.0, latency=0.1), 2: SimulatedTalkMeter(lambda: 2.0, latency=0.03)}
+		with EmulatedBus(meters) as gpib:
+			trigger = GroupTrigger(gpib, [TriggeredInstrument(addr, []) for addr in sorted(meters)])
+			slow, fast = trigger.measure(3)
+			self.assertGreaterEqual(slow, 0.1 * 0.9)
+			self.assertLess(fast, 0.1)
+			# the slow meter is waited for while it is triggered, then only the fast one
+			self.assertAlmostEqual(trigger.wait_time([2, 5]), 2 * slow + 3 * fast)
+			self.assertEqual(trigger.sample([2, 5]), [[1.0] * 2, [2.0] * 5])
+			self.assertRaises(ValueError, trigger.sample, [1])
+
+
+if __name__ == '__main__':
+	unittest.main()